@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic corpora for the benchmark suite.
+
+Generates crt.sh-shaped certificate arrays, RIR delegation files, agency
+source CSVs, per-category prefix CSVs and httpx probe CSVs sized relative
+to the current dataset, so every stage can be measured offline at 1x/10x/100x scale.
+"""
+
+import csv
+import ipaddress
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+# Approximate size of the committed dataset at 1x scale
+BASE_CERTIFICATES = 51_000
+BASE_DELEGATION_RECORDS = 60_000
+BASE_PREFIXES = 14_500
+BASE_ORGANIZATIONS = 920
+BASE_TECH_HOSTS = 15_000
+
+ISSUERS = [
+    (431054, "C=US, O=Let's Encrypt, CN=YE2"),
+    (295815, "C=US, O=Let's Encrypt, CN=R11"),
+    (183267, "C=US, O=DigiCert Inc, CN=DigiCert Global G2 TLS RSA SHA256 2020 CA1"),
+    (185752, "C=CA, O=Entrust Limited, CN=Entrust DV TLS Issuing RSA CA 2"),
+    (7395,   "C=US, O=Amazon, CN=Amazon RSA 2048 M02"),
+    (239291, "C=US, O=Google Trust Services, CN=WR1"),
+]
+ZONES = ["cdc.gov", "nih.gov", "va.gov", "irs.gov", "nasa.gov", "usda.gov", "dhs.gov", "gsa.gov"]
+WORDS = ["api", "www", "portal", "dev", "test", "stage", "auth", "login", "data", "static",
+         "mail", "vpn", "cms", "app", "files", "search", "reports", "images", "survey", "secure"]
+REGISTRIES = ["arin", "ripencc", "apnic", "lacnic", "afrinic"]
+CATEGORY_SOURCES = {
+    "fed-gov":   ("us-fed-gov-agencies.csv", ["abbrievations", "fedagency", "asn"]),
+    "state-gov": ("us-state-gov-agencies.csv", ["stategov", "state", "asn"]),
+    "city-gov":  ("us-city-gov-agencies.csv", ["citygov", "state", "asn"]),
+    "academic":  ("us-academics.csv", ["academic", "asn"]),
+    "hospitals": ("us-hospital-systems.csv", ["hospital", "asn_name", "asn"]),
+    "insurance": ("us-health-insurance.csv", ["insurer", "asn_name", "asn"]),
+    "pbm":       ("us-pharmacy-benefit-managers.csv", ["pbm", "asn_name", "asn"]),
+    "health-it": ("us-health-it-vendors.csv", ["vendor", "asn_name", "asn"]),
+    "cloud":     ("cloud-datacenters.csv", ["datacenter", "asn"]),
+}
+# Cloud organizations are named after hosting providers so IP matches can confirm them
+CLOUD_PROVIDERS = ["Akamai", "Amazon CloudFront", "Microsoft Azure", "Cloudflare", "Fastly", "Amazon Web Services"]
+# (cname chain, httpx cdn_name) pairs; the empty chain leaves the host to the IP cross-check
+EDGES = [
+    (["{host}.edgekey.net", "e1234.dscna.akamaiedge.net"], ""),
+    (["d1abcdef.cloudfront.net"], "cloudfront"),
+    (["{host}.azurefd.net"], "azure"),
+    (["{host}.cdn.cloudflare.net"], "cloudflare"),
+    (["{host}.map.fastly.net"], ""),
+    (["{host}.herokuapp.example"], ""),
+    ([], "aws"),
+    ([], ""),
+]
+TECH_FIELDS = ["timestamp", "input", "host", "host_ip", "a", "aaaa", "cname", "cdn_name", "cdn_type", "tech"]
+TECHNOLOGIES = ["HSTS", "Nginx", "Apache HTTP Server", "Drupal", "WordPress", "Amazon Web Services", "jQuery",
+                "Varnish", "Envoy", "Font Awesome", "Google Analytics", "Akamai", "Cloudflare", "PHP"]
+PREFIX_FIELDS = ["abbreviation", "agency", "asn", "prefix", "ip_version", "rir_registry", "rir_status",
+                 "rir_assigned_date", "rir_short_name", "rir_description", "collected_at"]
+
+
+def _hostname(rng, zone):
+    depth = rng.choice((1, 1, 1, 2, 2, 3))
+    labels = [f"{rng.choice(WORDS)}{rng.randint(0, 999)}" if i == 0 else rng.choice(WORDS)
+              for i in range(depth)]
+    return ".".join(labels + [zone])
+
+
+def generate_certificates(count, san_fanout=3, wildcard_ratio=0.1, precert_ratio=0.7,
+                          mixed_case_ratio=0.02, zone=None, seed=1):
+    """
+    Build a crt.sh-style certificate array.
+
+    Args:
+        count: Number of entries to return (precert duplicates included).
+        san_fanout: Mean number of SAN entries per certificate.
+        wildcard_ratio: Fraction of SANs issued as '*.' wildcards.
+        precert_ratio: Fraction of certificates that also appear as a
+            precertificate entry (same issuer and serial, different id).
+        mixed_case_ratio: Fraction of SANs with upper-case letters.
+        zone: Restrict names to one zone; otherwise spread across ZONES.
+        seed: Random seed; the same arguments always give the same corpus.
+    """
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    certs = []
+    cert_id = 20_000_000_000
+    while len(certs) < count:
+        cert_zone = zone or rng.choice(ZONES)
+        sans = []
+        for _ in range(max(1, int(rng.expovariate(1 / san_fanout)))):
+            name = _hostname(rng, cert_zone)
+            if rng.random() < wildcard_ratio:
+                name = f"*.{name}"
+            if rng.random() < mixed_case_ratio:
+                name = name.upper()
+            sans.append(name)
+        issuer_ca_id, issuer_name = rng.choice(ISSUERS)
+        not_before = start + timedelta(days=rng.randint(0, 400), seconds=rng.randint(0, 86_399))
+        not_after = not_before + timedelta(days=rng.choice((90, 90, 365, 397)))
+        cert = {
+            "issuer_ca_id": issuer_ca_id,
+            "issuer_name": issuer_name,
+            "common_name": sans[0],
+            "name_value": "\n".join(sans),
+            "id": cert_id,
+            "entry_timestamp": not_before.strftime("%Y-%m-%dT%H:%M:%S.000"),
+            "not_before": not_before.strftime("%Y-%m-%dT%H:%M:%S"),
+            "not_after": not_after.strftime("%Y-%m-%dT%H:%M:%S"),
+            "serial_number": f"{rng.getrandbits(144):036x}",
+            "result_count": len(sans) + 1,
+        }
+        certs.append(cert)
+        cert_id += rng.randint(1, 50)
+        if len(certs) < count and rng.random() < precert_ratio:
+            certs.append(dict(cert, id=cert_id))
+            cert_id += rng.randint(1, 50)
+    return certs
+
+
+def _random_network(rng, version):
+    if version == 4:
+        plen = rng.choice((16, 19, 20, 21, 22, 23, 24, 24, 24))
+        return ipaddress.ip_network((rng.getrandbits(32) >> (32 - plen) << (32 - plen), plen))
+    plen = rng.choice((32, 36, 40, 44, 48, 48))
+    base = (0x2000 << 112) | rng.getrandbits(112)
+    return ipaddress.ip_network((base >> (128 - plen) << (128 - plen), plen))
+
+
+def write_delegation_files(directory, records, seed=1):
+    """Write delegated-<rir>-extended-latest.txt files with asn/ipv4/ipv6 records."""
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    per_registry = max(1, records // len(REGISTRIES))
+    asn = 1
+    for registry in REGISTRIES:
+        path = os.path.join(directory, f"delegated-{registry}-extended-latest.txt")
+        with open(path, "w", encoding="ascii") as f:
+            f.write(f"2.3|{registry}|20261019|{per_registry}|19830101|20261019|+0000\n")
+            f.write(f"{registry}|*|asn|*|{per_registry // 3}|summary\n")
+            for i in range(per_registry):
+                date = f"{rng.randint(1985, 2026)}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}"
+                kind = i % 3
+                if kind == 0:
+                    count = rng.choice((1, 1, 1, 2, 4))
+                    f.write(f"{registry}|US|asn|{asn}|{count}|{date}|assigned|{rng.getrandbits(32):08x}\n")
+                    asn += count
+                elif kind == 1:
+                    net = _random_network(rng, 4)
+                    f.write(f"{registry}|US|ipv4|{net.network_address}|{net.num_addresses}|{date}|allocated|x\n")
+                else:
+                    net = _random_network(rng, 6)
+                    f.write(f"{registry}|US|ipv6|{net.network_address}|{net.prefixlen}|{date}|allocated|x\n")
+    return directory
+
+
+def write_agency_tree(root, organizations, prefixes, seed=1):
+    """
+    Write agency source CSVs under root/ and prefix CSVs under root/asn/.
+
+    The layout mirrors data/, so generators that take a data root (or a
+    REPO_ROOT with data/ below it) can run against it unchanged.
+    """
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(root, "asn"), exist_ok=True)
+    categories = list(CATEGORY_SOURCES)
+    orgs_per_category = max(1, organizations // len(categories))
+    prefixes_per_category = max(1, prefixes // len(categories))
+    asn = 64_512
+    for category in categories:
+        filename, columns = CATEGORY_SOURCES[category]
+        orgs = []
+        with open(os.path.join(root, filename), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for i in range(orgs_per_category):
+                if category == "cloud":
+                    name = CLOUD_PROVIDERS[i % len(CLOUD_PROVIDERS)]
+                else:
+                    name = f"{category.title()} Organization {i}"
+                abbrev = f"{category[:2].upper()}{i}"
+                orgs.append((abbrev, name, f"AS{asn}"))
+                row = {"asn": f"AS{asn}", "state": rng.choice(("AL", "CA", "NY", "TX", "WA")),
+                       "asn_name": f"ORG-{i}", "abbrievations": abbrev, "fedagency": name}
+                writer.writerow([row.get(c, name) for c in columns])
+                asn += 1
+
+        rows = []
+        for _ in range(prefixes_per_category):
+            abbrev, name, org_asn = rng.choice(orgs)
+            version = 6 if rng.random() < 0.05 else 4
+            rows.append({
+                "abbreviation": abbrev if category == "fed-gov" else name,
+                "agency": name,
+                "asn": org_asn,
+                "prefix": str(_random_network(rng, version)),
+                "ip_version": f"ipv{version}",
+                "rir_registry": "arin",
+                "rir_status": "assigned",
+                "rir_assigned_date": "2001-01-01",
+                "rir_short_name": org_asn,
+                "rir_description": name,
+                "collected_at": "2026-10-01T06:00:00Z",
+            })
+        rows.sort(key=lambda r: (r["abbreviation"], r["asn"], r["prefix"]))
+        with open(os.path.join(root, "asn", f"{category}-prefixes.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=PREFIX_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    return root
+
+
+def generate_table_rows(count, columns=5, seed=1):
+    """Rows shaped like the README tables: a name, raw integer counts and a formatted total."""
+    rng = random.Random(seed)
+    return [
+        [f"Organization {i}"] + [rng.randint(0, 10_000) for _ in range(columns - 2)] + [f"{rng.randint(0, 10**7):,}"]
+        for i in range(count)
+    ]
+
+
+def write_tech_dir(directory, hosts, cloud_prefixes=None, seed=1):
+    """
+    Write domain.<zone>_httpx.csv files shaped like httpx output.
+
+    Hosts get a CNAME chain and/or cdn_name from EDGES; when cloud_prefixes
+    (a prefix CSV from write_agency_tree) exists, a third of the hosts
+    resolve into those prefixes so the hosting IP cross-check has hits.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    networks = []
+    if cloud_prefixes and os.path.exists(cloud_prefixes):
+        with open(cloud_prefixes, newline="", encoding="utf-8") as f:
+            networks = [ipaddress.ip_network(row["prefix"]) for row in csv.DictReader(f) if row["ip_version"] == "ipv4"]
+    rows = {zone: [] for zone in ZONES}
+    for i in range(hosts):
+        zone = rng.choice(ZONES)
+        host = _hostname(rng, zone)
+        if networks and rng.random() < 1 / 3:
+            net = rng.choice(networks)
+            ip = str(net.network_address + rng.randrange(net.num_addresses))
+        else:
+            ip = str(ipaddress.IPv4Address(rng.getrandbits(32)))
+        chain, cdn_name = rng.choice(EDGES)
+        rows[zone].append({
+            "timestamp": f"2026-10-01T06:00:{i % 60:02d}Z",
+            "input": host,
+            "host": host,
+            "host_ip": ip,
+            "a": json.dumps([ip]),
+            "aaaa": "null",
+            "cname": json.dumps([c.format(host=host.split(".")[0]) for c in chain]) if chain else "null",
+            "cdn_name": cdn_name,
+            "cdn_type": "cdn" if cdn_name else "",
+            "tech": json.dumps(rng.sample(TECHNOLOGIES, rng.randint(0, 4))),
+        })
+    for zone, zone_rows in rows.items():
+        with open(os.path.join(directory, f"domain.{zone}_httpx.csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=TECH_FIELDS)
+            writer.writeheader()
+            writer.writerows(zone_rows)
+    return directory
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the processing stages.
+
+Builds synthetic corpora (see corpora.py), times each stage (best of
+--repeat runs), measures its peak traced allocation in a separate pass,
+and compares the results against a stored baseline. Timings are machine
+dependent: refresh the baseline with --save-baseline on the machine you
+compare on.
+
+Usage:
+  python benchmarks/run.py --scale 1
+  python benchmarks/run.py --scale 10 --stages extract,dedup
+  python benchmarks/run.py --scale 1 --save-baseline
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, "scripts"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import corpora
+import generate_readme
+from fetch_asn_prefixes import parse_delegation_files
+
+import main as pipeline
+
+BASELINE_PATH = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+DEFAULT_THRESHOLD = 0.5
+# Small enough that extract-spill spills several runs at every scale
+SPILL_BUDGET_BYTES = 8 * 1024 * 1024
+# Pinned so a new README section does not silently change what the
+# readme-sections baseline measures; add sections here and re-record.
+README_SECTIONS = (
+    "overview-table", "fed-gov-table", "state-gov-table", "city-gov-table", "hospitals-table",
+    "insurance-table", "pbm-table", "health-it-table", "tech-table", "hosting-table", "prefix-anomalies",
+)
+
+
+# ── Stages ────────────────────────────────────────────────────────────────────
+
+def build_stages(scale, workdir, args):
+    """
+    Return {name: (items, callable)} for every benchmarked stage.
+
+    Corpora are generated up front so generation cost is never measured.
+    """
+    certs = corpora.generate_certificates(
+        corpora.BASE_CERTIFICATES * scale,
+        san_fanout=args.san_fanout,
+        wildcard_ratio=args.wildcard_ratio,
+        precert_ratio=args.precert_ratio,
+    )
+    unique_certs = pipeline.deduplicate_certificates(certs)
+    domains = pipeline.extract_domains_from_certificates(unique_certs)
+    sans = sum(c["name_value"].count("\n") + 1 for c in certs)
+
+    rir_dir = corpora.write_delegation_files(os.path.join(workdir, "rir"), corpora.BASE_DELEGATION_RECORDS * scale)
+    corpora.write_agency_tree(
+        os.path.join(workdir, "data"), corpora.BASE_ORGANIZATIONS * scale, corpora.BASE_PREFIXES * scale,
+    )
+    corpora.write_tech_dir(
+        os.path.join(workdir, "data", "tech"), corpora.BASE_TECH_HOSTS * scale,
+        cloud_prefixes=os.path.join(workdir, "data", "asn", "cloud-prefixes.csv"),
+    )
+    # Section generators resolve sources from REPO_ROOT/data, prefixes from
+    # ASN_DIR and httpx CSVs from TECH_DIR
+    generate_readme.REPO_ROOT = type(generate_readme.REPO_ROOT)(workdir)
+    generate_readme.ASN_DIR = generate_readme.REPO_ROOT / "data" / "asn"
+    generate_readme.TECH_DIR = generate_readme.REPO_ROOT / "data" / "tech"
+
+    table_rows = corpora.generate_table_rows(100_000 * scale)
+    table_headers = ["Organization", "ASNs", "IPv4 Prefixes", "IPv6 Prefixes", "Est. IPv4 Addresses"]
+    table_alignments = ["left", "right", "right", "right", "right"]
+    csv_path = os.path.join(workdir, "csv", "domains.csv")
+
+    readme_sections = README_SECTIONS
+
+    def render_sections():
+        for name in readme_sections:
+            generate_readme.SECTION_GENERATORS[name]()
+
+    return {
+        "filter": (len(certs), lambda: pipeline.filter_valid_certificates(certs)),
+        "dedup": (len(certs), lambda: pipeline.deduplicate_certificates(certs)),
+        "extract": (sans, lambda: pipeline.extract_domains_from_certificates(certs)),
+        "save-csv": (len(domains), lambda: pipeline.save_domains_to_csv(domains, csv_path)),
+        "extract-spill": (sans, lambda: pipeline.save_domains_to_csv(
+            pipeline.extract_domains_from_certificates(certs, memory_budget=SPILL_BUDGET_BYTES), csv_path)),
+        "delegation": (corpora.BASE_DELEGATION_RECORDS * scale, lambda: parse_delegation_files(rir_dir)),
+        "md-table": (len(table_rows), lambda: generate_readme.md_table(table_headers, table_rows, table_alignments)),
+        "md-table-compact": (
+            len(table_rows),
+            lambda: generate_readme.md_table(table_headers, table_rows, table_alignments, compact=True),
+        ),
+        "readme-sections": (len(readme_sections), render_sections),
+    }
+
+
+# ── Measurement ───────────────────────────────────────────────────────────────
+
+def measure(func, repeat):
+    """Return (best_seconds, peak_traced_bytes) for func."""
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def compare(results, baseline, threshold):
+    """Print a comparison table; return the names of stages slower than the threshold allows."""
+    regressions = []
+    base_results = baseline.get("results", {}) if baseline else {}
+    print(f"\n{'stage':<16} {'items':>10} {'seconds':>9} {'items/s':>12} {'peak MB':>9} {'vs base':>8}")
+    for name, r in results.items():
+        base = base_results.get(name)
+        delta = ""
+        if base and base["seconds"] > 0:
+            ratio = r["seconds"] / base["seconds"]
+            delta = f"{ratio:.2f}x"
+            if ratio > 1 + threshold:
+                regressions.append(name)
+                delta += " !"
+        print(f"{name:<16} {r['items']:>10,} {r['seconds']:>9.3f} {r['items_per_second']:>12,.0f} "
+              f"{r['peak_bytes'] / 1e6:>9.1f} {delta:>8}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument("--scale", type=int, default=1, help="Corpus size relative to the current dataset (default: 1)")
+    parser.add_argument("--stages", default=None, help="Comma-separated stages to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage; the best is kept (default: 3)")
+    parser.add_argument("--san-fanout", type=float, default=3, help="Mean SANs per certificate (default: 3)")
+    parser.add_argument("--wildcard-ratio", type=float, default=0.1, help="Fraction of wildcard SANs (default: 0.1)")
+    parser.add_argument("--precert-ratio", type=float, default=0.7,
+                        help="Fraction of certificates duplicated as precertificates (default: 0.7)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Overwrite the baseline with this run")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Allowed slowdown before a stage counts as a regression (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--output", default=None, help="Write results JSON to this path")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="gov-domains-bench-") as workdir:
+        # Stage functions print progress; keep the benchmark output readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            stages = build_stages(args.scale, workdir, args)
+        selected = args.stages.split(",") if args.stages else list(stages)
+        unknown = [name for name in selected if name not in stages]
+        if unknown:
+            parser.error(f"unknown stages: {', '.join(unknown)} (choose from {', '.join(stages)})")
+
+        for name in selected:
+            items, func = stages[name]
+            print(f"[*] {name} ...", file=sys.stderr)
+            with contextlib.redirect_stdout(io.StringIO()):
+                seconds, peak = measure(func, args.repeat)
+            results[name] = {
+                "items": items,
+                "seconds": round(seconds, 6),
+                "items_per_second": round(items / seconds, 1) if seconds else 0.0,
+                "peak_bytes": peak,
+            }
+
+    report = {"scale": args.scale, "python": sys.version.split()[0], "results": results}
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("scale") != args.scale:
+            print(f"[~] Baseline was recorded at scale {baseline.get('scale')}; skipping comparison", file=sys.stderr)
+            baseline = None
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    if args.save_baseline:
+        # Keep baseline entries for stages that were not part of this run
+        if baseline:
+            report["results"] = {**baseline["results"], **results}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"[+] Baseline saved to {args.baseline}")
+    elif regressions:
+        print(f"[!] Regressions over {args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,21 @@ import glob
 import json
 import os
 import sys
-
 from datetime import datetime, timezone
-from src.crtsh import CrtshClient
+
+from src import instrument, snapshots
+from src.certstore import STORE_DIR, CertificateStore
+from src.crtsh import (
+  CrtshClient,
+  agency_organization_queries,
+  fingerprint_query,
+  identity_query,
+  issuer_query,
+  organization_query,
+)
+from src.external_sort import SpilledMapping
+from src.normalize import normalize_domain, zone_from_filename
+
 
 def save_raw_json(data, filename):
   os.makedirs(os.path.dirname(filename), exist_ok=True)
@@ -14,87 +26,157 @@ def save_raw_json(data, filename):
     json.dump(data, f, indent=2)
   print(f"[+] Raw JSON data saved to {filename}")
 
-def extract_domains_from_certificates(certificates):
+# Rough in-memory cost of a domain aggregate and of each certificate ID
+# recorded against it, used to decide when to spill under a memory budget.
+DOMAIN_ENTRY_BYTES = 800
+CERT_ID_BYTES = 100
+
+def _record_domain(domains_data, domain, source, cert_ids, issuer_name, not_before, not_after):
+  if domain not in domains_data:
+    domains_data[domain] = {
+      'domain': domain,
+      'seen_in_common_name': 'No',
+      'seen_in_name_value': 'No',
+      'certificate_ids': set(),
+      'issuers': set(),
+      'earliest_seen': not_before,
+      'latest_expiry': not_after
+    }
+  data = domains_data[domain]
+  data[source] = 'Yes'
+  data['certificate_ids'].update(cert_ids)
+  data['issuers'].add(issuer_name)
+  if not_before and (not data['earliest_seen'] or not_before < data['earliest_seen']):
+    data['earliest_seen'] = not_before
+  if not_after and (not data['latest_expiry'] or not_after > data['latest_expiry']):
+    data['latest_expiry'] = not_after
+
+def _cert_id_key(cert_id):
+  # Numeric order for crt.sh IDs, with non-numeric placeholders last
+  return (not cert_id.isdigit(), len(cert_id), cert_id)
+
+def _encode_domain(data):
+  return [data['domain'], data['seen_in_common_name'], data['seen_in_name_value'],
+          sorted(data['certificate_ids']), sorted(data['issuers']),
+          data['earliest_seen'], data['latest_expiry']]
+
+def _decode_domain(value):
+  domain, in_cn, in_nv, cert_ids, issuers, earliest, latest = value
+  return {
+    'domain': domain,
+    'seen_in_common_name': in_cn,
+    'seen_in_name_value': in_nv,
+    'certificate_ids': set(cert_ids),
+    'issuers': set(issuers),
+    'earliest_seen': earliest,
+    'latest_expiry': latest
+  }
+
+def _combine_domains(records):
+  merged = records[0]
+  for data in records[1:]:
+    for source in ('seen_in_common_name', 'seen_in_name_value'):
+      if data[source] == 'Yes':
+        merged[source] = 'Yes'
+    merged['certificate_ids'] |= data['certificate_ids']
+    merged['issuers'] |= data['issuers']
+    if data['earliest_seen'] and (not merged['earliest_seen'] or data['earliest_seen'] < merged['earliest_seen']):
+      merged['earliest_seen'] = data['earliest_seen']
+    if data['latest_expiry'] and (not merged['latest_expiry'] or data['latest_expiry'] > merged['latest_expiry']):
+      merged['latest_expiry'] = data['latest_expiry']
+  return merged
+
+def extract_domains_from_certificates(certificates, zone=None, memory_budget=None):
   """
   Extract unique domains from certificates.
 
+  Names are normalized (lowercased, IDNA-encoded, validated) so case variants
+  and trailing dots collapse into one row; IP literals, email addresses and
+  names outside the zone are dropped.
+
   Args:
     certificates: List of certificate dictionaries.
+    zone: Optional queried zone (e.g. 'cdc.gov') to restrict names to.
+    memory_budget: Optional approximate limit in bytes for the in-memory
+      aggregates. Once exceeded they are spilled to sorted on-disk runs and
+      a SpilledMapping (merged when iterated) is returned instead of a dict.
 
   Returns:
-    Dictionary of normalized domain data.
+    Dictionary (or SpilledMapping) of normalized domain data.
   """
   domains_data = {}
+  zone = normalize_domain(zone) if zone else None
+  spilled = None
+  recorded_ids = 0
 
   for cert in certificates:
-    cert_id = cert.get('id', 'unknown')
+    cert_ids = [str(i) for i in cert.get('merged_ids', [cert.get('id', 'unknown')])]
     issuer_name = cert.get('issuer_name', 'unknown')
     not_before = cert.get('not_before', '')
     not_after = cert.get('not_after', '')
     if 'common_name' in cert and cert['common_name']:
-      domain = cert['common_name'].replace('*.', '')
-      if domain and '@' not in domain:
-        if domain not in domains_data:
-          domains_data[domain] = {
-            'domain': domain,
-            'seen_in_common_name': 'Yes',
-            'seen_in_name_value': 'No',
-            'certificate_ids': set(),
-            'issuers': set(),
-            'earliest_seen': not_before,
-            'latest_expiry': not_after
-          }
-        domains_data[domain]['certificate_ids'].add(str(cert_id))
-        domains_data[domain]['issuers'].add(issuer_name)
-        if not_before and (not domains_data[domain]['earliest_seen'] or not_before < domains_data[domain]['earliest_seen']):
-          domains_data[domain]['earliest_seen'] = not_before
-        if not_after and (not domains_data[domain]['latest_expiry'] or not_after > domains_data[domain]['latest_expiry']):
-          domains_data[domain]['latest_expiry'] = not_after
+      domain = normalize_domain(cert['common_name'], zone)
+      if domain:
+        _record_domain(domains_data, domain, 'seen_in_common_name',
+                       cert_ids, issuer_name, not_before, not_after)
 
     if 'name_value' in cert and cert['name_value']:
-      for name in cert['name_value'].split('\n'):
-        domain = name.replace('*.', '')
-        if domain and '@' not in domain:
-          if domain not in domains_data:
-            domains_data[domain] = {
-              'domain': domain,
-              'seen_in_common_name': 'No',
-              'seen_in_name_value': 'Yes',
-              'certificate_ids': set(),
-              'issuers': set(),
-              'earliest_seen': not_before,
-              'latest_expiry': not_after
-            }
-          else:
-            domains_data[domain]['seen_in_name_value'] = 'Yes'
-
-          domains_data[domain]['certificate_ids'].add(str(cert_id))
-          domains_data[domain]['issuers'].add(issuer_name)
-          if not_before and (not domains_data[domain]['earliest_seen'] or not_before < domains_data[domain]['earliest_seen']):
-            domains_data[domain]['earliest_seen'] = not_before
-          if not_after and (not domains_data[domain]['latest_expiry'] or not_after > domains_data[domain]['latest_expiry']):
-            domains_data[domain]['latest_expiry'] = not_after
-
+      names = cert['name_value'].split('\n')
+      instrument.count('sans', len(names))
+      for name in names:
+        domain = normalize_domain(name, zone)
+        if domain:
+          _record_domain(domains_data, domain, 'seen_in_name_value',
+                         cert_ids, issuer_name, not_before, not_after)
+
+    if memory_budget:
+      # Upper bound: the common name plus every SAN
+      recorded_ids += len(cert_ids) * (2 + (cert.get('name_value') or '').count('\n'))
+      if len(domains_data) * DOMAIN_ENTRY_BYTES + recorded_ids * CERT_ID_BYTES > memory_budget:
+        if spilled is None:
+          spilled = SpilledMapping(_encode_domain, _decode_domain, _combine_domains)
+        spilled.spill(domains_data)
+        instrument.count('spilled_runs')
+        recorded_ids = 0
+
+  if spilled is not None:
+    spilled.spill(domains_data)
+    instrument.count('spilled_runs')
+    print(f"[*] Domain aggregates spilled to {len(spilled.runs)} sorted runs")
+    return spilled
   return domains_data
 
 def save_domains_to_csv(domains_data, filename):
   """
   Save normalized domain data to CSV.
 
+  Rows are written in domain order; a SpilledMapping is already sorted and
+  is streamed through its merge instead of being sorted in memory.
+
   Args:
-    domains_data: Dictionary of domain information.
+    domains_data: Dictionary (or SpilledMapping) of domain information.
     filename: Path to save the CSV file to.
   """
   os.makedirs(os.path.dirname(filename), exist_ok=True)
-
-  with open(filename, 'w', newline='') as csvfile:
-    fieldnames = ['domain', 'seen_in_common_name', 'seen_in_name_value',
-                  'certificate_count', 'issuer_count', 'earliest_seen', 'latest_expiry',
-                  'certificate_ids', 'issuers']
+  if isinstance(domains_data, SpilledMapping):
+    items = domains_data.items()
+  else:
+    items = sorted(domains_data.items())
+  total = 0
+
+  fieldnames = ['domain', 'seen_in_common_name', 'seen_in_name_value',
+                'certificate_count', 'issuer_count', 'earliest_seen', 'latest_expiry',
+                'certificate_ids', 'issuers']
+  dataset = f"domains/{os.path.splitext(os.path.basename(filename))[0]}"
+
+  # Rows stream into the snapshot as they are written, so recording keeps
+  # the memory budget of a SpilledMapping
+  with instrument.stage('write'), open(filename, 'w', newline='') as csvfile, \
+       snapshots.recording(dataset, fieldnames) as snapshot:
     writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
 
     writer.writeheader()
-    for domain, data in sorted(domains_data.items()):
+    for domain, data in items:
       row = {
         'domain': data['domain'],
         'seen_in_common_name': data['seen_in_common_name'],
@@ -103,13 +185,17 @@ def save_domains_to_csv(domains_data, filename):
         'issuer_count': len(data['issuers']),
         'earliest_seen': data['earliest_seen'],
         'latest_expiry': data['latest_expiry'],
-        'certificate_ids': ';'.join(data['certificate_ids']),
-        'issuers': ';'.join(data['issuers'])
+        'certificate_ids': ';'.join(sorted(data['certificate_ids'], key=_cert_id_key)),
+        'issuers': ';'.join(sorted(data['issuers']))
       }
       writer.writerow(row)
+      total += 1
+      if snapshot is not None:
+        snapshot.append(row)
 
+  instrument.count('domains', total)
   print(f"[+] Normalized domain data saved to {filename}")
-  print(f"[+] Total domains: {len(domains_data)}")
+  print(f"[+] Total domains: {total}")
 
 def filter_valid_certificates(certificates):
   """
@@ -137,38 +223,101 @@ def filter_valid_certificates(certificates):
   print(f"Found {len(valid_certificates)} valid certificates out of {len(certificates)} total")
   return valid_certificates
 
-def process_raw_json_file(input_file):
+def deduplicate_certificates(certificates, keep_ids=False):
+  """
+  Collapse precertificate/leaf pairs that crt.sh returns as separate entries.
+
+  Entries are keyed on (issuer_ca_id, serial_number); the first entry wins.
+  Entries without a serial number are passed through untouched.
+
+  Args:
+    certificates: List of certificate dictionaries from crt.sh.
+    keep_ids: If True, the surviving entry records every crt.sh ID of its
+      group under 'merged_ids' so they still show up in certificate_ids.
+
+  Returns:
+    List of deduplicated certificate dictionaries.
+  """
+  unique = {}
+  passthrough = []
+
+  for cert in certificates:
+    serial = cert.get('serial_number')
+    if not serial:
+      passthrough.append(cert)
+      continue
+    key = (cert.get('issuer_ca_id'), serial.lower())
+    kept = unique.get(key)
+    if kept is None:
+      unique[key] = dict(cert, merged_ids=[cert.get('id', 'unknown')]) if keep_ids else cert
+    elif keep_ids:
+      kept['merged_ids'].append(cert.get('id', 'unknown'))
+
+  deduplicated = list(unique.values()) + passthrough
+  print(f"Deduplicated {len(certificates)} certificates to {len(deduplicated)} unique")
+  return deduplicated
+
+def process_certificates(data, zone=None, keep_cert_ids=False, memory_budget=None):
+  """
+  Filter, deduplicate and extract domains from already loaded certificates.
+
+  Args:
+    data: List of certificate dictionaries from crt.sh.
+    zone: Optional queried zone to restrict names to.
+    keep_cert_ids: Keep both precertificate and leaf IDs in certificate_ids.
+    memory_budget: Optional approximate aggregate size in bytes before
+      spilling to disk (see extract_domains_from_certificates).
+
+  Returns:
+    Dictionary of normalized domain data.
+  """
+  instrument.count('certs', len(data))
+
+  with instrument.stage('filter'):
+    # Filter for valid certificates
+    valid_certs = filter_valid_certificates(data)
+
+    # Collapse precertificate/leaf pairs before the per-SAN work
+    valid_certs = deduplicate_certificates(valid_certs, keep_ids=keep_cert_ids)
+  instrument.count('certs_unique_valid', len(valid_certs))
+
+  with instrument.stage('aggregate'):
+    return extract_domains_from_certificates(valid_certs, zone, memory_budget)
+
+def process_raw_json_file(input_file, keep_cert_ids=False, memory_budget=None):
   """
   Process a raw JSON file, filter for valid certificates, and extract domains.
 
   Args:
     input_file: Path to the raw JSON file.
+    keep_cert_ids: Keep both precertificate and leaf IDs in certificate_ids.
+    memory_budget: Optional approximate aggregate size in bytes before spilling.
 
   Returns:
     Dictionary of normalized domain data.
   """
   try:
-    with open(input_file, 'r') as f:
+    with instrument.stage('parse'), open(input_file, 'r') as f:
       data = json.load(f)
 
     print(f"Loaded {len(data)} certificates from {input_file}")
 
-    # Filter for valid certificates
-    valid_certs = filter_valid_certificates(data)
-
-    # Extract domains
-    domains_data = extract_domains_from_certificates(valid_certs)
-
-    return domains_data
+    # Extract domains, restricted to the zone the file was queried for
+    zone = zone_from_filename(os.path.basename(input_file))
+    return process_certificates(data, zone, keep_cert_ids, memory_budget)
 
   except (json.JSONDecodeError, FileNotFoundError) as e:
     print(f"Error processing file {input_file}: {str(e)}")
     return {}
 
-def process_all_raw_files():
+def process_all_raw_files(keep_cert_ids=False, memory_budget=None):
   """
   Process all JSON files in the data/raw directory.
 
+  Args:
+    keep_cert_ids: Keep both precertificate and leaf IDs in certificate_ids.
+    memory_budget: Optional approximate aggregate size in bytes before spilling.
+
   Returns:
     Combined dictionary of normalized domain data from all files.
   """
@@ -185,12 +334,40 @@ def process_all_raw_files():
   print(f"Found {len(json_files)} JSON files to process")
   for json_file in json_files:
     print(f"\nProcessing {json_file}...")
-    domains_data = process_raw_json_file(json_file)
+    domains_data = process_raw_json_file(json_file, keep_cert_ids, memory_budget)
     if domains_data:
       base_filename = os.path.splitext(os.path.basename(json_file))[0]
       csv_output = f"data/csv/{base_filename}.csv"
       save_domains_to_csv(domains_data, csv_output)
 
+def process_store_zones(store, zones=None, keep_cert_ids=False, memory_budget=None):
+  """
+  Process zones straight from the certificate store, writing one CSV per zone.
+
+  Args:
+    store: CertificateStore to read from.
+    zones: Zones to process (default: every zone in the store).
+    keep_cert_ids: Keep both precertificate and leaf IDs in certificate_ids.
+    memory_budget: Optional approximate aggregate size in bytes before spilling.
+  """
+  zones = zones or store.zones()
+  if not zones:
+    print(f"No zones found in {store.root}")
+    return
+
+  print(f"Found {len(zones)} zones to process in {store.root}")
+  for zone in zones:
+    print(f"\nProcessing {zone}...")
+    with instrument.stage('parse'):
+      data = store.certificates(zone)
+    if not data:
+      print(f"Zone {zone} is not in {store.root}")
+      continue
+    print(f"Loaded {len(data)} certificates for {zone}")
+    domains_data = process_certificates(data, zone, keep_cert_ids, memory_budget)
+    if domains_data:
+      save_domains_to_csv(domains_data, f"data/csv/domain.{zone}.csv")
+
 def main():
   parser = argparse.ArgumentParser(description='crt.sh Certificate Search Client')
   group = parser.add_mutually_exclusive_group(required=True)
@@ -198,40 +375,107 @@ def main():
   group.add_argument('-p', '--process-file', help='Process an existing raw JSON file')
   group.add_argument('-a', '--process-all', action='store_true',
     help='Process all JSON files in data/raw directory')
+  group.add_argument('--organization', nargs='+', metavar='NAME',
+    help='Search certificates by subject organization (O=)')
+  group.add_argument('--agencies', action='store_true',
+    help='Search certificates by organization for every agency in data/us-fed-gov-agencies.csv')
+  group.add_argument('--identity', nargs='+', metavar='NAME',
+    help='Search certificates by identity (CN/SAN, %% wildcards), e.g. %%.cdc.gov')
+  group.add_argument('--issuer', nargs='+', metavar='CAID', help='Search certificates by crt.sh issuer CA id')
+  group.add_argument('--fingerprint', nargs='+', metavar='SHA256', help='Look up certificates by SHA-256 fingerprint')
+  parser.add_argument('--store', nargs='?', const=STORE_DIR, default=None, metavar='DIR',
+    help=f'Keep raw results in the deduplicated certificate store at DIR instead of data/raw JSON; '
+         f'-d ingests into it, -a/-p read from it (-p then takes a zone) (default: {STORE_DIR})')
+  parser.add_argument('--cache', action='store_true',
+    help='Serve searches already in the certificate store instead of refetching them; query modes always do')
+  parser.add_argument('--cache-max-age', type=float, default=None, metavar='HOURS',
+    help='Refetch stored searches older than HOURS (default: never)')
+  parser.add_argument('--keep-cert-ids', action='store_true',
+    help='Keep both precertificate and leaf IDs when deduplicating certificates')
+  parser.add_argument('--memory-budget', type=int, default=None, metavar='MB',
+    help='Spill domain aggregates to sorted on-disk runs above roughly MB megabytes')
+  instrument.add_arguments(parser)
+  snapshots.add_arguments(parser)
   args = parser.parse_args()
 
-  if not (args.domain or args.process_file or args.process_all):
-    parser.print_help()
-    return
-
-  client = CrtshClient()
-  if args.domain:
-    try:
-      results = client.search_domain(args.domain)
-      if results:
-        output_file = f"data/raw/domain.{args.domain}.json"
-        save_raw_json(results, output_file)
-      else:
-        print(f"No results found for domain {args.domain}")
+  queries = None
+  if args.organization:
+    queries = [organization_query(name) for name in args.organization]
+  elif args.agencies:
+    queries = agency_organization_queries()
+  elif args.identity:
+    queries = [identity_query(name) for name in args.identity]
+  elif args.issuer:
+    queries = [issuer_query(ca_id) for ca_id in args.issuer]
+  elif args.fingerprint:
+    queries = [fingerprint_query(sha256) for sha256 in args.fingerprint]
+
+  if args.snapshots:
+    snapshots.start(args.snapshots)
+  memory_budget = args.memory_budget * 1024 * 1024 if args.memory_budget else None
+  with instrument.instrumented_run('main', args.report, args.profile):
+    # Searches are cached in the certificate store; query results live only
+    # there, and data/raw/queries gets their ID lists
+    store = CertificateStore(args.store or STORE_DIR) if args.store or args.cache or queries else None
+    max_age = args.cache_max_age * 3600 if args.cache_max_age is not None else None
+    client = CrtshClient(store if args.cache or queries else None, max_age)
+    if queries:
+      with instrument.stage('fetch'):
+        results_by_query = client.search_many(queries)
+      with instrument.stage('write'):
+        for key, results in results_by_query.items():
+          instrument.count('certs', len(results))
+          if results:
+            slug = ''.join(c if c.isalnum() or c in '.-' else '_' for c in key)
+            save_raw_json({'query': key, 'certificate_ids': [cert['id'] for cert in results]},
+                          f"data/raw/queries/{slug}.json")
+
+    elif args.domain:
+      try:
+        with instrument.stage('fetch'):
+          results = client.search_domain(args.domain)
+        instrument.count('certs', len(results))
+        if results:
+          with instrument.stage('write'):
+            if args.store:
+              new = store.ingest(normalize_domain(args.domain) or args.domain, results)
+              print(f"[+] Stored {len(results)} results ({new} new certificates) in {store.root}")
+            else:
+              save_raw_json(results, f"data/raw/domain.{args.domain}.json")
+            if store is not None:
+              store.save()
+        else:
+          print(f"No results found for domain {args.domain}")
+          sys.exit(1)
+      except Exception as e:
+        print(f"Error searching for domain {args.domain}: {str(e)}")
         sys.exit(1)
-    except Exception as e:
-      print(f"Error searching for domain {args.domain}: {str(e)}")
-      sys.exit(1)
-
-  elif args.process_file:
-    input_file = args.process_file
-    base_filename = os.path.splitext(os.path.basename(input_file))[0]
-    domains_data = process_raw_json_file(input_file)
-    if domains_data:
-      csv_output = f"data/csv/{base_filename}.csv"
-      save_domains_to_csv(domains_data, csv_output)
 
-  elif args.process_all:
-    combined_domains = process_all_raw_files()
-    if combined_domains:
-      timestamp = datetime.now().strftime("%Y%m%d")
-      csv_output = f"data/csv/all_domains_{timestamp}.csv"
-      save_domains_to_csv(combined_domains, csv_output)
+    elif args.process_file and args.store:
+      zone = zone_from_filename(os.path.basename(args.process_file)) or normalize_domain(args.process_file)
+      process_store_zones(store, [zone], args.keep_cert_ids, memory_budget)
+
+    elif args.process_file:
+      input_file = args.process_file
+      base_filename = os.path.splitext(os.path.basename(input_file))[0]
+      domains_data = process_raw_json_file(input_file, args.keep_cert_ids, memory_budget)
+      if domains_data:
+        csv_output = f"data/csv/{base_filename}.csv"
+        save_domains_to_csv(domains_data, csv_output)
+
+    elif args.process_all and args.store:
+      process_store_zones(store, None, args.keep_cert_ids, memory_budget)
+
+    elif args.process_all:
+      combined_domains = process_all_raw_files(args.keep_cert_ids, memory_budget)
+      if combined_domains:
+        timestamp = datetime.now().strftime("%Y%m%d")
+        csv_output = f"data/csv/all_domains_{timestamp}.csv"
+        save_domains_to_csv(combined_domains, csv_output)
+
+    cache_info = normalize_domain.cache_info()
+    instrument.count('normalize_cache_hits', cache_info.hits)
+    instrument.count('normalize_cache_misses', cache_info.misses)
 
 if __name__ == '__main__':
   main()
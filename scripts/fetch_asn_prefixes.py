@@ -19,32 +19,14 @@ from datetime import datetime, timezone
 
 import requests
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src import agency_registry, instrument, snapshots
+
 RIPE_STAT_URL = "https://stat.ripe.net/data/announced-prefixes/data.json"
 REQUEST_DELAY = 1.0
 REQUEST_TIMEOUT = 30
 
-SOURCE_FILES = {
-    "fed-gov":    "data/us-fed-gov-agencies.csv",
-    "state-gov":  "data/us-state-gov-agencies.csv",
-    "city-gov":   "data/us-city-gov-agencies.csv",
-    "academic":   "data/us-academics.csv",
-    "hospitals":  "data/us-hospital-systems.csv",
-    "insurance":  "data/us-health-insurance.csv",
-    "pbm":        "data/us-pharmacy-benefit-managers.csv",
-    "health-it":  "data/us-health-it-vendors.csv",
-}
-
-# (abbreviation_col, name_col, asn_col) — None means same as abbreviation
-COLUMN_MAPS = {
-    "fed-gov":   ("abbrievations", "fedagency", "asn"),
-    "state-gov": ("stategov", None, "asn"),
-    "city-gov":  ("citygov", "citygov", "asn"),
-    "academic":  ("academic", None, "asn"),
-    "hospitals": ("hospital", "hospital", "asn"),
-    "insurance": ("insurer", "insurer", "asn"),
-    "pbm":       ("pbm", "pbm", "asn"),
-    "health-it": ("vendor", "vendor", "asn"),
-}
+SOURCE_FILES = {category: f"data/{source['file']}" for category, source in agency_registry.SOURCES.items()}
 
 RIR_DELEGATION_FILES = [
     "delegated-arin-extended-latest.txt",
@@ -55,27 +37,6 @@ RIR_DELEGATION_FILES = [
 ]
 
 
-def load_agencies(filepath, abbrev_col, name_col, asn_col):
-    agencies = []
-    with open(filepath, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            asn_raw = row.get(asn_col, "").strip()
-            if not asn_raw:
-                continue
-            asn_num = asn_raw.lstrip("AS").strip()
-            if not asn_num.isdigit():
-                continue
-            abbrev = row.get(abbrev_col, "").strip() if abbrev_col else ""
-            name = row.get(name_col, "").strip() if name_col else abbrev
-            agencies.append({
-                "abbreviation": abbrev,
-                "agency": name,
-                "asn": asn_num,
-            })
-    return agencies
-
-
 # ── RIR enrichment ────────────────────────────────────────────────────────────
 
 def parse_autnums(filepath):
@@ -190,36 +151,36 @@ def write_csv(output_path, rows, has_rir):
         writer.writeheader()
         writer.writerows(rows)
     print(f"[+] Wrote {len(rows)} rows to {output_path}")
+    dataset = "prefixes/" + os.path.basename(output_path).removesuffix("-prefixes.csv")
+    snapshots.record(dataset, fieldnames, rows)
 
 
 # ── Main processing ───────────────────────────────────────────────────────────
 
-def process_category(category, source_path, output_path, autnums, delegation):
-    abbrev_col, name_col, asn_col = COLUMN_MAPS[category]
-    agencies = load_agencies(source_path, abbrev_col, name_col, asn_col)
-    print(f"[*] {category}: {len(agencies)} ASN entries from {source_path}")
+def process_category(category, registry, output_path, autnums, delegation):
+    agencies = registry.agencies(category)
+    print(f"[*] {category}: {len(agencies)} ASN entries from {registry.path(category)}")
 
     has_rir = autnums is not None or delegation is not None
     autnums = autnums or {}
     delegation = delegation or {}
 
-    seen_asns = set()
     rows = []
     collected_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
     for entry in agencies:
-        asn = entry["asn"]
-        if asn in seen_asns:
-            continue
-        seen_asns.add(asn)
-
+        asn = str(entry["asn"])
         rir_info = delegation.get(asn, {})
         autnum = autnums.get(asn, ("", ""))
 
         print(f"  -> Querying AS{asn} ({entry['agency'] or entry['abbreviation']})")
-        prefixes = fetch_prefixes(asn)
+        with instrument.stage("fetch"):
+            prefixes = fetch_prefixes(asn)
+        instrument.count("asns")
         if prefixes is None:
+            instrument.count("fetch_failures")
             prefixes = []
+        instrument.count("prefixes", len(prefixes))
         print(f"     {len(prefixes)} prefixes")
 
         if not prefixes:
@@ -264,9 +225,10 @@ def process_category(category, source_path, output_path, autnums, delegation):
         if prefixes:
             time.sleep(REQUEST_DELAY)
 
-    rows.sort(key=lambda r: (r["abbreviation"], r["asn"], r["prefix"]))
-    write_csv(output_path, rows, has_rir)
-    return len(rows)
+    with instrument.stage("write"):
+        rows.sort(key=lambda r: (r["abbreviation"], r["asn"], r["prefix"]))
+        write_csv(output_path, rows, has_rir)
+    return rows
 
 
 def main():
@@ -275,7 +237,8 @@ def main():
         "--category",
         choices=list(SOURCE_FILES.keys()) + ["all"],
         default="all",
-        help="Which agency category to process (default: all)",
+        help="Which agency category to process; all skips cloud, which only backs the hosting cross-check "
+             "(default: all)",
     )
     parser.add_argument(
         "--data-dir",
@@ -288,24 +251,34 @@ def main():
         help="Path to directory containing RIR delegation files and autnums.html for enrichment. "
              "E.g. ../rir-backup/data/raw. If omitted, enrichment columns are skipped.",
     )
+    instrument.add_arguments(parser)
+    snapshots.add_arguments(parser)
     args = parser.parse_args()
 
     autnums, delegation = None, None
-    if args.rir_data_dir:
-        if not os.path.isdir(args.rir_data_dir):
-            print(f"[!] --rir-data-dir not found: {args.rir_data_dir}", file=sys.stderr)
-            sys.exit(1)
-        autnums, delegation = load_rir_enrichment(args.rir_data_dir)
-
-    categories = list(SOURCE_FILES.keys()) if args.category == "all" else [args.category]
-    total = 0
-    for category in categories:
-        source = os.path.join(args.data_dir, SOURCE_FILES[category].removeprefix("data/"))
-        output = os.path.join(args.data_dir, "asn", f"{category}-prefixes.csv")
-        if not os.path.exists(source):
-            print(f"[!] Source file not found: {source}", file=sys.stderr)
-            continue
-        total += process_category(category, source, output, autnums, delegation)
+    if args.rir_data_dir and not os.path.isdir(args.rir_data_dir):
+        print(f"[!] --rir-data-dir not found: {args.rir_data_dir}", file=sys.stderr)
+        sys.exit(1)
+    if args.snapshots:
+        snapshots.start(args.snapshots)
+    with instrument.instrumented_run("fetch_asn_prefixes", args.report, args.profile):
+        if args.rir_data_dir:
+            with instrument.stage("parse"):
+                autnums, delegation = load_rir_enrichment(args.rir_data_dir)
+
+        with instrument.stage("parse"):
+            registry = agency_registry.load(args.data_dir)
+        registry.report_issues()
+
+        categories = agency_registry.ORGANIZATION_CATEGORIES if args.category == "all" else [args.category]
+        total = 0
+        for category in categories:
+            output = os.path.join(args.data_dir, "asn", f"{category}-prefixes.csv")
+            if not os.path.exists(registry.path(category)):
+                print(f"[!] Source file not found: {registry.path(category)}", file=sys.stderr)
+                continue
+            total += len(process_category(category, registry, output, autnums, delegation))
+        instrument.count("rows_written", total)
 
     print(f"\n[+] Done. Total rows written: {total}")
 
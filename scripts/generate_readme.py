@@ -4,13 +4,17 @@ Reads collected ASN prefix CSVs and httpx tech CSVs, then updates the
 auto-generated sections of README.md between <!-- BEGIN:name --> markers.
 """
 
+import argparse
 import csv
+import hashlib
 import ipaddress
+import itertools
 import json
 import os
 import re
 import sys
 from collections import Counter, defaultdict
+from collections.abc import Iterable, Iterator
 from datetime import datetime, timezone
 from pathlib import Path
 
@@ -19,17 +23,8 @@ README_PATH = REPO_ROOT / "README.md"
 ASN_DIR = REPO_ROOT / "data" / "asn"
 TECH_DIR = REPO_ROOT / "data" / "tech"
 
-CATEGORIES = {
-    "fed-gov":   ("data/us-fed-gov-agencies.csv",           "Federal Agencies"),
-    "state-gov": ("data/us-state-gov-agencies.csv",         "State Governments"),
-    "city-gov":  ("data/us-city-gov-agencies.csv",          "City Governments"),
-    "hospitals": ("data/us-hospital-systems.csv",           "Hospital Systems"),
-    "insurance": ("data/us-health-insurance.csv",           "Health Insurers"),
-    "pbm":       ("data/us-pharmacy-benefit-managers.csv",  "Pharmacy Benefit Managers"),
-    "health-it": ("data/us-health-it-vendors.csv",          "Health IT Vendors"),
-    "academic":  ("data/us-academics.csv",                  "Academic Institutions"),
-}
-
+sys.path.insert(0, str(REPO_ROOT))
+from src import agency_registry, hosting, instrument, prefix_overlap
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
 
@@ -56,42 +51,88 @@ def fmt_exact(n: int) -> str:
     return f"{n:,}" if n else "—"
 
 
-def md_table(headers: list[str], rows: list[list], alignments: list[str] | None = None) -> str:
-    if not rows:
-        return "_No data yet._\n"
+_JUSTIFY = {"left": str.ljust, "right": str.rjust, "center": str.center}
+_SEPARATORS = {"left": ":---", "right": "---:", "center": ":---:"}
+
+
+def iter_md_table(headers: list[str], rows: Iterable[list], alignments: list[str] | None = None,
+                  compact: bool = False) -> Iterator[str]:
+    """
+    Yield the lines of a Markdown table (without trailing newlines).
+
+    Every cell is stringified exactly once. Padded output needs all column
+    widths first, so rows are buffered as strings; compact output skips
+    padding and streams rows straight through, which suits very large
+    tables. Yields nothing when there are no rows.
+    """
     alignments = alignments or ["left"] * len(headers)
-    sep_map = {"left": ":---", "right": "---:", "center": ":---:"}
-    seps = [sep_map.get(a, ":---") for a in alignments]
-
-    col_widths = [max(len(str(h)), len(seps[i])) for i, h in enumerate(headers)]
-    for row in rows:
-        for i, cell in enumerate(row):
-            col_widths[i] = max(col_widths[i], len(str(cell)))
-
-    def pad(s: str, width: int, align: str) -> str:
-        if align == "right":
-            return s.rjust(width)
-        if align == "center":
-            return s.center(width)
-        return s.ljust(width)
-
-    def fmt_row(cells: list) -> str:
-        return "| " + " | ".join(
-            pad(str(c), col_widths[i], alignments[i]) for i, c in enumerate(cells)
+    seps = [_SEPARATORS.get(a, ":---") for a in alignments]
+    rows = iter(rows)
+
+    if compact:
+        first = next(rows, None)
+        if first is None:
+            return
+        yield "| " + " | ".join(map(str, headers)) + " |"
+        yield "| " + " | ".join(seps) + " |"
+        yield "| " + " | ".join(map(str, first)) + " |"
+        for row in rows:
+            yield "| " + " | ".join(map(str, row)) + " |"
+        return
+
+    str_rows = [tuple(map(str, row)) for row in rows]
+    if not str_rows:
+        return
+    str_headers = tuple(map(str, headers))
+    widths = [max(len(h), len(sep)) for h, sep in zip(str_headers, seps)]
+    # Rows may be shorter than the header; like the old renderer, they only
+    # widen the columns they have
+    for i, column in enumerate(itertools.zip_longest(*str_rows, fillvalue="")):
+        widths[i] = max(widths[i], max(map(len, column)))
+    justify = [_JUSTIFY.get(a, str.ljust) for a in alignments]
+
+    if str.center in justify:
+        def fmt_row(cells: tuple[str, ...]) -> str:
+            return "| " + " | ".join([j(c, w) for j, c, w in zip(justify, cells, widths)]) + " |"
+    else:
+        # One format string per table: '<' and '>' pad exactly like ljust and
+        # rjust, while '^' splits odd padding differently from str.center.
+        row_format = "| " + " | ".join(
+            f"{{:{'>' if j is str.rjust else '<'}{w}}}" for j, w in zip(justify, widths)
         ) + " |"
 
-    lines = [
-        fmt_row(headers),
-        "| " + " | ".join(s.ljust(col_widths[i]) for i, s in enumerate(seps)) + " |",
-    ]
-    for row in rows:
-        lines.append(fmt_row(row))
+        def fmt_row(cells: tuple[str, ...]) -> str:
+            if len(cells) != len(widths):
+                return "| " + " | ".join([j(c, w) for j, c, w in zip(justify, cells, widths)]) + " |"
+            return row_format.format(*cells)
+
+    yield fmt_row(str_headers)
+    yield "| " + " | ".join([s.ljust(w) for s, w in zip(seps, widths)]) + " |"
+    yield from map(fmt_row, str_rows)
+
+
+def md_table(headers: list[str], rows: Iterable[list], alignments: list[str] | None = None,
+             compact: bool = False) -> str:
+    lines = list(iter_md_table(headers, rows, alignments, compact))
+    if not lines:
+        return "_No data yet._\n"
     return "\n".join(lines) + "\n"
 
 
 # ── Data loading ──────────────────────────────────────────────────────────────
 
+# Prefix rows handed over in memory (e.g. by the pipeline runner) instead of
+# being re-read from data/asn
+_preloaded_prefixes: dict[str, list[dict]] = {}
+
+
+def preload_prefix_rows(category: str, rows: list[dict]) -> None:
+    _preloaded_prefixes[category] = rows
+
+
 def load_prefix_csv(category: str) -> list[dict]:
+    if category in _preloaded_prefixes:
+        return _preloaded_prefixes[category]
     path = ASN_DIR / f"{category}-prefixes.csv"
     if not path.exists():
         return []
@@ -99,12 +140,8 @@ def load_prefix_csv(category: str) -> list[dict]:
         return list(csv.DictReader(f))
 
 
-def load_source_csv(rel_path: str) -> list[dict]:
-    path = REPO_ROOT / rel_path
-    if not path.exists():
-        return []
-    with open(path, newline="", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
+def load_registry() -> agency_registry.AgencyRegistry:
+    return agency_registry.load(str(REPO_ROOT / "data"))
 
 
 def _empty_bucket() -> dict:
@@ -166,16 +203,19 @@ def build_category_stats(category: str) -> dict:
 
 # ── Section generators ────────────────────────────────────────────────────────
 
+OVERVIEW_CATEGORIES = agency_registry.ORGANIZATION_CATEGORIES
+
+
 def section_overview_table() -> str:
     headers = ["Category", "Organizations", "ASNs", "IPv4 Prefixes", "IPv6 Prefixes", "Est. IPv4 Addresses"]
     alignments = ["left", "right", "right", "right", "right", "right"]
     rows = []
-    for cat, (src, label) in CATEGORIES.items():
-        src_rows = load_source_csv(src)
-        src_asns = {r.get("asn", "") for r in src_rows if r.get("asn", "").lstrip("AS").isdigit()}
+    registry = load_registry()
+    for cat in OVERVIEW_CATEGORIES:
+        src_asns = registry.asns(cat)
         stats = build_category_stats(cat)
         rows.append([
-            f"**{label}**",
+            f"**{registry.label(cat)}**",
             fmt_exact(len(src_asns)),
             fmt_exact(stats["asns"]) if stats["asns"] else f"_{len(src_asns)} tracked_",
             fmt_exact(stats["ipv4_prefixes"]),
@@ -186,17 +226,12 @@ def section_overview_table() -> str:
 
 
 def section_fed_gov_table() -> str:
-    src_rows = load_source_csv("data/us-fed-gov-agencies.csv")
-    if not src_rows:
+    orgs = load_registry().organizations("fed-gov", key="abbreviation")
+    if not orgs:
         return "_Source data not found._\n"
 
-    # Build dict keyed by abbreviation; first occurrence wins for agency name
-    by_abbrev: dict[str, dict] = {}
-    for r in src_rows:
-        abbrev = r.get("abbrievations", "").strip()
-        agency = r.get("fedagency", "").strip()
-        if abbrev and abbrev not in by_abbrev:
-            by_abbrev[abbrev] = {"agency": agency, **_empty_bucket()}
+    # Keyed by abbreviation; first occurrence wins for agency name
+    by_abbrev = {abbrev: {"agency": entry["agency"], **_empty_bucket()} for abbrev, entry in orgs.items()}
 
     # Overlay collected prefix data
     for r in load_prefix_csv("fed-gov"):
@@ -214,19 +249,13 @@ def section_fed_gov_table() -> str:
 
 
 def section_state_gov_table() -> str:
-    src_rows = load_source_csv("data/us-state-gov-agencies.csv")
-    if not src_rows:
+    orgs = load_registry().organizations("state-gov")
+    if not orgs:
         return "_Source data not found._\n"
 
-    by_org: dict[str, dict] = {}
-    org_state: dict[str, str] = {}
-    for r in src_rows:
-        org = r.get("stategov", "").strip()
-        state = r.get("state", "").strip()
-        if org:
-            org_state[org] = state
-            if org not in by_org:
-                by_org[org] = _empty_bucket()
+    by_org = {org: _empty_bucket() for org in orgs}
+    # The last row wins when an organization is listed under several states
+    org_state = {entry["agency"]: entry["state"] for entry in load_registry().entries["state-gov"] if entry["agency"]}
 
     for r in load_prefix_csv("state-gov"):
         org = r.get("agency") or r.get("abbreviation", "")
@@ -243,19 +272,13 @@ def section_state_gov_table() -> str:
 
 
 def section_city_gov_table() -> str:
-    src_rows = load_source_csv("data/us-city-gov-agencies.csv")
-    if not src_rows:
+    orgs = load_registry().organizations("city-gov")
+    if not orgs:
         return "_Source data not found._\n"
 
-    by_org: dict[str, dict] = {}
-    city_state: dict[str, str] = {}
-    for r in src_rows:
-        org = r.get("citygov", "").strip()
-        state = r.get("state", "").strip()
-        if org:
-            city_state[org] = state
-            if org not in by_org:
-                by_org[org] = _empty_bucket()
+    by_org = {org: _empty_bucket() for org in orgs}
+    # The last row wins when an organization is listed under several states
+    city_state = {entry["agency"]: entry["state"] for entry in load_registry().entries["city-gov"] if entry["agency"]}
 
     for r in load_prefix_csv("city-gov"):
         org = r.get("agency") or r.get("abbreviation", "")
@@ -271,16 +294,12 @@ def section_city_gov_table() -> str:
     return md_table(headers, table_rows, alignments)
 
 
-def section_health_table(category: str, src_col: str, src_file: str) -> str:
-    src_rows = load_source_csv(src_file)
-    if not src_rows:
+def section_health_table(category: str) -> str:
+    orgs = load_registry().organizations(category)
+    if not orgs:
         return "_Source data not found._\n"
 
-    by_org: dict[str, dict] = {}
-    for r in src_rows:
-        org = r.get(src_col, "").strip()
-        if org and org not in by_org:
-            by_org[org] = _empty_bucket()
+    by_org = {org: _empty_bucket() for org in orgs}
 
     for r in load_prefix_csv(category):
         org = r.get("agency") or r.get("abbreviation", "")
@@ -311,7 +330,7 @@ def section_tech_summary() -> str:
     tech_counter: Counter = Counter()
     domain_tech: dict[str, set] = defaultdict(set)
 
-    for csv_file in TECH_DIR.glob("*.csv"):
+    for csv_file in sorted(TECH_DIR.glob("*.csv")):
         domain = csv_file.stem.removeprefix("domain.").removesuffix("_httpx")
         try:
             with open(csv_file, newline="", encoding="utf-8") as f:
@@ -345,6 +364,86 @@ def section_tech_summary() -> str:
     return md_table(headers, table_rows, alignments)
 
 
+HOSTING_TOP_PROVIDERS = 6
+
+
+def section_hosting_table() -> str:
+    if not TECH_DIR.exists():
+        return "_No technology data collected yet._\n"
+
+    cloud_index = hosting.load_cloud_index(str(ASN_DIR / "cloud-prefixes.csv"))
+    results = hosting.classify_tech_dir(str(TECH_DIR), cloud_index=cloud_index)
+    per_zone, totals = hosting.provider_breakdown(results)
+    total_hosts = sum(t["hosts"] for t in totals.values())
+    if not total_hosts:
+        return "_No technology data collected yet._\n"
+
+    # The IP cross-check needs data/asn/cloud-prefixes.csv; omit the column until it exists
+    headers = ["Provider", "Hosts", "Share", "Zones"] + (["IP-confirmed"] if cloud_index else [])
+    summary_rows = [
+        [provider, t["hosts"], f"{t['hosts'] / total_hosts:.1%}", t["zones"]]
+        + ([t["ip_confirmed"] or "—"] if cloud_index else [])
+        for provider, t in sorted(totals.items(), key=lambda kv: (-kv[1]["hosts"], kv[0]))
+    ]
+    summary = md_table(headers, summary_rows, ["left"] + ["right"] * (len(headers) - 1))
+
+    top = [p for p, _ in sorted(totals.items(), key=lambda kv: (-kv[1]["hosts"], kv[0]))
+           if p != hosting.UNCLASSIFIED][:HOSTING_TOP_PROVIDERS]
+    zone_rows = []
+    for zone, counts in sorted(per_zone.items(), key=lambda kv: (-sum(kv[1].values()), kv[0])):
+        hosts = sum(counts.values())
+        if not hosts:
+            continue
+        other = hosts - sum(counts[p] for p in top) - counts[hosting.UNCLASSIFIED]
+        zone_rows.append([zone, hosts, *[counts[p] or "—" for p in top], other or "—",
+                          counts[hosting.UNCLASSIFIED] or "—"])
+    zones = md_table(["Zone", "Hosts", *top, "Other", hosting.UNCLASSIFIED], zone_rows,
+                     ["left", "right", *["right"] * (len(top) + 2)])
+    return f"{summary}\n<details>\n<summary>Per-zone breakdown ({len(zone_rows)} zones)</summary>\n\n{zones}\n</details>\n"
+
+
+PREFIX_ANOMALY_LABELS = {
+    "moas":          "Same prefix from several origin ASNs",
+    "more-specific": "More-specific of another ASN's prefix",
+    "origin-change": "Origin ASN changed since the previous run",
+    "withdrawn":     "Withdrawn since the previous run",
+    "new":           "New since the previous run",
+}
+PREFIX_ANOMALY_ROWS = 100
+
+
+def section_prefix_anomalies() -> str:
+    path = ASN_DIR / Path(prefix_overlap.REPORT_PATH).name
+    if not path.exists():
+        return "_No prefix analysis yet._\n"
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+
+    counts = Counter((r["kind"], r["same_organization"]) for r in rows)
+    summary_rows = []
+    for kind in prefix_overlap.KINDS:
+        total = sum(n for (k, _), n in counts.items() if k == kind)
+        if kind in ("moas", "more-specific"):
+            summary_rows.append([PREFIX_ANOMALY_LABELS[kind], fmt_exact(total), fmt_exact(counts[(kind, "no")])])
+        else:
+            summary_rows.append([PREFIX_ANOMALY_LABELS[kind], fmt_exact(total), "—"])
+    summary = md_table(["Finding", "Count", "Between Organizations"], summary_rows, ["left", "right", "right"])
+
+    # Overlaps inside one organization (e.g. several DoD ASNs) are routine; list the rest
+    cross = [r for r in rows if r["same_organization"] == "no"]
+    if not cross:
+        return summary
+    detail_rows = [
+        [r["prefix"], r["asn"], r["agency"], r["other_prefix"], r["other_asn"], r["other_agency"]]
+        for r in cross[:PREFIX_ANOMALY_ROWS]
+    ]
+    details = md_table(["Prefix", "ASN", "Organization", "Covering Prefix", "Covering ASN", "Covering Organization"],
+                       detail_rows)
+    shown = f"first {PREFIX_ANOMALY_ROWS} of {len(cross)}" if len(cross) > PREFIX_ANOMALY_ROWS else f"{len(cross)}"
+    return (f"{summary}\n<details>\n<summary>Overlaps between organizations ({shown})</summary>\n\n"
+            f"{details}\n</details>\n")
+
+
 def section_timestamp() -> str:
     ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
     return f"_Last updated: {ts}_\n"
@@ -363,34 +462,163 @@ SECTION_GENERATORS = {
     "fed-gov-table":    section_fed_gov_table,
     "state-gov-table":  section_state_gov_table,
     "city-gov-table":   section_city_gov_table,
-    "hospitals-table":  lambda: section_health_table("hospitals",  "hospital",  "data/us-hospital-systems.csv"),
-    "insurance-table":  lambda: section_health_table("insurance",  "insurer",   "data/us-health-insurance.csv"),
-    "pbm-table":        lambda: section_health_table("pbm",        "pbm",       "data/us-pharmacy-benefit-managers.csv"),
-    "health-it-table":  lambda: section_health_table("health-it",  "vendor",    "data/us-health-it-vendors.csv"),
+    "hospitals-table":  lambda: section_health_table("hospitals"),
+    "insurance-table":  lambda: section_health_table("insurance"),
+    "pbm-table":        lambda: section_health_table("pbm"),
+    "health-it-table":  lambda: section_health_table("health-it"),
     "tech-table":       section_tech_summary,
+    "hosting-table":    section_hosting_table,
+    "prefix-anomalies": section_prefix_anomalies,
 }
 
 
-def update_readme(path: Path) -> None:
-    text = path.read_text(encoding="utf-8")
+def _source_inputs(category: str) -> list[str]:
+    source = agency_registry.SOURCES[category]["file"]
+    return [f"data/{source}", f"data/asn/{category}-prefixes.csv", "src/agency_registry.py"]
+
+
+# Files each section reads, relative to REPO_ROOT (globs allowed). A section is
+# only re-rendered when the hash of these files (or of this script) changes.
+SECTION_INPUTS = {
+    "timestamp":        [],
+    "overview-table":   [f"data/{agency_registry.SOURCES[cat]['file']}" for cat in OVERVIEW_CATEGORIES]
+                        + [f"data/asn/{cat}-prefixes.csv" for cat in OVERVIEW_CATEGORIES]
+                        + ["src/agency_registry.py"],
+    "fed-gov-table":    _source_inputs("fed-gov"),
+    "state-gov-table":  _source_inputs("state-gov"),
+    "city-gov-table":   _source_inputs("city-gov"),
+    "hospitals-table":  _source_inputs("hospitals"),
+    "insurance-table":  _source_inputs("insurance"),
+    "pbm-table":        _source_inputs("pbm"),
+    "health-it-table":  _source_inputs("health-it"),
+    "tech-table":       ["data/tech/*.csv"],
+    "hosting-table":    ["data/tech/*.csv", "data/asn/cloud-prefixes.csv", "src/hosting.py"],
+    "prefix-anomalies": ["data/asn/prefix-anomalies.csv", "src/prefix_overlap.py"],
+}
 
-    def replace(m: re.Match) -> str:
+SECTION_CACHE_PATH = REPO_ROOT / "data" / "cache" / "readme-sections.json"
+
+
+def section_inputs_hash(name: str) -> str:
+    digest = hashlib.sha256(Path(__file__).read_bytes())
+    for pattern in SECTION_INPUTS.get(name, []):
+        for input_path in sorted(REPO_ROOT.glob(pattern)):
+            digest.update(input_path.relative_to(REPO_ROOT).as_posix().encode("utf-8"))
+            digest.update(input_path.read_bytes())
+    return digest.hexdigest()
+
+
+def load_section_cache(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_section_cache(path: Path, cache: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(cache, indent=2) + "\n", encoding="utf-8")
+
+
+def render_section(name: str, cache: dict) -> str:
+    """Render one section, reusing the cached Markdown if its inputs are unchanged."""
+    inputs_hash = section_inputs_hash(name)
+    cached = cache.get(name)
+    if cached and cached.get("hash") == inputs_hash:
+        instrument.count("section_cache_hits")
+        return cached["content"]
+    with instrument.stage(f"section:{name}"):
+        content = SECTION_GENERATORS[name]()
+    instrument.count("sections_rendered")
+    cache[name] = {"hash": inputs_hash, "content": content}
+    return content
+
+
+def update_readme(path: Path, sections: list[str] | None = None, check: bool = False,
+                  cache_path: Path | None = SECTION_CACHE_PATH) -> list[str]:
+    """
+    Re-render README sections and substitute the ones whose content changed.
+
+    Args:
+        path: README to update.
+        sections: Section names to consider (default: every marker in the README).
+        check: Report drift without writing the README or the cache.
+        cache_path: Rendered-section cache; None disables caching.
+
+    Returns:
+        Names of sections whose rendered content differs from the README.
+    """
+    with instrument.stage("parse"):
+        text = path.read_text(encoding="utf-8")
+
+    current = {}
+    for m in MARKER_RE.finditer(text):
         name = m.group(1)
-        gen = SECTION_GENERATORS.get(name)
-        if gen is None:
+        if name not in SECTION_GENERATORS:
             print(f"  [~] Unknown section: {name}", file=sys.stderr)
+            continue
+        current[name] = m.group(2).removeprefix("\n")
+
+    targets = [name for name in (sections or current) if name in current]
+    for name in sections or []:
+        if name not in current:
+            print(f"  [~] Section not found in {path.name}: {name}", file=sys.stderr)
+
+    cache = load_section_cache(cache_path) if cache_path else {}
+    rendered = {name: render_section(name, cache) for name in targets if name != "timestamp"}
+    drifted = [name for name, content in rendered.items() if content != current[name]]
+
+    # The timestamp only moves when a data section actually changed, unless asked for
+    if "timestamp" in targets and (drifted or sections):
+        rendered["timestamp"] = section_timestamp()
+        if not check:
+            drifted.append("timestamp")
+
+    if check:
+        for name in drifted:
+            print(f"  [!] Out of date: {name}")
+        return drifted
+
+    if cache_path:
+        save_section_cache(cache_path, cache)
+    if not drifted:
+        print("  [=] All sections up to date")
+        return drifted
+
+    def replace(m: re.Match) -> str:
+        name = m.group(1)
+        if name not in drifted:
             return m.group(0)
-        content = gen()
+        instrument.count("sections_updated")
         print(f"  [+] Updated section: {name}")
-        return f"<!-- BEGIN:{name} -->\n{content}<!-- END:{name} -->"
+        return f"<!-- BEGIN:{name} -->\n{rendered[name]}<!-- END:{name} -->"
 
     updated = MARKER_RE.sub(replace, text)
-    path.write_text(updated, encoding="utf-8")
+    with instrument.stage("write"):
+        path.write_text(updated, encoding="utf-8")
+    return drifted
 
 
 def main():
-    print(f"[*] Updating {README_PATH}")
-    update_readme(README_PATH)
+    parser = argparse.ArgumentParser(description="Regenerate the auto-generated sections of README.md")
+    parser.add_argument("--sections", default=None,
+                        help=f"Comma-separated sections to regenerate (default: all). Choices: {', '.join(SECTION_GENERATORS)}")
+    parser.add_argument("--check", action="store_true",
+                        help="Report sections that are out of date without writing; exits 1 on drift")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore and do not update the rendered-section cache")
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+
+    sections = args.sections.split(",") if args.sections else None
+    unknown = [name for name in sections or [] if name not in SECTION_GENERATORS]
+    if unknown:
+        parser.error(f"unknown sections: {', '.join(unknown)}")
+
+    with instrument.instrumented_run("generate_readme", args.report, args.profile):
+        print(f"[*] {'Checking' if args.check else 'Updating'} {README_PATH}")
+        drifted = update_readme(README_PATH, sections, args.check, None if args.no_cache else SECTION_CACHE_PATH)
+    if args.check and drifted:
+        sys.exit(1)
     print("[+] Done.")
 
 
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Runs the whole collection pipeline as one dependency-aware process.
+
+Stages (inputs -> outputs):
+  raw     crt.sh                          -> data/store (certificate store)
+  csv     data/store                      -> data/csv/*.csv
+  tech    data/csv/*.csv (httpx)          -> data/tech/*_httpx.csv
+  dns     data/csv/*.csv                  -> data/dns/*_dns.csv
+  asn     agency CSVs + RIPE Stat         -> data/asn/*-prefixes.csv
+  readme  data/asn, data/tech, agency CSVs -> README.md
+
+readme runs after tech but does not need it to succeed: without httpx it
+renders from the tech CSVs already on disk. Independent stages (asn alongside raw -> csv -> tech/dns) run concurrently,
+stages whose inputs are unchanged since their last run are skipped, and
+results are passed between stages in memory. main.py,
+fetch_asn_prefixes.py and generate_readme.py remain usable on their own.
+"""
+
+import argparse
+import csv
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fetch_asn_prefixes
+import generate_readme
+
+import main as crtsh_main
+from src import agency_registry, instrument, prefix_overlap, snapshots
+from src.certstore import STORE_DIR, CertificateStore
+from src.crtsh import CrtshClient
+from src.normalize import normalize_domain
+from src.pipeline import Pipeline, Stage
+from src.resolve import NegativeCache, resolve_csv_files
+
+STORE_INPUTS = [f"{STORE_DIR}/zones/*", f"{STORE_DIR}/segments/*"]
+CSV_DIR = "data/csv"
+TECH_DIR = "data/tech"
+DNS_DIR = "data/dns"
+RAW_FETCH_DELAY = 5.0
+HTTPX_ARGS = ["-nc", "-title", "-tech-detect", "-status-code", "-csv"]
+
+
+# ── Stage functions ───────────────────────────────────────────────────────────
+
+def stage_raw(domains):
+    def run(upstream):
+        client = CrtshClient()
+        store = CertificateStore(STORE_DIR)
+        for i, domain in enumerate(domains):
+            if i:
+                time.sleep(RAW_FETCH_DELAY)
+            results = client.search_domain(domain)
+            if not results:
+                print(f"  [~] No results for {domain}, keeping the stored zone")
+                continue
+            new = store.ingest(normalize_domain(domain) or domain, results)
+            print(f"  [+] {domain}: {len(results)} results, {new} new certificates")
+        store.save()
+        # The csv stage reads from this instance, whose segments are already loaded
+        return store
+    return run
+
+
+def stage_csv(keep_cert_ids, memory_budget):
+    def run(upstream):
+        store = upstream.get("raw") or CertificateStore(STORE_DIR)
+        written = []
+        for zone in store.zones():
+            domains_data = crtsh_main.process_certificates(store.certificates(zone), zone, keep_cert_ids, memory_budget)
+            if not domains_data:
+                continue
+            csv_output = os.path.join(CSV_DIR, f"domain.{zone}.csv")
+            crtsh_main.save_domains_to_csv(domains_data, csv_output)
+            # Dependents re-read the domains from the CSV one file at a
+            # time, so a spilled aggregate is never merged into a list
+            written.append(csv_output)
+        return written
+    return run
+
+
+def _read_domain_column(csv_path):
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        return [row["domain"] for row in csv.DictReader(f) if row.get("domain")]
+
+
+def stage_tech(httpx_path):
+    def run(upstream):
+        if not httpx_path:
+            raise RuntimeError("httpx binary not found; install it or pass --httpx")
+        csv_paths = upstream.get("csv") or sorted(glob.glob(os.path.join(CSV_DIR, "*.csv")))
+        os.makedirs(TECH_DIR, exist_ok=True)
+        written = []
+        for csv_path in csv_paths:
+            domains = _read_domain_column(csv_path)
+            name = os.path.splitext(os.path.basename(csv_path))[0]
+            output = os.path.join(TECH_DIR, f"{name}_httpx.csv")
+            with open(output, "w", encoding="utf-8") as f:
+                subprocess.run([httpx_path, *HTTPX_ARGS], input="\n".join(domains) + "\n",
+                               stdout=f, text=True, check=True)
+            print(f"  [+] {len(domains)} domains probed -> {output}")
+            written.append(output)
+        return written
+    return run
+
+
+def stage_dns(resolvers):
+    def run(upstream):
+        csv_paths = sorted(upstream.get("csv") or glob.glob(os.path.join(CSV_DIR, "*.csv")))
+        return resolve_csv_files(csv_paths, DNS_DIR, nameservers=resolvers, negative_cache=NegativeCache())
+    return run
+
+
+def stage_asn(rir_data_dir):
+    def run(upstream):
+        autnums, delegation = None, None
+        if rir_data_dir:
+            autnums, delegation = fetch_asn_prefixes.load_rir_enrichment(rir_data_dir)
+        registry = agency_registry.load()
+        registry.report_issues()
+        # The CSVs about to be overwritten are the previous run for the anomaly diff
+        previous = prefix_overlap.load_announcements()
+        rows_by_category = {}
+        for category in fetch_asn_prefixes.SOURCE_FILES:
+            output = os.path.join("data", "asn", f"{category}-prefixes.csv")
+            if not os.path.exists(registry.path(category)):
+                print(f"[!] Source file not found: {registry.path(category)}", file=sys.stderr)
+                continue
+            rows_by_category[category] = fetch_asn_prefixes.process_category(
+                category, registry, output, autnums, delegation,
+            )
+        prefix_overlap.write_report(prefix_overlap.build_report(prefix_overlap.load_announcements(), previous))
+        return rows_by_category
+    return run
+
+
+def stage_readme(upstream):
+    for category, rows in (upstream.get("asn") or {}).items():
+        generate_readme.preload_prefix_rows(category, rows)
+    generate_readme.update_readme(generate_readme.README_PATH)
+
+
+# ── Pipeline definition ───────────────────────────────────────────────────────
+
+def build_pipeline(args):
+    domains = args.domains or CertificateStore(STORE_DIR).zones()
+    agency_csvs = list(fetch_asn_prefixes.SOURCE_FILES.values())
+    return Pipeline([
+        Stage("raw", stage_raw(domains), outputs=STORE_INPUTS, always_run=True),
+        Stage("csv", stage_csv(args.keep_cert_ids, args.memory_budget * 1024 * 1024 if args.memory_budget else None), inputs=STORE_INPUTS,
+              outputs=[f"{CSV_DIR}/*.csv"], depends=["raw"]),
+        Stage("tech", stage_tech(args.httpx), inputs=[f"{CSV_DIR}/*.csv"],
+              outputs=[f"{TECH_DIR}/*_httpx.csv"], depends=["csv"]),
+        Stage("dns", stage_dns(args.resolvers), inputs=[f"{CSV_DIR}/*.csv"],
+              outputs=[f"{DNS_DIR}/*_dns.csv"], depends=["csv"]),
+        Stage("asn", stage_asn(args.rir_data_dir), inputs=agency_csvs,
+              outputs=["data/asn/*-prefixes.csv", prefix_overlap.REPORT_PATH], always_run=True),
+        Stage("readme", stage_readme, inputs=["data/asn/*.csv", f"{TECH_DIR}/*.csv", *agency_csvs],
+              outputs=["README.md"], depends=["asn"], after=["tech"]),
+    ], max_workers=args.workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the collection pipeline with dependency-aware scheduling")
+    parser.add_argument("--stages", default=None,
+                        help="Comma-separated stages to run: raw,csv,tech,dns,asn,readme (default: all)")
+    parser.add_argument("--domains", nargs="*", default=None,
+                        help="Domains to fetch from crt.sh (default: zones already in the certificate store)")
+    parser.add_argument("--force", action="store_true", help="Run stages even if their inputs are unchanged")
+    parser.add_argument("--keep-cert-ids", action="store_true",
+                        help="Keep both precertificate and leaf IDs when deduplicating certificates")
+    parser.add_argument("--memory-budget", type=int, default=None, metavar="MB",
+                        help="Spill domain aggregates to sorted on-disk runs above roughly MB megabytes")
+    parser.add_argument("--rir-data-dir", default=None, help="RIR delegation files and autnums.html for enrichment")
+    parser.add_argument("--httpx", default=shutil.which("httpx") or shutil.which(os.path.expanduser("~/go/bin/httpx")),
+                        help="Path to the httpx binary (default: from PATH or ~/go/bin)")
+    parser.add_argument("--resolvers", type=lambda value: value.split(","), default=None,
+                        help="Comma-separated nameservers for the dns stage (default: public resolvers)")
+    parser.add_argument("--workers", type=int, default=4, help="Maximum concurrently running stages (default: 4)")
+    instrument.add_arguments(parser)
+    snapshots.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.rir_data_dir and not os.path.isdir(args.rir_data_dir):
+        print(f"[!] --rir-data-dir not found: {args.rir_data_dir}", file=sys.stderr)
+        sys.exit(1)
+
+    # Stage paths are relative to the repository root, like the workflows
+    if args.rir_data_dir:
+        args.rir_data_dir = os.path.abspath(args.rir_data_dir)
+    report_path = os.path.abspath(args.report) if args.report else None
+    profile_path = os.path.abspath(args.profile) if args.profile else None
+    if args.snapshots:
+        snapshots.start(os.path.abspath(args.snapshots))
+    os.chdir(REPO_ROOT)
+    pipeline = build_pipeline(args)
+    selected = args.stages.split(",") if args.stages else None
+    if selected:
+        unknown = [name for name in selected if name not in pipeline.stages]
+        if unknown:
+            parser.error(f"unknown stages: {', '.join(unknown)}")
+
+    with instrument.instrumented_run("pipeline", report_path, profile_path):
+        status = pipeline.run(selected, force=args.force)
+
+    print("\n[+] Pipeline summary:")
+    for name, result in status.items():
+        print(f"    {name:<8} {result}")
+    if any(result in ("failed", "blocked") for result in status.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
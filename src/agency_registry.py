@@ -0,0 +1,200 @@
+import argparse
+import csv
+import os
+import re
+import sys
+from collections import defaultdict
+
+DATA_DIR = 'data'
+ASN_COLUMN = 'asn'
+MAX_ASN = 2 ** 32 - 1
+
+# Category -> source CSV (relative to the data directory), display label, and
+# the columns holding the short name and the full name. A missing name
+# column means the short name is the full name.
+SOURCES = {
+  'fed-gov':   {'file': 'us-fed-gov-agencies.csv',          'label': 'Federal Agencies',
+                'abbreviation': 'abbrievations', 'name': 'fedagency'},
+  'state-gov': {'file': 'us-state-gov-agencies.csv',        'label': 'State Governments',
+                'abbreviation': 'stategov', 'name': None},
+  'city-gov':  {'file': 'us-city-gov-agencies.csv',         'label': 'City Governments',
+                'abbreviation': 'citygov', 'name': 'citygov'},
+  'hospitals': {'file': 'us-hospital-systems.csv',          'label': 'Hospital Systems',
+                'abbreviation': 'hospital', 'name': 'hospital'},
+  'insurance': {'file': 'us-health-insurance.csv',          'label': 'Health Insurers',
+                'abbreviation': 'insurer', 'name': 'insurer'},
+  'pbm':       {'file': 'us-pharmacy-benefit-managers.csv', 'label': 'Pharmacy Benefit Managers',
+                'abbreviation': 'pbm', 'name': 'pbm'},
+  'health-it': {'file': 'us-health-it-vendors.csv',         'label': 'Health IT Vendors',
+                'abbreviation': 'vendor', 'name': 'vendor'},
+  'academic':  {'file': 'us-academics.csv',                 'label': 'Academic Institutions',
+                'abbreviation': 'academic', 'name': None},
+  'cloud':     {'file': 'cloud-datacenters.csv',            'label': 'Cloud & CDN Providers',
+                'abbreviation': 'datacenter', 'name': 'datacenter'},
+}
+
+# Categories of tracked organizations. 'cloud' lists the datacenter operators
+# behind the hosting IP cross-check (src/hosting.py), so views over every
+# organization or announced prefix leave it out.
+ORGANIZATION_CATEGORIES = [category for category in SOURCES if category != 'cloud']
+
+_ASN_RE = re.compile(r'(?:AS)?\s*(\d+)', re.IGNORECASE)
+
+def parse_asn(raw):
+  """
+  Parse an ASN written as 'AS123', 'as 123' or '123'.
+
+  Returns:
+    The ASN as an int, or None if raw is not a valid 32-bit ASN.
+  """
+  m = _ASN_RE.fullmatch(raw.strip())
+  if not m:
+    return None
+  asn = int(m.group(1))
+  return asn if 0 < asn <= MAX_ASN else None
+
+class AgencyRegistry:
+  """
+  Every organization/ASN row from the source CSVs, parsed once.
+
+  Each entry is a dict with category, line, abbreviation, agency, asn (int,
+  or None when missing or invalid) and state (where the source has one).
+  Alongside the entries the registry records:
+    invalid     entries whose ASN column is set but not a valid ASN
+    duplicates  (category, asn, lines) for ASNs listed more than once in a
+                category, where only the first row is fetched
+    owners      asn -> [(category, agency)] across all categories
+  """
+
+  def __init__(self, data_dir=DATA_DIR, sources=SOURCES):
+    self.data_dir = data_dir
+    self.sources = sources
+    self.entries = {}
+    self.invalid = []
+    self.duplicates = []
+    self.owners = defaultdict(list)
+    for category in sources:
+      self._load(category)
+    self.owners = dict(self.owners)
+
+  def path(self, category):
+    return os.path.join(self.data_dir, self.sources[category]['file'])
+
+  def _load(self, category):
+    source = self.sources[category]
+    entries = []
+    self.entries[category] = entries
+    path = self.path(category)
+    if not os.path.exists(path):
+      return
+    abbrev_col, name_col = source['abbreviation'], source['name']
+    lines_by_asn = defaultdict(list)
+    with open(path, newline='', encoding='utf-8') as f:
+      # Line 1 is the header
+      for line, row in enumerate(csv.DictReader(f), start=2):
+        abbreviation = (row.get(abbrev_col) or '').strip()
+        agency = (row.get(name_col) or '').strip() if name_col else abbreviation
+        raw = (row.get(ASN_COLUMN) or '').strip()
+        entry = {
+          'category': category,
+          'line': line,
+          'abbreviation': abbreviation,
+          'agency': agency,
+          'asn': parse_asn(raw) if raw else None,
+          'state': (row.get('state') or '').strip(),
+        }
+        entries.append(entry)
+        if raw and entry['asn'] is None:
+          self.invalid.append({**entry, 'raw_asn': raw})
+        elif entry['asn'] is not None:
+          lines_by_asn[entry['asn']].append(line)
+          owner = (category, agency or abbreviation)
+          if owner not in self.owners[entry['asn']]:
+            self.owners[entry['asn']].append(owner)
+    for asn, lines in lines_by_asn.items():
+      if len(lines) > 1:
+        self.duplicates.append((category, asn, lines))
+
+  def categories(self):
+    return list(self.sources)
+
+  def label(self, category):
+    return self.sources[category]['label']
+
+  def agencies(self, category):
+    """Entries with a valid ASN, first row per ASN, in file order."""
+    seen = set()
+    result = []
+    for entry in self.entries.get(category, []):
+      if entry['asn'] is not None and entry['asn'] not in seen:
+        seen.add(entry['asn'])
+        result.append(entry)
+    return result
+
+  def asns(self, category):
+    return {entry['asn'] for entry in self.entries.get(category, []) if entry['asn'] is not None}
+
+  def organizations(self, category, key='agency'):
+    """
+    Returns:
+      Dictionary of {name: first entry} in file order, keyed by the agency
+      name (or abbreviation), including organizations without a valid ASN.
+    """
+    result = {}
+    for entry in self.entries.get(category, []):
+      name = entry[key]
+      if name and name not in result:
+        result[name] = entry
+    return result
+
+  def shared_asns(self):
+    """ASNs listed under more than one category, as {asn: owners}."""
+    return {asn: owners for asn, owners in self.owners.items() if len({c for c, _ in owners}) > 1}
+
+  def report_issues(self, file=sys.stderr):
+    for entry in self.invalid:
+      print(f"  [~] {self.path(entry['category'])}:{entry['line']}: invalid ASN {entry['raw_asn']!r} "
+            f"for {entry['agency'] or entry['abbreviation']}", file=file)
+    for category, asn, lines in self.duplicates:
+      print(f"  [~] {self.path(category)}: AS{asn} listed on lines {', '.join(map(str, lines))}", file=file)
+
+_cache = {}
+
+def load(data_dir=DATA_DIR):
+  """
+  Return the registry for data_dir, parsing the CSVs only when one of them
+  changed since the last call.
+  """
+  signature = []
+  for source in SOURCES.values():
+    try:
+      stat = os.stat(os.path.join(data_dir, source['file']))
+      signature.append((stat.st_mtime_ns, stat.st_size))
+    except FileNotFoundError:
+      signature.append(None)
+  key = os.path.abspath(data_dir)
+  cached = _cache.get(key)
+  if cached is None or cached[0] != signature:
+    cached = (signature, AgencyRegistry(data_dir))
+    _cache[key] = cached
+  return cached[1]
+
+def main():
+  parser = argparse.ArgumentParser(description='Validate the agency/organization ASN source CSVs')
+  parser.add_argument('--data-dir', default=DATA_DIR, help=f'Directory holding the source CSVs (default: {DATA_DIR})')
+  parser.add_argument('--check', action='store_true', help='Exit 1 if any ASN is invalid')
+  args = parser.parse_args()
+
+  registry = load(args.data_dir)
+  for category in registry.categories():
+    entries = registry.entries[category]
+    print(f"[*] {category}: {len(entries)} rows, {len(registry.asns(category))} ASNs, "
+          f"{len(registry.organizations(category))} organizations")
+  registry.report_issues(sys.stdout)
+  for asn, owners in sorted(registry.shared_asns().items()):
+    print(f"  [=] AS{asn} shared by " + '; '.join(f"{category}: {agency}" for category, agency in owners))
+  if args.check and registry.invalid:
+    sys.exit(1)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,340 @@
+import argparse
+import calendar
+import glob
+import gzip
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+
+from src.crtsh import query_key
+from src.normalize import zone_from_filename
+
+STORE_DIR = 'data/store'
+RAW_DIR = 'data/raw'
+# crt.sh IDs grow over time, so ID-range segments keep old files untouched
+# when new certificates arrive; 2^28 IDs is roughly a few months of logging.
+SEGMENT_ID_BITS = 28
+FORMAT_VERSION = 1
+
+try:
+  import zstandard
+except ImportError:
+  zstandard = None
+
+# Per-certificate fields; issuer_ca_id/issuer_name are interned in issuers.json
+# and name_value/result_count are per zone or query (crt.sh lists only
+# matching names).
+CERT_FIELDS = ('common_name', 'entry_timestamp', 'not_before', 'not_after', 'serial_number')
+
+def _compress(data, compression):
+  if compression == 'zstd':
+    return zstandard.ZstdCompressor(level=19).compress(data)
+  # mtime=0 keeps unchanged segments byte-identical between runs
+  buf = io.BytesIO()
+  with gzip.GzipFile(fileobj=buf, mode='wb', compresslevel=9, mtime=0) as f:
+    f.write(data)
+  return buf.getvalue()
+
+def _decompress(path):
+  with open(path, 'rb') as f:
+    data = f.read()
+  if path.endswith('.zst'):
+    if zstandard is None:
+      raise RuntimeError(f"{path} is zstd-compressed; install the zstandard package to read it")
+    return zstandard.ZstdDecompressor().decompress(data)
+  return gzip.decompress(data)
+
+def _dumps(value):
+  return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def _timestamp(seconds=None):
+  return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(seconds))
+
+def _query_name(key):
+  # Query keys are URL-encoded parameters; hash them into a safe file name
+  return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+class CertificateStore:
+  """
+  Deduplicated store of crt.sh results, replacing data/raw/domain.<zone>.json.
+
+  Also the result cache for CrtshClient: searches are kept as query
+  indexes next to the zone indexes and share the same certificates.
+
+  Layout under root:
+    issuers.json             interned [issuer_ca_id, issuer_name] pairs
+    segments/<n>.json.gz     certificates whose id >> SEGMENT_ID_BITS == n,
+                             stored once however many zones list them
+    zones/<zone>.json.gz     the zone's [id, name_value, result_count] rows,
+                             in crt.sh's order (deduplication depends on it)
+    queries/<hash>.json.gz   the same rows for one search, with its query key
+
+  Segments are gzip by default, or zstd when written with
+  compression='zstd' and the zstandard package is installed; readers
+  detect the format from the file extension.
+  """
+
+  def __init__(self, root=STORE_DIR, compression='gzip'):
+    if compression == 'zstd' and zstandard is None:
+      raise RuntimeError("zstd compression needs the zstandard package")
+    self.root = root
+    self.compression = compression
+    self.extension = '.json.zst' if compression == 'zstd' else '.json.gz'
+    self.issuers = []
+    self._issuer_index = {}
+    self._segments = {}
+    self._dirty_segments = set()
+    self._indexes = {}
+    self._dirty_indexes = set()
+    self._load_issuers()
+
+  # ── Loading ─────────────────────────────────────────────────────────────────
+
+  def _load_issuers(self):
+    path = os.path.join(self.root, 'issuers.json')
+    if os.path.exists(path):
+      with open(path, 'r', encoding='utf-8') as f:
+        self.issuers = [tuple(issuer) for issuer in json.load(f)['issuers']]
+    self._issuer_index = {issuer: i for i, issuer in enumerate(self.issuers)}
+
+  def _find(self, kind, name):
+    for extension in ('.json.gz', '.json.zst'):
+      path = os.path.join(self.root, kind, f"{name}{extension}")
+      if os.path.exists(path):
+        return path
+    return None
+
+  def _segment(self, number):
+    if number not in self._segments:
+      path = self._find('segments', number)
+      records = json.loads(_decompress(path)) if path else []
+      self._segments[number] = {record[0]: record for record in records}
+    return self._segments[number]
+
+  def _index(self, kind, name):
+    if (kind, name) not in self._indexes:
+      path = self._find(kind, name)
+      self._indexes[kind, name] = json.loads(_decompress(path)) if path else None
+    return self._indexes[kind, name]
+
+  def _index_names(self, kind):
+    names = set()
+    for path in glob.glob(os.path.join(self.root, kind, '*.json.*')):
+      names.add(os.path.basename(path).rsplit('.json.', 1)[0])
+    names.update(name for (k, name), entry in self._indexes.items() if k == kind and entry is not None)
+    return sorted(names)
+
+  def _zone(self, zone):
+    return self._index('zones', zone)
+
+  def zones(self):
+    return self._index_names('zones')
+
+  # ── Writing ─────────────────────────────────────────────────────────────────
+
+  def _intern_issuer(self, ca_id, name):
+    key = (ca_id, name)
+    index = self._issuer_index.get(key)
+    if index is None:
+      index = len(self.issuers)
+      self.issuers.append(key)
+      self._issuer_index[key] = index
+    return index
+
+  def _add(self, certificates):
+    """Store certificates not seen yet; returns (index rows, number new)."""
+    new = 0
+    rows = []
+    for cert in certificates:
+      cert_id = cert['id']
+      segment = self._segment(cert_id >> SEGMENT_ID_BITS)
+      if cert_id not in segment:
+        issuer = self._intern_issuer(cert.get('issuer_ca_id'), cert.get('issuer_name'))
+        segment[cert_id] = [cert_id, issuer, *(cert.get(field) for field in CERT_FIELDS)]
+        self._dirty_segments.add(cert_id >> SEGMENT_ID_BITS)
+        new += 1
+      rows.append([cert_id, cert.get('name_value', ''), cert.get('result_count')])
+    return rows, new
+
+  def ingest(self, zone, certificates, fetched_at=None):
+    """
+    Replace a zone's result set, adding certificates not stored yet.
+
+    Returns:
+      Number of certificates that were new to the store.
+    """
+    rows, new = self._add(certificates)
+    self._indexes['zones', zone] = {'zone': zone, 'fetched_at': fetched_at or _timestamp(), 'certificates': rows}
+    self._dirty_indexes.add(('zones', zone))
+    return new
+
+  def put(self, params, results):
+    """Store a crt.sh search's results; returns how many certificates were new to the store."""
+    key = query_key(params)
+    rows, new = self._add(results)
+    name = _query_name(key)
+    self._indexes['queries', name] = {'query': key, 'fetched_at': _timestamp(), 'certificates': rows}
+    self._dirty_indexes.add(('queries', name))
+    return new
+
+  def prune(self):
+    """Drop certificates no zone or query references any more (e.g. expired ones). Returns the count."""
+    referenced = set()
+    for kind in ('zones', 'queries'):
+      for name in self._index_names(kind):
+        referenced.update(row[0] for row in self._index(kind, name)['certificates'])
+    removed = 0
+    for path in glob.glob(os.path.join(self.root, 'segments', '*.json.*')):
+      self._segment(int(os.path.basename(path).split('.')[0]))
+    for number, segment in self._segments.items():
+      stale = [cert_id for cert_id in segment if cert_id not in referenced]
+      for cert_id in stale:
+        del segment[cert_id]
+      if stale:
+        self._dirty_segments.add(number)
+        removed += len(stale)
+    return removed
+
+  def _write(self, kind, name, value):
+    directory = os.path.join(self.root, kind)
+    os.makedirs(directory, exist_ok=True)
+    # Drop a copy in the other format so each name has exactly one file
+    for extension in ('.json.gz', '.json.zst'):
+      other = os.path.join(directory, f"{name}{extension}")
+      if extension != self.extension and os.path.exists(other):
+        os.remove(other)
+    path = os.path.join(directory, f"{name}{self.extension}")
+    if value is None:
+      if os.path.exists(path):
+        os.remove(path)
+      return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+      f.write(_compress(_dumps(value), self.compression))
+    os.replace(tmp_path, path)
+
+  def save(self):
+    os.makedirs(self.root, exist_ok=True)
+    for number in sorted(self._dirty_segments):
+      segment = self._segments[number]
+      self._write('segments', number, [segment[cert_id] for cert_id in sorted(segment)] or None)
+    for kind, name in sorted(self._dirty_indexes):
+      self._write(kind, name, self._indexes[kind, name])
+    tmp_path = os.path.join(self.root, 'issuers.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+      json.dump({'format': FORMAT_VERSION, 'issuers': self.issuers}, f, indent=1, ensure_ascii=False)
+      f.write('\n')
+    os.replace(tmp_path, os.path.join(self.root, 'issuers.json'))
+    self._dirty_segments.clear()
+    self._dirty_indexes.clear()
+
+  # ── Reading ─────────────────────────────────────────────────────────────────
+
+  def _expand(self, rows):
+    """crt.sh-shaped dictionaries for index rows, or None if any certificate is missing."""
+    results = []
+    for cert_id, name_value, result_count in rows:
+      record = self._segment(cert_id >> SEGMENT_ID_BITS).get(cert_id)
+      if record is None:
+        return None
+      ca_id, issuer_name = self.issuers[record[1]]
+      cert = {'issuer_ca_id': ca_id, 'issuer_name': issuer_name}
+      cert.update(zip(CERT_FIELDS, record[2:]))
+      cert.update(id=cert_id, name_value=name_value, result_count=result_count)
+      results.append(cert)
+    return results
+
+  def certificates(self, zone):
+    """
+    Return the zone's results as crt.sh-shaped dictionaries, decompressing
+    only the segments its certificates live in.
+    """
+    entry = self._zone(zone)
+    if entry is None:
+      return []
+    results = self._expand(entry['certificates'])
+    if results is None:
+      raise RuntimeError(f"{zone} lists certificates missing from the segments in {self.root}")
+    return results
+
+  def _query(self, params, max_age):
+    entry = self._index('queries', _query_name(query_key(params)))
+    if entry is None or entry['query'] != query_key(params):
+      return None
+    fetched_at = calendar.timegm(time.strptime(entry['fetched_at'], '%Y-%m-%dT%H:%M:%SZ'))
+    if max_age is not None and time.time() - fetched_at > max_age:
+      return None
+    return entry
+
+  def has(self, params, max_age=None):
+    return self._query(params, max_age) is not None
+
+  def get(self, params, max_age=None):
+    """Return the stored results for a search, or None if missing, incomplete or older than max_age seconds."""
+    entry = self._query(params, max_age)
+    if entry is None:
+      return None
+    # A missing certificate (e.g. pruned) makes the search a miss, so it is refetched
+    return self._expand(entry['certificates'])
+
+def convert_raw_dir(raw_dir=RAW_DIR, store=None):
+  """
+  Ingest every data/raw/domain.<zone>.json file into the store.
+
+  Returns:
+    The store (saved).
+  """
+  store = store or CertificateStore()
+  total, new = 0, 0
+  for path in sorted(glob.glob(os.path.join(raw_dir, '*.json'))):
+    zone = zone_from_filename(os.path.basename(path))
+    if not zone:
+      continue
+    with open(path, 'r', encoding='utf-8') as f:
+      certificates = json.load(f)
+    fetched_at = _timestamp(os.path.getmtime(path))
+    new += store.ingest(zone, certificates, fetched_at)
+    total += len(certificates)
+  store.save()
+  print(f"[+] Converted {total} results from {raw_dir}: {new} new certificates, {len(store.issuers)} issuers")
+  return store
+
+def _directory_bytes(path):
+  return sum(os.path.getsize(p) for p in glob.glob(os.path.join(path, '**', '*'), recursive=True) if os.path.isfile(p))
+
+def main():
+  parser = argparse.ArgumentParser(description='Deduplicated, compressed crt.sh certificate store')
+  parser.add_argument('--root', default=STORE_DIR, help=f'Store directory (default: {STORE_DIR})')
+  sub = parser.add_subparsers(dest='command', required=True)
+  convert_parser = sub.add_parser('convert', help='Import data/raw/domain.<zone>.json files')
+  convert_parser.add_argument('--raw-dir', default=RAW_DIR, help=f'Raw JSON directory (default: {RAW_DIR})')
+  convert_parser.add_argument('--compression', choices=['gzip', 'zstd'], default='gzip',
+    help='Segment compression (zstd needs the zstandard package; default: gzip)')
+  convert_parser.add_argument('--prune', action='store_true', help='Drop certificates no zone references')
+  export_parser = sub.add_parser('export', help='Print a zone as crt.sh JSON')
+  export_parser.add_argument('zone')
+  sub.add_parser('stats', help='Show store size and contents')
+  args = parser.parse_args()
+
+  if args.command == 'convert':
+    store = convert_raw_dir(args.raw_dir, CertificateStore(args.root, args.compression))
+    if args.prune:
+      print(f"[+] Pruned {store.prune()} unreferenced certificates")
+      store.save()
+    print(f"[+] {args.raw_dir}: {_directory_bytes(args.raw_dir):,} bytes -> {args.root}: {_directory_bytes(args.root):,} bytes")
+  elif args.command == 'export':
+    json.dump(CertificateStore(args.root).certificates(args.zone), sys.stdout, indent=2)
+    print()
+  elif args.command == 'stats':
+    store = CertificateStore(args.root)
+    zones = store.zones()
+    segments = glob.glob(os.path.join(args.root, 'segments', '*.json.*'))
+    print(f"zones: {len(zones)}\nqueries: {len(store._index_names('queries'))}\nsegments: {len(segments)}\n"
+          f"issuers: {len(store.issuers)}\n"
+          f"bytes: {_directory_bytes(args.root):,}")
+
+if __name__ == '__main__':
+  main()
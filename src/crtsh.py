@@ -1,42 +1,137 @@
 #!/usr/bin/env python3
 
 import json
+import time
 import requests
 from datetime import datetime
+from urllib.parse import urlencode
+
+from src import agency_registry
+
+# ── Query builders ────────────────────────────────────────────────────────────
+# Each returns the crt.sh search parameters for one query mode; output=json
+# and exclude=expired are added by the client.
+
+def domain_query(domain):
+  """Certificates for a zone and all its subdomains."""
+  return {'q': f"%.{domain}"}
+
+def identity_query(identity):
+  """Certificates whose CN or SANs match identity (wildcards with %)."""
+  return {'Identity': identity}
+
+def organization_query(organization):
+  """Certificates whose subject organization (O=) is organization."""
+  return {'O': organization}
+
+def issuer_query(ca_id):
+  """Certificates issued by the crt.sh CA id (issuer_ca_id in results)."""
+  return {'caid': str(ca_id)}
+
+def fingerprint_query(sha256):
+  """The certificate with this SHA-256 fingerprint; crt.sh detects fingerprints in q."""
+  return {'q': sha256.replace(':', '').lower()}
+
+def query_key(params):
+  return urlencode(sorted(params.items()))
+
+def agency_organization_queries(data_dir=agency_registry.DATA_DIR):
+  """One organization query per distinct agency name in the federal agency list."""
+  names = agency_registry.load(data_dir).organizations('fed-gov')
+  return [organization_query(name) for name in sorted(names)]
 
 class CrtshClient:
-  """A Python client for interacting with the crt.sh certificate search service."""
+  """
+  A Python client for interacting with the crt.sh certificate search service.
+
+  Given a CertificateStore as cache, searches stored less than max_age
+  seconds ago are served from it and new results are recorded in it.
+  """
 
-  def __init__(self):
+  def __init__(self, cache=None, max_age=None):
     self.base_url = "https://crt.sh"
+    self.cache = cache
+    self.max_age = max_age
 
-  def search_domain(self, domain):
+  def search(self, params):
     """
-    Search for certificates associated with a domain.
+    Run one crt.sh search (see the *_query builders).
+
+    Served from the cache when one is configured and holds a fresh result.
 
     Args:
-      domain: The domain name to search for.
+      params: Search parameters, e.g. organization_query('Department of Defense').
 
     Returns:
-      A list of unique domain names.
+      A list of certificate dictionaries.
     """
-    url = f"{self.base_url}?q=%.{domain}&output=json&exclude=expired"
+    cached = self._cached(params)
+    return cached if cached is not None else self._fetch(params)
+
+  def _cached(self, params):
+    if self.cache is None:
+      return None
+    cached = self.cache.get(params, self.max_age)
+    if cached is not None:
+      print(f"[=] {query_key(params)}: {len(cached)} certificates from cache")
+    return cached
+
+  def _fetch(self, params):
     try:
-      response = requests.get(url, timeout=30)
+      response = requests.get(self.base_url, params={**params, 'output': 'json', 'exclude': 'expired'},
+                              timeout=30)
       if response.status_code != 200:
         print(f"Error: Received status code {response.status_code}")
         return []
       data = response.json()
       if not data:
-        print(f"No results found for domain {domain}")
+        print(f"No results found for {query_key(params)}")
         return []
-      return data
     except requests.exceptions.RequestException as e:
       print(f"Error making request: {e}")
       return []
     except json.JSONDecodeError:
       print("Error decoding JSON response")
       return []
+    if self.cache is not None:
+      new = self.cache.put(params, data)
+      print(f"[+] {query_key(params)}: {len(data)} certificates, {new} new to the cache")
+    return data
+
+  def search_many(self, queries, delay=5.0):
+    """
+    Run several searches, pausing between network requests.
+
+    Returns:
+      Dictionary of {query_key: results}.
+    """
+    results = {}
+    fetched = False
+    for params in queries:
+      # A stored query with missing certificates is a miss here too, so the
+      # refetch is paced like any other request
+      result = self._cached(params)
+      if result is None:
+        if fetched:
+          time.sleep(delay)
+        result = self._fetch(params)
+        fetched = True
+      results[query_key(params)] = result
+    if self.cache is not None:
+      self.cache.save()
+    return results
+
+  def search_domain(self, domain):
+    """
+    Search for certificates associated with a domain.
+
+    Args:
+      domain: The domain name to search for.
+
+    Returns:
+      A list of certificate dictionaries.
+    """
+    return self.search(domain_query(domain))
 
   def filter_expired_certificates(self, certificates):
     """
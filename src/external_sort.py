@@ -0,0 +1,76 @@
+import heapq
+import json
+import os
+import shutil
+import tempfile
+import weakref
+from itertools import groupby
+from operator import itemgetter
+
+RUN_BUFFER_BYTES = 1 << 20
+_encode_json = json.JSONEncoder(separators=(',', ':')).encode
+
+class SpilledMapping:
+  """
+  A mapping too large for memory, kept as sorted runs on disk.
+
+  spill() writes the current in-memory part as one sorted run (JSON lines)
+  and clears it; items() streams a k-way merge of all runs, calling combine
+  on the records that share a key, so only one record per run is resident
+  at a time. Keys come out sorted, as sorted(mapping.items()) would give.
+  The run directory is removed when the object is closed or collected.
+
+  Args:
+    encode: Converts a record to a JSON-serializable value.
+    decode: Converts the JSON value back to a record.
+    combine: Merges a list of records for the same key into one.
+  """
+
+  def __init__(self, encode, decode, combine, directory=None):
+    self.encode = encode
+    self.decode = decode
+    self.combine = combine
+    self.directory = tempfile.mkdtemp(prefix='gov-domains-spill-', dir=directory)
+    self.runs = []
+    self._len = None
+    self._finalizer = weakref.finalize(self, shutil.rmtree, self.directory, True)
+
+  def spill(self, mapping):
+    """Write mapping as a sorted run and clear it."""
+    if not mapping:
+      return
+    path = os.path.join(self.directory, f"run-{len(self.runs):05d}.jsonl")
+    encode = self.encode
+    with open(path, 'w', encoding='utf-8', buffering=RUN_BUFFER_BYTES) as f:
+      f.writelines(f"{_encode_json([key, encode(mapping[key])])}\n" for key in sorted(mapping))
+    self.runs.append(path)
+    self._len = None
+    mapping.clear()
+
+  def _read_run(self, path):
+    with open(path, 'r', encoding='utf-8', buffering=RUN_BUFFER_BYTES) as f:
+      for line in f:
+        yield json.loads(line)
+
+  def items(self):
+    decode = self.decode
+    combine = self.combine
+    merged = heapq.merge(*(self._read_run(path) for path in self.runs), key=itemgetter(0))
+    for key, group in groupby(merged, key=itemgetter(0)):
+      yield key, combine([decode(value) for _, value in group])
+
+  def __iter__(self):
+    return (key for key, _ in self.items())
+
+  def __len__(self):
+    # Keys repeat across runs, so the count needs one merge pass
+    if self._len is None:
+      merged = heapq.merge(*(self._read_run(path) for path in self.runs), key=itemgetter(0))
+      self._len = sum(1 for _ in groupby(merged, key=itemgetter(0)))
+    return self._len
+
+  def __bool__(self):
+    return bool(self.runs)
+
+  def close(self):
+    self._finalizer()
@@ -0,0 +1,247 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+from collections import Counter, defaultdict
+
+from src.ipasn import IPASNIndex
+
+TECH_DIR = 'data/tech'
+CLOUD_PREFIXES_PATH = 'data/asn/cloud-prefixes.csv'
+UNCLASSIFIED = 'Unclassified'
+
+# Provider -> CNAME target suffixes (registrable domains or deeper).
+PROVIDER_SUFFIXES = {
+  'Akamai': ['akamaiedge.net', 'akamaiedge-staging.net', 'akamai.net', 'akadns.net', 'akamaized.net',
+             'akamaihd.net', 'edgekey.net', 'edgekey-staging.net', 'edgesuite.net', 'edgesuite-staging.net',
+             'akamaitechnologies.com'],
+  'Amazon CloudFront': ['cloudfront.net'],
+  'Amazon Web Services': ['amazonaws.com', 'awsglobalaccelerator.com', 'aws.dev', 'amplifyapp.com',
+                          'elasticbeanstalk.com', 'natss-aws.us'],
+  'Microsoft Azure': ['azurefd.net', 'tm-azurefd.net', 'azureedge.net', 'azureedge.us', 'azure.com',
+                      'azure.us', 'azurewebsites.net', 'azurewebsites.us', 'azure-api.net', 'azure-api.us',
+                      'cloudapp.net', 'cloudapp.azure.com', 'trafficmanager.net', 'usgovtrafficmanager.net',
+                      'usgovcloudapi.net', 'windows.net', 'azurecontainerapps.io', 'azurestaticapps.net'],
+  'Microsoft 365': ['cloud.microsoft', 'outlook.com', 'office.com', 'office365.us', 'sharepoint.com',
+                    'sharepoint.us'],
+  'Cloudflare': ['cloudflare.net', 'cloudflare.com', 'pages.dev', 'workers.dev'],
+  'Fastly': ['fastly.net', 'fastlylb.net', 'fastly-edge.com'],
+  'Google Cloud': ['googleusercontent.com', 'googlehosted.com', 'appspot.com', 'run.app', 'web.app',
+                   'firebaseapp.com', 'googleplex.com', 'ghs.google.com'],
+  'Imperva': ['incapdns.net', 'impervadns.net'],
+  'cloud.gov': ['cloud.gov'],
+  'Salesforce': ['force.com', 'siteforce.com', 'salesforce.com', 'salesforce-sites.com', 'sfmc-content.com',
+                 'sfmc-marketing.com', 'exacttarget.com'],
+  'ServiceNow': ['servicenowservices.com', 'service-now.com'],
+  'Appian': ['appiancloud.us', 'appiancloud.com', 'appianportalsgov.com'],
+  'Okta': ['okta.com', 'okta-gov.com', 'okta-dnssec.com', 'oktapreview.com'],
+  'Esri ArcGIS': ['arcgis.com'],
+  'Tyler Socrata': ['socrata.net', 'socrata.com'],
+  'Palantir': ['palantirgov.com', 'palantirfoundry.com'],
+  'MuleSoft': ['anypointdns.net'],
+  'Zendesk': ['zendesk.com'],
+  'GitHub Pages': ['github.io'],
+  'Oracle Cloud': ['oraclecloud.com'],
+  'DigitalOcean': ['digitaloceanspaces.com', 'ondigitalocean.app'],
+  'Alibaba Cloud': ['aliyuncs.com', 'alicdn.com', 'alikunlun.com'],
+  'Rackspace': ['rackspace.com', 'rackspace.net', 'rackspacecloud.com'],
+  'Linode': ['linode.com', 'linodeobjects.com', 'linodeusercontent.com'],
+  'Acquia': ['acquia-sites.com', 'acquia.com'],
+  'Pantheon': ['pantheonsite.io', 'pantheon.io'],
+  'WP Engine': ['wpengine.com', 'wpenginepowered.com'],
+  'Netlify': ['netlify.app', 'netlify.com'],
+  'Vercel': ['vercel-dns.com', 'vercel.app'],
+  'Qualtrics': ['qualtrics.com'],
+  'Granicus': ['granicus.com', 'govdelivery.com'],
+}
+
+# httpx cdn_name values -> provider, used when no CNAME matches
+HTTPX_CDN_NAMES = {
+  'akamai': 'Akamai',
+  'aws': 'Amazon Web Services',
+  'cloudfront': 'Amazon CloudFront',
+  'azure': 'Microsoft Azure',
+  'office365': 'Microsoft 365',
+  'cloudflare': 'Cloudflare',
+  'fastly': 'Fastly',
+  'google': 'Google Cloud',
+  'incapsula': 'Imperva',
+}
+
+# cloud-datacenters.csv names -> provider; every name in the CSV must map
+# to a PROVIDER_SUFFIXES key or its hosts are never IP-confirmed
+DATACENTER_PROVIDERS = {
+  'Akamai Technologies': 'Akamai',
+  'Alibaba (US) Technology': 'Alibaba Cloud',
+  'Amazon Data Services': 'Amazon Web Services',
+  'Amazon.com': 'Amazon Web Services',
+  'Cloudflare': 'Cloudflare',
+  'DigitalOcean': 'DigitalOcean',
+  'Fastly': 'Fastly',
+  'Google Cloud': 'Google Cloud',
+  'Google LLC': 'Google Cloud',
+  'Linode LLC': 'Linode',
+  'Microsoft Corporation': 'Microsoft Azure',
+  'Oracle Corporation': 'Oracle Cloud',
+  'Rackspace Hosting': 'Rackspace',
+}
+
+# Providers served from another provider's address space, which then
+# confirms them (CloudFront edges are in Amazon's ASNs, Microsoft 365 in Azure's)
+IP_PROVIDER_OF = {
+  'Amazon CloudFront': 'Amazon Web Services',
+  'Microsoft 365': 'Microsoft Azure',
+}
+
+class SuffixTable:
+  """
+  Compiled suffix matcher for CNAME targets.
+
+  Suffixes are stored in one dict, so matching a name costs one lookup per
+  label (most specific first) instead of a scan over every pattern; results
+  are memoized because the same edge hostnames repeat across zones.
+  """
+
+  def __init__(self, providers=PROVIDER_SUFFIXES):
+    self.suffixes = {}
+    for provider, suffixes in providers.items():
+      for suffix in suffixes:
+        self.suffixes[suffix.lower()] = provider
+    self._memo = {}
+
+  def match(self, name):
+    """Return the provider for name, or None."""
+    name = name.lower().rstrip('.')
+    if name in self._memo:
+      return self._memo[name]
+    provider = None
+    labels = name.split('.')
+    for i in range(len(labels) - 1):
+      provider = self.suffixes.get('.'.join(labels[i:]))
+      if provider:
+        break
+    self._memo[name] = provider
+    return provider
+
+def _json_list(raw):
+  if not raw or raw == 'null':
+    return []
+  try:
+    value = json.loads(raw)
+  except (json.JSONDecodeError, ValueError):
+    return [item.strip().strip('"') for item in raw.strip('[]').split(',') if item.strip()]
+  return value if isinstance(value, list) else [value]
+
+def load_cloud_index(prefixes_path=CLOUD_PREFIXES_PATH):
+  """
+  Build an IP -> datacenter index from the cloud prefixes collected for
+  data/cloud-datacenters.csv.
+
+  Returns None when the prefixes have not been collected yet (run
+  `scripts/fetch_asn_prefixes.py --category cloud`), in which case
+  classification proceeds without IP evidence.
+  """
+  if not os.path.exists(prefixes_path):
+    return None
+  index = IPASNIndex()
+  index.load_prefix_csvs(os.path.dirname(prefixes_path), os.path.basename(prefixes_path), categories=None)
+  return index
+
+def _ip_provider(index, ips):
+  for ip in ips:
+    try:
+      entry = index.lookup(ip)
+    except ValueError:
+      continue
+    if entry and entry.get('asn'):
+      return DATACENTER_PROVIDERS.get(entry['agency'], entry['agency'])
+  return None
+
+def classify_tech_dir(tech_dir=TECH_DIR, table=None, cloud_index=None):
+  """
+  Classify every probed host in the httpx CSVs in one pass.
+
+  Per host the provider is taken from the CNAME chain (the deepest matching
+  target wins, since that is the edge actually serving traffic), then from
+  httpx's cdn_name, then from the address's cloud ASN. When both a name
+  match and an IP match exist, the host counts as IP-confirmed if they agree.
+
+  Returns:
+    Dictionary of {zone: {host: {'provider', 'source', 'ip_confirmed'}}}.
+  """
+  table = table or SuffixTable()
+  results = defaultdict(dict)
+  for path in sorted(glob.glob(os.path.join(tech_dir, '*_httpx.csv'))):
+    zone = os.path.basename(path).removeprefix('domain.').removesuffix('_httpx.csv')
+    hosts = results[zone]
+    # Some httpx titles carry non-UTF-8 bytes; they are irrelevant here
+    with open(path, newline='', encoding='utf-8', errors='replace') as f:
+      for row in csv.DictReader(f):
+        host = (row.get('input') or row.get('host') or '').lower()
+        if not host or host in hosts:
+          continue
+        provider, source = None, None
+        for target in reversed(_json_list(row.get('cname'))):
+          provider = table.match(target)
+          if provider:
+            source = 'cname'
+            break
+        if not provider:
+          provider = HTTPX_CDN_NAMES.get((row.get('cdn_name') or '').lower())
+          source = 'httpx' if provider else None
+
+        ip_confirmed = False
+        if cloud_index is not None:
+          ips = _json_list(row.get('a')) + _json_list(row.get('aaaa'))
+          ip_provider = _ip_provider(cloud_index, ips)
+          # ip_provider is None when no address is in a cloud prefix, which
+          # must not match the None IP_PROVIDER_OF gives most providers
+          ip_confirmed = (provider is not None and ip_provider is not None
+                          and ip_provider in (provider, IP_PROVIDER_OF.get(provider)))
+          if ip_provider and not provider:
+            provider, source = ip_provider, 'asn'
+
+        hosts[host] = {'provider': provider or UNCLASSIFIED, 'source': source or '', 'ip_confirmed': ip_confirmed}
+  return dict(results)
+
+def provider_breakdown(results):
+  """
+  Returns:
+    Tuple of (per_zone, totals): per_zone maps zone -> Counter of providers,
+    totals maps provider -> {'hosts', 'zones', 'ip_confirmed'}.
+  """
+  per_zone = {}
+  totals = defaultdict(lambda: {'hosts': 0, 'zones': 0, 'ip_confirmed': 0})
+  for zone, hosts in results.items():
+    counts = Counter(h['provider'] for h in hosts.values())
+    per_zone[zone] = counts
+    for provider, n in counts.items():
+      totals[provider]['hosts'] += n
+      totals[provider]['zones'] += 1
+    for h in hosts.values():
+      if h['ip_confirmed']:
+        totals[h['provider']]['ip_confirmed'] += 1
+  return per_zone, dict(totals)
+
+def main():
+  parser = argparse.ArgumentParser(description='Classify httpx-probed hosts by CDN/cloud provider')
+  parser.add_argument('--tech-dir', default=TECH_DIR, help=f'httpx CSV directory (default: {TECH_DIR})')
+  parser.add_argument('--cloud-prefixes', default=CLOUD_PREFIXES_PATH,
+    help=f'Cloud datacenter prefix CSV for the IP cross-check (default: {CLOUD_PREFIXES_PATH})')
+  args = parser.parse_args()
+
+  cloud_index = load_cloud_index(args.cloud_prefixes)
+  if cloud_index is None:
+    print(f"[~] {args.cloud_prefixes} not found; skipping the IP cross-check", file=sys.stderr)
+  results = classify_tech_dir(args.tech_dir, cloud_index=cloud_index)
+
+  writer = csv.writer(sys.stdout)
+  writer.writerow(['zone', 'host', 'provider', 'source', 'ip_confirmed'])
+  for zone in sorted(results):
+    for host, h in sorted(results[zone].items()):
+      writer.writerow([zone, host, h['provider'], h['source'], 'yes' if h['ip_confirmed'] else 'no'])
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,121 @@
+import cProfile
+import json
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import UTC, datetime
+
+
+class RunReport:
+  """
+  Collects per-stage timings and counters for one pipeline run.
+
+  Stages accumulate, so a stage entered once per file or per ASN reports
+  its total time and the number of times it ran.
+  """
+
+  def __init__(self, name):
+    self.name = name
+    self.started_at = datetime.now(UTC)
+    self.stages = {}
+    self.counters = {}
+    self.profile_path = None
+    self._start = time.perf_counter()
+    self._lock = threading.Lock()
+
+  @contextmanager
+  def stage(self, name):
+    start = time.perf_counter()
+    try:
+      yield
+    finally:
+      elapsed = time.perf_counter() - start
+      with self._lock:
+        entry = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+        entry['seconds'] += elapsed
+        entry['calls'] += 1
+
+  def count(self, name, n=1):
+    with self._lock:
+      self.counters[name] = self.counters.get(name, 0) + n
+
+  def to_dict(self):
+    return {
+      'name': self.name,
+      'started_at': self.started_at.strftime('%Y-%m-%dT%H:%M:%SZ'),
+      'wall_seconds': round(time.perf_counter() - self._start, 6),
+      'peak_rss_bytes': peak_rss_bytes(),
+      'python': platform.python_version(),
+      'argv': sys.argv[1:],
+      'stages': {
+        name: {'seconds': round(entry['seconds'], 6), 'calls': entry['calls']}
+        for name, entry in self.stages.items()
+      },
+      'counters': dict(self.counters),
+      'profile': self.profile_path,
+    }
+
+  def write(self, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+      json.dump(self.to_dict(), f, indent=2)
+      f.write('\n')
+    print(f"[+] Run report saved to {path}")
+
+def peak_rss_bytes():
+  usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # ru_maxrss is kilobytes on Linux and bytes on macOS
+  return usage if sys.platform == 'darwin' else usage * 1024
+
+# Module-level report so stages and counters can be recorded anywhere in the
+# pipeline without threading a report object through every function.
+_current = RunReport('default')
+
+def start_run(name):
+  global _current
+  _current = RunReport(name)
+  return _current
+
+def current():
+  return _current
+
+def stage(name):
+  return _current.stage(name)
+
+def count(name, n=1):
+  _current.count(name, n)
+
+def add_arguments(parser):
+  """Add the shared --report and --profile options to an argparse parser."""
+  parser.add_argument('--report', default=None, metavar='PATH',
+    help='Write a JSON run report (stage timings, counters, peak RSS) to PATH')
+  parser.add_argument('--profile', default=None, metavar='PATH',
+    help='Capture a cProfile of the run and write pstats output to PATH')
+
+@contextmanager
+def instrumented_run(name, report_path=None, profile_path=None):
+  """
+  Run a block as one instrumented pipeline run.
+
+  Starts a fresh report, optionally profiles the block with cProfile, and
+  writes the JSON report when report_path is set, even if the block fails.
+  """
+  report = start_run(name)
+  profiler = cProfile.Profile() if profile_path else None
+  if profiler:
+    profiler.enable()
+  try:
+    yield report
+  finally:
+    if profiler:
+      profiler.disable()
+      os.makedirs(os.path.dirname(profile_path) or '.', exist_ok=True)
+      profiler.dump_stats(profile_path)
+      report.profile_path = profile_path
+      print(f"[+] Profile saved to {profile_path}")
+    if report_path:
+      report.write(report_path)
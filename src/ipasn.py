@@ -0,0 +1,260 @@
+import argparse
+import bisect
+import contextlib
+import csv
+import glob
+import gzip
+import ipaddress
+import json
+import os
+import sys
+
+from src.agency_registry import ORGANIZATION_CATEGORIES
+
+ASN_DIR = 'data/asn'
+INDEX_PATH = 'data/cache/ipasn-index.json.gz'
+
+class IPASNIndex:
+  """
+  Offline IP -> (ASN, agency, registry) resolver.
+
+  Announced prefixes from data/asn/*-prefixes.csv are matched by longest
+  prefix; RIR delegation ranges (if loaded) supply the registry for
+  addresses outside every collected prefix.
+  """
+
+  def __init__(self):
+    # {version: {prefixlen: {network_int: entry}}}
+    self.prefixes = {4: {}, 6: {}}
+    # {version: ([range_start, ...], [(range_end, registry), ...])}
+    self.ranges = {4: ([], []), 6: ([], [])}
+    self._prefixlens = {4: [], 6: []}
+
+  # ── Building ────────────────────────────────────────────────────────────────
+
+  def add_prefix(self, prefix, entry):
+    net = ipaddress.ip_network(prefix, strict=False)
+    by_len = self.prefixes[net.version].setdefault(net.prefixlen, {})
+    # First row wins for prefixes announced by several ASNs
+    by_len.setdefault(int(net.network_address), entry)
+
+  def load_prefix_csvs(self, asn_dir=ASN_DIR, pattern='*-prefixes.csv', categories=ORGANIZATION_CATEGORIES):
+    """Index the matching prefix CSVs; categories=None keeps every match, not only the organizations'."""
+    count = 0
+    for path in sorted(glob.glob(os.path.join(asn_dir, pattern))):
+      category = os.path.basename(path).removesuffix('-prefixes.csv')
+      if categories is not None and category not in categories:
+        continue
+      with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+          prefix = row.get('prefix', '')
+          if not prefix:
+            continue
+          try:
+            self.add_prefix(prefix, {
+              'prefix': prefix,
+              'asn': row.get('asn', ''),
+              'agency': row.get('agency', ''),
+              'abbreviation': row.get('abbreviation', ''),
+              'category': category,
+              'registry': row.get('rir_registry', ''),
+            })
+          except ValueError:
+            continue
+          count += 1
+    self._finalize()
+    print(f"[+] Indexed {count} prefixes from {asn_dir}", file=sys.stderr)
+    return count
+
+  def load_delegation_files(self, rir_data_dir):
+    """
+    Load ipv4/ipv6 records from delegated-*-extended-latest.txt files.
+
+    Record format: registry|cc|type|start|value|date|status[|hash]
+    where value is an address count for ipv4 and a prefix length for ipv6.
+    """
+    rows = {4: [], 6: []}
+    for path in sorted(glob.glob(os.path.join(rir_data_dir, 'delegated-*-extended-latest.txt'))):
+      registry_name = os.path.basename(path).split('-')[1]
+      with open(path, encoding='ascii', errors='replace') as f:
+        for line in f:
+          parts = line.strip().split('|')
+          if len(parts) < 7 or parts[2] not in ('ipv4', 'ipv6') or parts[1] == '*':
+            continue
+          try:
+            start = int(ipaddress.ip_address(parts[3]))
+            if parts[2] == 'ipv4':
+              rows[4].append((start, start + int(parts[4]) - 1, registry_name))
+            else:
+              rows[6].append((start, start + 2 ** (128 - int(parts[4])) - 1, registry_name))
+          except ValueError:
+            continue
+    for version, ranges in rows.items():
+      ranges.sort()
+      self.ranges[version] = ([r[0] for r in ranges], [(r[1], r[2]) for r in ranges])
+    print(f"[+] Indexed {len(rows[4]) + len(rows[6])} delegation ranges from {rir_data_dir}", file=sys.stderr)
+
+  def _finalize(self):
+    for version, by_len in self.prefixes.items():
+      self._prefixlens[version] = sorted(by_len, reverse=True)
+
+  # ── Persistence ─────────────────────────────────────────────────────────────
+
+  def save(self, path=INDEX_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    data = {
+      'prefixes': {
+        str(version): {str(plen): {str(k): v for k, v in nets.items()} for plen, nets in by_len.items()}
+        for version, by_len in self.prefixes.items()
+      },
+      'ranges': {
+        str(version): [starts, ends] for version, (starts, ends) in self.ranges.items()
+      },
+    }
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+      json.dump(data, f)
+    print(f"[+] Index saved to {path}", file=sys.stderr)
+
+  @classmethod
+  def load(cls, path=INDEX_PATH):
+    index = cls()
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+      data = json.load(f)
+    for version, by_len in data['prefixes'].items():
+      index.prefixes[int(version)] = {
+        int(plen): {int(k): v for k, v in nets.items()} for plen, nets in by_len.items()
+      }
+    for version, (starts, ends) in data['ranges'].items():
+      index.ranges[int(version)] = (starts, [tuple(e) for e in ends])
+    index._finalize()
+    return index
+
+  # ── Lookups ─────────────────────────────────────────────────────────────────
+
+  def lookup(self, ip):
+    """
+    Resolve an IP from the local index.
+
+    Returns:
+      Dictionary with prefix, asn, agency, abbreviation, category and registry
+      for the longest matching collected prefix; a registry-only dictionary
+      for addresses inside a delegation range; None on a miss.
+    """
+    addr = ipaddress.ip_address(ip)
+    value = int(addr)
+    bits = addr.max_prefixlen
+    by_len = self.prefixes[addr.version]
+    for plen in self._prefixlens[addr.version]:
+      entry = by_len[plen].get(value >> (bits - plen) << (bits - plen))
+      if entry is not None:
+        if not entry['registry']:
+          entry = dict(entry, registry=self._registry(addr.version, value))
+        return entry
+
+    registry = self._registry(addr.version, value)
+    if registry:
+      return {'prefix': '', 'asn': '', 'agency': '', 'abbreviation': '', 'category': '', 'registry': registry}
+    return None
+
+  def _registry(self, version, value):
+    starts, ends = self.ranges[version]
+    i = bisect.bisect_right(starts, value) - 1
+    if i >= 0 and value <= ends[i][0]:
+      return ends[i][1]
+    return ''
+
+def build_index(asn_dir=ASN_DIR, rir_data_dir=None):
+  index = IPASNIndex()
+  index.load_prefix_csvs(asn_dir)
+  if rir_data_dir:
+    index.load_delegation_files(rir_data_dir)
+  return index
+
+def resolve_ips(ips, index, allow_network=False):
+  """
+  Resolve IPs offline, optionally falling back to RDAP for misses.
+
+  Only addresses with no collected prefix (registry-only or no match) are
+  sent to the network, and only when allow_network is set.
+
+  Args:
+    ips: Iterable of IP address strings.
+    index: A built or loaded IPASNIndex.
+    allow_network: Look up index misses with src.whois.whois_batch.
+
+  Returns:
+    Dictionary of {ip: result or None}.
+  """
+  results = {}
+  misses = []
+  invalid = 0
+  for ip in dict.fromkeys(ips):
+    try:
+      result = index.lookup(ip)
+    except ValueError:
+      results[ip] = None
+      invalid += 1
+      continue
+    results[ip] = result
+    if result is None or not result['asn']:
+      misses.append(ip)
+
+  print(f"[+] Resolved {len(results) - len(misses) - invalid} of {len(results)} IPs offline", file=sys.stderr)
+  if misses and allow_network:
+    # Imported lazily so air-gapped runs never need ipwhois
+    from src.whois import whois_batch
+    for ip, whois_result in whois_batch(misses).items():
+      if whois_result is None:
+        continue
+      results[ip] = {
+        'prefix': whois_result.get('asn_cidr') or '',
+        'asn': f"AS{whois_result.get('asn')}" if whois_result.get('asn') else '',
+        'agency': whois_result.get('asn_description') or '',
+        'abbreviation': '',
+        'category': '',
+        'registry': whois_result.get('asn_registry') or (results[ip] or {}).get('registry', ''),
+      }
+  return results
+
+def main():
+  parser = argparse.ArgumentParser(description='Resolve IPs to ASN/agency from the local prefix tables')
+  parser.add_argument('ips', nargs='*', help='IP addresses to resolve (reads stdin if omitted)')
+  parser.add_argument('--asn-dir', default=ASN_DIR, help=f'Prefix CSV directory (default: {ASN_DIR})')
+  parser.add_argument('--rir-data-dir', default=None,
+    help='Directory with RIR delegation files for registry fallback')
+  parser.add_argument('--index', default=None,
+    help='Load a compiled index from this path instead of building one')
+  parser.add_argument('--save-index', default=None, help='Write the compiled index to this path')
+  parser.add_argument('--dns-csv', nargs='*', default=None, metavar='PATH',
+    help='Read IPs from the ip column of DNS tables written by src.resolve')
+  parser.add_argument('--network', action='store_true',
+    help='Fall back to live RDAP lookups for IPs missing from the local index')
+  args = parser.parse_args()
+
+  if args.index:
+    index = IPASNIndex.load(args.index)
+  else:
+    index = build_index(args.asn_dir, args.rir_data_dir)
+  if args.save_index:
+    index.save(args.save_index)
+
+  if args.dns_csv:
+    ips = list(args.ips)
+    for path in args.dns_csv:
+      with open(path, newline='', encoding='utf-8') as f:
+        ips.extend(row['ip'] for row in csv.DictReader(f) if row.get('ip'))
+  else:
+    ips = args.ips or [line.strip() for line in sys.stdin if line.strip()]
+  # Keep stdout clean for the CSV; whois_batch reports progress with print()
+  with contextlib.redirect_stdout(sys.stderr):
+    results = resolve_ips(ips, index, allow_network=args.network)
+
+  writer = csv.writer(sys.stdout)
+  writer.writerow(['ip', 'asn', 'agency', 'category', 'registry', 'prefix'])
+  for ip, result in results.items():
+    result = result or {}
+    writer.writerow([ip, result.get('asn', ''), result.get('agency', ''),
+                     result.get('category', ''), result.get('registry', ''), result.get('prefix', '')])
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,80 @@
+import ipaddress
+import re
+from functools import lru_cache
+
+# Already-clean names (lowercase ASCII LDH labels) skip the slow path entirely.
+_FAST_NAME_RE = re.compile(r'^(?!-)[a-z0-9_-]{1,63}(?<!-)(?:\.(?!-)[a-z0-9_-]{1,63}(?<!-))*$')
+_LABEL_RE = re.compile(r'^(?!-)[a-z0-9_-]{1,63}(?<!-)$')
+_ZONE_FILE_RE = re.compile(r'^domain\.(.+)\.json$')
+
+MAX_NAME_LENGTH = 253
+
+def zone_from_filename(filename):
+  """
+  Derive the queried zone from a raw crt.sh file name.
+
+  Args:
+    filename: Base name such as 'domain.cdc.gov.json'.
+
+  Returns:
+    The zone (e.g. 'cdc.gov'), or None if the name does not follow the pattern.
+  """
+  m = _ZONE_FILE_RE.match(filename)
+  return normalize_domain(m.group(1)) if m else None
+
+@lru_cache(maxsize=262144)
+def normalize_domain(name, zone=None):
+  """
+  Normalize a certificate name into a canonical hostname.
+
+  Lowercases, strips whitespace, wildcard prefixes and the trailing root dot,
+  IDNA-encodes non-ASCII names and validates every label. Results are memoized
+  since the same SAN strings repeat across thousands of certificates.
+
+  Args:
+    name: Raw common name or SAN entry.
+    zone: Optional zone the name must equal or fall under.
+
+  Returns:
+    The normalized hostname, or None if the name is invalid, an IP literal,
+    an email address or outside the zone.
+  """
+  domain = name.strip().lower().rstrip('.')
+  while domain.startswith('*.'):
+    domain = domain[2:]
+
+  if not _FAST_NAME_RE.match(domain):
+    domain = _slow_normalize(domain)
+    if domain is None:
+      return None
+
+  if len(domain) > MAX_NAME_LENGTH:
+    return None
+  if zone and domain != zone and not domain.endswith('.' + zone):
+    return None
+  if _is_ip_literal(domain):
+    return None
+  return domain
+
+def _slow_normalize(domain):
+  if not domain or '@' in domain or ' ' in domain:
+    return None
+  if not domain.isascii():
+    try:
+      domain = domain.encode('idna').decode('ascii')
+    except UnicodeError:
+      return None
+  labels = domain.split('.')
+  if not all(_LABEL_RE.match(label) for label in labels):
+    return None
+  return domain
+
+def _is_ip_literal(domain):
+  # Only all-numeric dotted names can be IPv4; IPv6 literals never pass label validation.
+  if not domain[-1].isdigit():
+    return False
+  try:
+    ipaddress.ip_address(domain)
+    return True
+  except ValueError:
+    return False
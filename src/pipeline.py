@@ -0,0 +1,160 @@
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from src import instrument
+
+STATE_PATH = 'data/cache/pipeline-state.json'
+
+class Stage:
+  """
+  One pipeline step.
+
+  inputs and outputs are glob patterns. A stage whose input files hash to
+  the same fingerprint as its last successful run (and whose outputs still
+  exist) is skipped; stages with always_run set (network fetches) never are.
+  Stages in after only have to finish first: their failure does not block
+  this one, which then reads whatever they left on disk. func receives the
+  in-memory results of the stages in depends and after.
+  """
+
+  def __init__(self, name, func, inputs=None, outputs=None, depends=None, after=None, always_run=False):
+    self.name = name
+    self.func = func
+    self.inputs = inputs or []
+    self.outputs = outputs or []
+    self.depends = depends or []
+    self.after = after or []
+    self.always_run = always_run
+
+def fingerprint(patterns):
+  """Hash the paths and contents of every file matching the glob patterns."""
+  digest = hashlib.sha256()
+  for pattern in patterns:
+    for path in sorted(glob.glob(pattern)):
+      if not os.path.isfile(path):
+        continue
+      digest.update(path.encode('utf-8'))
+      with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+          digest.update(chunk)
+  return digest.hexdigest()
+
+def _outputs_exist(patterns):
+  return all(glob.glob(pattern) for pattern in patterns)
+
+class Pipeline:
+  """
+  Runs stages in dependency order, independent stages concurrently.
+
+  Results returned by a stage are passed in memory to its dependents; a
+  skipped or failed stage contributes None, so dependents fall back to
+  reading its outputs from disk.
+  """
+
+  def __init__(self, stages, state_path=STATE_PATH, max_workers=4):
+    self.stages = {stage.name: stage for stage in stages}
+    self.state_path = state_path
+    self.max_workers = max_workers
+    for stage in stages:
+      missing = [dep for dep in stage.depends + stage.after if dep not in self.stages]
+      if missing:
+        raise ValueError(f"Stage {stage.name} depends on unknown stages: {', '.join(missing)}")
+
+  def _load_state(self):
+    if not os.path.exists(self.state_path):
+      return {}
+    try:
+      with open(self.state_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+    except (OSError, json.JSONDecodeError):
+      return {}
+
+  def _save_state(self, state):
+    os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+    with open(self.state_path, 'w', encoding='utf-8') as f:
+      json.dump(state, f, indent=2)
+      f.write('\n')
+
+  def run(self, selected=None, force=False):
+    """
+    Run the selected stages (default: all); unselected dependencies are
+    treated as already complete.
+
+    Returns:
+      Dictionary of {stage_name: 'ran' | 'skipped' | 'failed' | 'blocked'}.
+    """
+    selected = set(selected or self.stages)
+    state = self._load_state()
+    status = {name: 'unselected' for name in self.stages if name not in selected}
+    results = {}
+    pending = set(selected)
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+      while pending or running:
+        # Rescan until nothing changes: a skipped stage can unblock others
+        progressed = True
+        while progressed:
+          progressed = False
+          for name in sorted(pending):
+            stage = self.stages[name]
+            dep_status = [status.get(dep) for dep in stage.depends]
+            if any(s in ('failed', 'blocked') for s in dep_status):
+              print(f"[!] Stage {name} blocked by a failed dependency")
+              status[name] = 'blocked'
+              pending.discard(name)
+              progressed = True
+              continue
+            if not all(s in ('ran', 'skipped', 'unselected') for s in dep_status):
+              continue
+            if not all(status.get(dep) is not None for dep in stage.after):
+              continue
+            for dep in stage.after:
+              if status[dep] in ('failed', 'blocked'):
+                print(f"[~] Stage {name} runs without {dep} ({status[dep]}), using its existing outputs")
+            pending.discard(name)
+            inputs_hash = fingerprint(stage.inputs) if stage.inputs else None
+            if (not force and not stage.always_run and inputs_hash is not None
+                and state.get(name) == inputs_hash and _outputs_exist(stage.outputs)):
+              print(f"[=] Stage {name} skipped (inputs unchanged)")
+              status[name] = 'skipped'
+              instrument.count('stages_skipped')
+              progressed = True
+              continue
+            upstream = {dep: results.get(dep) for dep in stage.depends + stage.after}
+            print(f"[*] Stage {name} started")
+            running[pool.submit(self._run_stage, stage, upstream)] = (name, inputs_hash)
+
+        if not running:
+          for name in pending:
+            print(f"[!] Stage {name} has unresolvable dependencies")
+            status[name] = 'blocked'
+          break
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+          name, inputs_hash = running.pop(future)
+          try:
+            results[name], elapsed = future.result()
+          except Exception as e:  # noqa: BLE001 - any stage error fails only that stage
+            print(f"[!] Stage {name} failed: {e}")
+            status[name] = 'failed'
+            continue
+          print(f"[+] Stage {name} finished in {elapsed:.1f}s")
+          status[name] = 'ran'
+          instrument.count('stages_run')
+          if inputs_hash is not None:
+            # Record the hash of the inputs the stage actually consumed
+            state[name] = inputs_hash
+            self._save_state(state)
+
+    return {name: s for name, s in status.items() if s != 'unselected'}
+
+  def _run_stage(self, stage, upstream):
+    start = time.perf_counter()
+    with instrument.stage(stage.name):
+      result = stage.func(upstream)
+    return result, time.perf_counter() - start
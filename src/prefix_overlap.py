@@ -0,0 +1,210 @@
+import argparse
+import csv
+import glob
+import ipaddress
+import os
+import sys
+from collections import Counter, defaultdict
+
+from src.agency_registry import ORGANIZATION_CATEGORIES
+
+ASN_DIR = 'data/asn'
+REPORT_PATH = 'data/asn/prefix-anomalies.csv'
+
+REPORT_COLUMNS = ['kind', 'prefix', 'asn', 'category', 'agency',
+                  'other_prefix', 'other_asn', 'other_category', 'other_agency', 'same_organization']
+
+# Report order; overlaps first, then changes since the previous run
+KINDS = ('moas', 'more-specific', 'origin-change', 'withdrawn', 'new')
+
+def load_announcements(asn_dir=ASN_DIR):
+  """
+  Read every data/asn/<category>-prefixes.csv of an organization category
+  (cloud providers' prefixes only back the hosting cross-check).
+
+  The same (prefix, ASN) can appear under several categories when an ASN is
+  listed in more than one source CSV; those rows are merged so one
+  announcement carries all of its owners.
+
+  Returns:
+    Dictionary of {(prefix, asn): {'network', 'owners': [(category, abbreviation, agency)]}}.
+  """
+  announcements = {}
+  for path in sorted(glob.glob(os.path.join(asn_dir, '*-prefixes.csv'))):
+    category = os.path.basename(path).removesuffix('-prefixes.csv')
+    if category not in ORGANIZATION_CATEGORIES:
+      continue
+    with open(path, newline='', encoding='utf-8') as f:
+      for row in csv.DictReader(f):
+        prefix = (row.get('prefix') or '').strip()
+        if not prefix:
+          continue
+        try:
+          network = ipaddress.ip_network(prefix, strict=False)
+        except ValueError:
+          continue
+        key = (str(network), row.get('asn', ''))
+        entry = announcements.setdefault(key, {'network': network, 'owners': []})
+        abbreviation = row.get('abbreviation', '')
+        owner = (category, abbreviation, row.get('agency') or abbreviation)
+        if owner not in entry['owners']:
+          entry['owners'].append(owner)
+  return announcements
+
+def _intervals(announcements):
+  """Sorted (version, start, -end, prefix, asn) tuples; containers sort before what they contain."""
+  intervals = []
+  for (prefix, asn), entry in announcements.items():
+    network = entry['network']
+    start = int(network.network_address)
+    intervals.append((network.version, start, -(start + network.num_addresses - 1), prefix, asn))
+  intervals.sort()
+  return intervals
+
+def find_overlaps(announcements):
+  """
+  Find every pair of announcements from different ASNs covering the same space.
+
+  CIDR blocks are either disjoint or nested, so a single sweep over the
+  blocks sorted by (start, -end) keeps a stack of the blocks enclosing the
+  current one: anything on the stack after popping the blocks that ended
+  contains it. Sorting dominates, giving O(n log n) plus one step per
+  reported pair (the stack is at most 33/129 deep).
+
+  Returns:
+    List of (kind, (prefix, asn), (covering_prefix, covering_asn)) where kind
+    is 'moas' for the same prefix from several origins and 'more-specific'
+    for a more-specific of another ASN's prefix.
+  """
+  overlaps = []
+  stack = []
+  version = None
+  for v, start, neg_end, prefix, asn in _intervals(announcements):
+    if v != version:
+      version, stack = v, []
+    while stack and -stack[-1][1] < start:
+      stack.pop()
+    for _, outer_neg_end, outer_prefix, outer_asn in stack:
+      if outer_asn != asn:
+        kind = 'moas' if outer_neg_end == neg_end and outer_prefix == prefix else 'more-specific'
+        overlaps.append((kind, (prefix, asn), (outer_prefix, outer_asn)))
+    stack.append((start, neg_end, prefix, asn))
+  return overlaps
+
+def diff_runs(previous, current):
+  """
+  Compare two runs' announcements by prefix.
+
+  Only categories present in both runs are compared, so a category that
+  failed to collect does not show up as every prefix withdrawn.
+
+  Returns:
+    List of (kind, prefix, current_asns, previous_asns) with kind 'withdrawn',
+    'new' or 'origin-change'.
+  """
+  def categories(announcements):
+    return {owner[0] for entry in announcements.values() for owner in entry['owners']}
+
+  shared = categories(previous) & categories(current)
+
+  def origins(announcements):
+    by_prefix = defaultdict(set)
+    for (prefix, asn), entry in announcements.items():
+      if any(owner[0] in shared for owner in entry['owners']):
+        by_prefix[prefix].add(asn)
+    return by_prefix
+
+  old, new = origins(previous), origins(current)
+  changes = []
+  for prefix in old.keys() | new.keys():
+    if prefix not in new:
+      changes.append(('withdrawn', prefix, set(), old[prefix]))
+    elif prefix not in old:
+      changes.append(('new', prefix, new[prefix], set()))
+    elif old[prefix] != new[prefix]:
+      changes.append(('origin-change', prefix, new[prefix], old[prefix]))
+  return changes
+
+def _owner_fields(entry):
+  owners = entry['owners']
+  return ';'.join(sorted({c for c, _, _ in owners})), ';'.join(sorted({a for _, _, a in owners}))
+
+def _same_organization(entry, other):
+  # fed-gov lists several names under one abbreviation (e.g. DoD and its NIC)
+  names = {a for _, _, a in entry['owners']} | {(c, ab) for c, ab, _ in entry['owners']}
+  other_names = {a for _, _, a in other['owners']} | {(c, ab) for c, ab, _ in other['owners']}
+  return bool(names & other_names)
+
+def build_report(current, previous=None):
+  """
+  Returns:
+    Report rows (dictionaries with REPORT_COLUMNS), overlaps first.
+  """
+  rows = []
+  for kind, key, other_key in find_overlaps(current):
+    entry, other = current[key], current[other_key]
+    category, agency = _owner_fields(entry)
+    other_category, other_agency = _owner_fields(other)
+    rows.append({
+      'kind': kind, 'prefix': key[0], 'asn': key[1], 'category': category, 'agency': agency,
+      'other_prefix': other_key[0], 'other_asn': other_key[1], 'other_category': other_category,
+      'other_agency': other_agency, 'same_organization': 'yes' if _same_organization(entry, other) else 'no',
+    })
+
+  if previous is not None:
+    for kind, prefix, new_asns, old_asns in diff_runs(previous, current):
+      side = current if new_asns else previous
+      asns = new_asns or old_asns
+      owners = [owner for asn in sorted(asns) for owner in side[(prefix, asn)]['owners']]
+      category, agency = _owner_fields({'owners': owners})
+      rows.append({
+        'kind': kind, 'prefix': prefix, 'asn': ';'.join(sorted(asns)), 'category': category, 'agency': agency,
+        'other_prefix': '', 'other_asn': ';'.join(sorted(old_asns)) if kind == 'origin-change' else '',
+        'other_category': '', 'other_agency': '', 'same_organization': '',
+      })
+
+  def sort_key(row):
+    network = ipaddress.ip_network(row['prefix'])
+    return (KINDS.index(row['kind']), network.version, int(network.network_address), network.prefixlen,
+            row['asn'], row['other_prefix'], row['other_asn'])
+
+  rows.sort(key=sort_key)
+  return rows
+
+def write_report(rows, path=REPORT_PATH):
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  with open(path, 'w', newline='', encoding='utf-8') as f:
+    writer = csv.DictWriter(f, fieldnames=REPORT_COLUMNS)
+    writer.writeheader()
+    writer.writerows(rows)
+  print(f"[+] Wrote {len(rows)} rows to {path}")
+
+def summarize(rows):
+  """Counter of (kind, same_organization) for the report rows."""
+  return Counter((row['kind'], row['same_organization']) for row in rows)
+
+def main():
+  parser = argparse.ArgumentParser(description='Find overlapping and changed prefixes across the ASN categories')
+  parser.add_argument('--asn-dir', default=ASN_DIR, help=f'Prefix CSV directory (default: {ASN_DIR})')
+  parser.add_argument('--previous', default=None, metavar='DIR',
+    help='Directory with the previous run\'s *-prefixes.csv files to diff against')
+  parser.add_argument('--output', default=REPORT_PATH, help=f'Report CSV path (default: {REPORT_PATH})')
+  args = parser.parse_args()
+
+  current = load_announcements(args.asn_dir)
+  previous = None
+  if args.previous:
+    if not os.path.isdir(args.previous):
+      print(f"[!] --previous not found: {args.previous}", file=sys.stderr)
+      sys.exit(1)
+    previous = load_announcements(args.previous)
+  print(f"[*] {len(current)} announcements in {args.asn_dir}")
+
+  rows = build_report(current, previous)
+  write_report(rows, args.output)
+  for (kind, same_org), count in sorted(summarize(rows).items(), key=lambda kv: KINDS.index(kv[0][0])):
+    scope = {'yes': ' (same organization)', 'no': ' (different organizations)'}.get(same_org, '')
+    print(f"  [=] {kind}{scope}: {count}")
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,476 @@
+import argparse
+import asyncio
+import csv
+import glob
+import ipaddress
+import json
+import os
+import re
+import secrets
+import socket
+import struct
+import sys
+import time
+
+from src import instrument
+
+CSV_DIR = 'data/csv'
+DNS_DIR = 'data/dns'
+NEGATIVE_CACHE_PATH = 'data/cache/dns-negative.json'
+DEFAULT_RESOLVERS = ['1.1.1.1', '8.8.8.8', '9.9.9.9']
+MAX_IN_FLIGHT = 2000
+TIMEOUT = 2.0
+ATTEMPTS = 3
+# RFC 2308: negative answers are cached for the SOA minimum, bounded here
+NEGATIVE_TTL_DEFAULT = 3600
+NEGATIVE_TTL_MIN = 60
+NEGATIVE_TTL_MAX = 86400
+EDNS_PAYLOAD_SIZE = 1232
+RECEIVE_BUFFER_BYTES = 4 << 20
+
+TYPE_A = 1
+TYPE_CNAME = 5
+TYPE_SOA = 6
+TYPE_AAAA = 28
+TYPE_OPT = 41
+RCODE_NOERROR = 0
+RCODE_NXDOMAIN = 3
+MAX_CNAME_HOPS = 16
+MAX_LABEL_LENGTH = 63
+MAX_NAME_LENGTH = 255
+# Letters, digits, hyphens and underscores (_dmarc, _domainkey); rejects the
+# URLs and organization names that turn up in certificate name fields
+_HOSTNAME_LABEL_RE = re.compile(r'[A-Za-z0-9_-]+')
+
+# ── Wire format ───────────────────────────────────────────────────────────────
+
+def encode_name(name):
+  """
+  Encode a hostname in DNS wire format.
+
+  Raises:
+    ValueError: name is not ASCII (IDNs must be in punycode), has an empty
+      label or one over 63 bytes, or is over 255 bytes encoded.
+  """
+  labels = name.rstrip('.').split('.')
+  encoded = b''
+  for label in labels:
+    raw = label.encode('ascii')
+    if not raw or len(raw) > MAX_LABEL_LENGTH:
+      raise ValueError(f"invalid label length {len(raw)} in {name!r}")
+    encoded += bytes([len(raw)]) + raw
+  encoded += b'\x00'
+  if len(encoded) > MAX_NAME_LENGTH:
+    raise ValueError(f"name longer than {MAX_NAME_LENGTH} bytes: {name!r}")
+  return encoded
+
+def check_hostname(name):
+  """
+  Raises:
+    ValueError: name is not a plain hostname, or too long to query.
+  """
+  labels = name.rstrip('.').split('.')
+  bad = next((label for label in labels if not _HOSTNAME_LABEL_RE.fullmatch(label)), None)
+  if bad is not None:
+    raise ValueError(f"not a hostname: {name!r}")
+  encode_name(name)
+
+def build_query(qid, name, qtype):
+  """Build a recursive query with an EDNS0 OPT record for larger UDP answers."""
+  header = struct.pack('>HHHHHH', qid, 0x0100, 1, 0, 0, 1)
+  question = encode_name(name) + struct.pack('>HH', qtype, 1)
+  opt = b'\x00' + struct.pack('>HHIH', TYPE_OPT, EDNS_PAYLOAD_SIZE, 0, 0)
+  return header + question + opt
+
+def _read_name(data, offset):
+  labels = []
+  end = None
+  for _ in range(128):
+    length = data[offset]
+    if length & 0xC0 == 0xC0:
+      if end is None:
+        end = offset + 2
+      offset = ((length & 0x3F) << 8) | data[offset + 1]
+      continue
+    offset += 1
+    if length == 0:
+      return '.'.join(labels).lower(), end if end is not None else offset
+    labels.append(data[offset:offset + length].decode('ascii', 'replace'))
+    offset += length
+  raise ValueError('DNS name compression loop')
+
+def parse_response(data):
+  """
+  Parse a DNS response.
+
+  Returns:
+    Tuple of (qid, rcode, truncated, answers, negative_ttl) where answers
+    is a list of (name, type, ttl, value) and negative_ttl comes from the
+    authority SOA (None when absent).
+  """
+  qid, flags, qdcount, ancount, nscount, _ = struct.unpack_from('>HHHHHH', data)
+  offset = 12
+  for _ in range(qdcount):
+    _, offset = _read_name(data, offset)
+    offset += 4
+
+  answers = []
+  negative_ttl = None
+  for index in range(ancount + nscount):
+    name, offset = _read_name(data, offset)
+    rtype, _, ttl, rdlength = struct.unpack_from('>HHIH', data, offset)
+    offset += 10
+    rdata = data[offset:offset + rdlength]
+    if index < ancount:
+      if rtype == TYPE_A and rdlength == 4:
+        answers.append((name, rtype, ttl, str(ipaddress.IPv4Address(rdata))))
+      elif rtype == TYPE_AAAA and rdlength == 16:
+        answers.append((name, rtype, ttl, str(ipaddress.IPv6Address(rdata))))
+      elif rtype == TYPE_CNAME:
+        answers.append((name, rtype, ttl, _read_name(data, offset)[0]))
+    elif rtype == TYPE_SOA:
+      _, soa_offset = _read_name(data, offset)
+      _, soa_offset = _read_name(data, soa_offset)
+      minimum = struct.unpack_from('>I', data, soa_offset + 16)[0]
+      negative_ttl = min(ttl, minimum)
+    offset += rdlength
+  return qid, flags & 0x000F, bool(flags & 0x0200), answers, negative_ttl
+
+# ── Negative cache ────────────────────────────────────────────────────────────
+
+class NegativeCache:
+  """
+  On-disk cache of NXDOMAIN/NODATA answers keyed by 'name/type'.
+
+  Entries expire after the negative TTL the authority returned, so dead
+  certificate names are not re-queried on every run.
+  """
+
+  def __init__(self, path=NEGATIVE_CACHE_PATH):
+    self.path = path
+    self.entries = {}
+    self._load()
+
+  def _load(self):
+    if not self.path or not os.path.exists(self.path):
+      return
+    try:
+      with open(self.path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+      print(f"[~] Ignoring unreadable DNS cache {self.path}: {e}")
+      return
+    now = time.time()
+    self.entries = {key: entry for key, entry in data.items() if entry['expires'] > now}
+
+  def save(self):
+    if not self.path:
+      return
+    os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+    tmp_path = f"{self.path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+      json.dump(self.entries, f)
+    os.replace(tmp_path, self.path)
+
+  def get(self, name, qtype):
+    entry = self.entries.get(f"{name}/{qtype}")
+    if entry is None or entry['expires'] <= time.time():
+      return None
+    return entry['status']
+
+  def add(self, name, qtype, status, ttl):
+    ttl = max(NEGATIVE_TTL_MIN, min(NEGATIVE_TTL_MAX, ttl if ttl is not None else NEGATIVE_TTL_DEFAULT))
+    self.entries[f"{name}/{qtype}"] = {'status': status, 'expires': time.time() + ttl}
+
+# ── Resolver ──────────────────────────────────────────────────────────────────
+
+def parse_nameserver(value):
+  """Parse '1.1.1.1', '127.0.0.1:5353' or '[::1]:53' into (host, port)."""
+  if value.startswith('['):
+    host, _, port = value[1:].partition(']:')
+    return host, int(port or 53)
+  if value.count(':') == 1:
+    host, port = value.split(':')
+    return host, int(port)
+  return value, 53
+
+class _DNSProtocol(asyncio.DatagramProtocol):
+  def __init__(self):
+    self.pending = {}
+
+  def datagram_received(self, data, addr):
+    if len(data) < 12:
+      return
+    qid = struct.unpack_from('>H', data)[0]
+    entry = self.pending.get(qid)
+    # The echoed question must match, or this is a stray/spoofed answer
+    if entry is None or data[12:12 + len(entry[1])].lower() != entry[1]:
+      return
+    if not entry[0].done():
+      entry[0].set_result(data)
+
+  def error_received(self, exc):
+    pass
+
+async def _query_tcp(host, port, packet):
+  """Send packet over TCP (RFC 1035 4.2.2 length framing) and return the response."""
+  reader, writer = await asyncio.open_connection(host, port)
+  try:
+    writer.write(struct.pack('>H', len(packet)) + packet)
+    await writer.drain()
+    (length,) = struct.unpack('>H', await reader.readexactly(2))
+    return await reader.readexactly(length)
+  finally:
+    writer.close()
+
+class AsyncResolver:
+  """
+  Asyncio stub resolver talking UDP to a list of recursive nameservers.
+
+  Up to max_in_flight queries are outstanding at once; timed-out or
+  SERVFAIL queries are retried on the next nameserver in the list.
+  Truncated UDP answers are repeated over TCP to the same nameserver.
+  """
+
+  def __init__(self, nameservers=None, max_in_flight=MAX_IN_FLIGHT, timeout=TIMEOUT,
+               attempts=ATTEMPTS, negative_cache=None):
+    self.nameservers = [parse_nameserver(ns) for ns in (nameservers or DEFAULT_RESOLVERS)]
+    self.max_in_flight = max_in_flight
+    self.timeout = timeout
+    self.attempts = attempts
+    self.negative_cache = negative_cache
+    self._endpoints = []
+    self._semaphore = None
+
+  async def __aenter__(self):
+    loop = asyncio.get_running_loop()
+    self._semaphore = asyncio.Semaphore(self.max_in_flight)
+    for host, port in self.nameservers:
+      transport, protocol = await loop.create_datagram_endpoint(_DNSProtocol, remote_addr=(host, port))
+      # Bursts of thousands of answers overflow the default receive buffer
+      try:
+        transport.get_extra_info('socket').setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER_BYTES)
+      except OSError:
+        pass
+      self._endpoints.append((transport, protocol))
+    return self
+
+  async def __aexit__(self, *exc):
+    for transport, _ in self._endpoints:
+      transport.close()
+    self._endpoints = []
+
+  async def query(self, name, qtype):
+    """
+    Returns:
+      Tuple of (status, answers, negative_ttl); status is 'ok', 'nxdomain',
+      'nodata' or 'error'.
+    """
+    if self.negative_cache:
+      cached = self.negative_cache.get(name, qtype)
+      if cached:
+        instrument.count('dns_negative_cache_hits')
+        return cached, [], None
+
+    loop = asyncio.get_running_loop()
+    start = secrets.randbelow(len(self._endpoints))
+    async with self._semaphore:
+      for attempt in range(self.attempts):
+        index = (start + attempt) % len(self._endpoints)
+        transport, protocol = self._endpoints[index]
+        # Unpredictable IDs make off-path answer spoofing harder
+        qid = secrets.randbits(16)
+        while qid in protocol.pending:
+          qid = secrets.randbits(16)
+        packet = build_query(qid, name, qtype)
+        future = loop.create_future()
+        # Question section: everything between the header and the OPT record
+        protocol.pending[qid] = (future, packet[12:-11].lower())
+        instrument.count('dns_queries')
+        try:
+          transport.sendto(packet)
+          data = await asyncio.wait_for(future, self.timeout)
+        except (TimeoutError, OSError):
+          continue
+        finally:
+          protocol.pending.pop(qid, None)
+        try:
+          _, rcode, truncated, answers, negative_ttl = parse_response(data)
+          if truncated:
+            instrument.count('dns_tcp_retries')
+            data = await asyncio.wait_for(_query_tcp(*self.nameservers[index], packet), self.timeout)
+            response_qid, rcode, truncated, answers, negative_ttl = parse_response(data)
+            if response_qid != qid or truncated:
+              continue
+        except (TimeoutError, OSError, EOFError, ValueError, IndexError, struct.error):
+          continue
+        if rcode == RCODE_NXDOMAIN:
+          status = 'nxdomain'
+        elif rcode != RCODE_NOERROR:
+          continue
+        elif not any(rtype == qtype for _, rtype, _, _ in answers):
+          status = 'nodata'
+        else:
+          return 'ok', answers, None
+        if self.negative_cache:
+          self.negative_cache.add(name, qtype, status, negative_ttl)
+        return status, answers, negative_ttl
+    instrument.count('dns_errors')
+    return 'error', [], None
+
+  async def resolve(self, name):
+    """
+    Resolve A and AAAA for name (AAAA is skipped when A says NXDOMAIN).
+
+    Returns:
+      Dictionary with 'status', 'cname' (the alias chain, in order) and
+      'ips' (IPv4 first, then IPv6).
+    """
+    status, answers, _ = await self.query(name, TYPE_A)
+    statuses = [status]
+    if status != 'nxdomain':
+      status6, answers6, _ = await self.query(name, TYPE_AAAA)
+      statuses.append(status6)
+      answers = answers + answers6
+
+    cnames = {}
+    for owner, rtype, _, value in answers:
+      if rtype == TYPE_CNAME:
+        cnames.setdefault(owner, value)
+    chain = []
+    target = name
+    while target in cnames and len(chain) < MAX_CNAME_HOPS:
+      target = cnames[target]
+      chain.append(target)
+    ips = list(dict.fromkeys(value for _, rtype, _, value in answers if rtype in (TYPE_A, TYPE_AAAA)))
+
+    if ips:
+      result_status = 'ok'
+    elif 'error' in statuses:
+      result_status = 'error'
+    else:
+      result_status = statuses[0] if statuses[0] == 'nxdomain' else 'nodata'
+    return {'status': result_status, 'cname': chain, 'ips': ips}
+
+  async def _resolve_or_error(self, name):
+    try:
+      check_hostname(name)
+      return await self.resolve(name)
+    except ValueError as e:
+      print(f"[~] Skipping {e}")
+      instrument.count('dns_invalid_names')
+      return {'status': 'error', 'cname': [], 'ips': []}
+
+  async def resolve_many(self, names):
+    """Resolve names concurrently; a name that cannot be queried gets status 'error'."""
+    names = list(dict.fromkeys(names))
+    results = await asyncio.gather(*(self._resolve_or_error(name) for name in names))
+    return dict(zip(names, results))
+
+def resolve_domains(names, nameservers=None, max_in_flight=MAX_IN_FLIGHT, timeout=TIMEOUT,
+                    attempts=ATTEMPTS, negative_cache=None):
+  """
+  Resolve hostnames concurrently.
+
+  Args:
+    names: Iterable of hostnames.
+    nameservers: Resolver addresses ('host' or 'host:port'); default DEFAULT_RESOLVERS.
+    max_in_flight: Maximum outstanding queries.
+    negative_cache: Optional NegativeCache; saved after the run.
+
+  Returns:
+    Dictionary of {name: {'status', 'cname', 'ips'}}.
+  """
+  async def run():
+    async with AsyncResolver(nameservers, max_in_flight, timeout, attempts, negative_cache) as resolver:
+      return await resolver.resolve_many(names)
+
+  results = asyncio.run(run())
+  if negative_cache:
+    negative_cache.save()
+  return results
+
+# ── Tables ────────────────────────────────────────────────────────────────────
+
+def read_domains(csv_path):
+  with open(csv_path, newline='', encoding='utf-8') as f:
+    return [row['domain'] for row in csv.DictReader(f) if row.get('domain')]
+
+def write_dns_csv(output_path, names, results):
+  """
+  Write one row per (domain, ip); names without addresses get a single row
+  with an empty ip so their status is kept. The ip column feeds
+  `python -m src.ipasn --dns-csv`.
+  """
+  os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+  rows = 0
+  with open(output_path, 'w', newline='', encoding='utf-8') as f:
+    writer = csv.writer(f)
+    writer.writerow(['domain', 'status', 'ip', 'cname'])
+    for name in sorted(names):
+      result = results[name]
+      cname = ';'.join(result['cname'])
+      for ip in result['ips'] or ['']:
+        writer.writerow([name, result['status'], ip, cname])
+        rows += 1
+  return rows
+
+def resolve_csv_files(csv_paths, output_dir=DNS_DIR, **kwargs):
+  """
+  Resolve every domain listed in csv_paths (each name once) and write
+  <output_dir>/<base>_dns.csv per input file.
+
+  Returns:
+    List of written paths.
+  """
+  domains_by_file = {path: read_domains(path) for path in csv_paths}
+  names = list(dict.fromkeys(name for domains in domains_by_file.values() for name in domains))
+  print(f"[*] Resolving {len(names)} hostnames from {len(csv_paths)} files")
+  start = time.perf_counter()
+  with instrument.stage('resolve'):
+    results = resolve_domains(names, **kwargs)
+  elapsed = time.perf_counter() - start
+  resolved = sum(1 for r in results.values() if r['status'] == 'ok')
+  print(f"[+] {resolved} of {len(names)} hostnames resolved in {elapsed:.1f}s")
+  instrument.count('hostnames', len(names))
+
+  written = []
+  with instrument.stage('write'):
+    for csv_path, domains in domains_by_file.items():
+      name = os.path.splitext(os.path.basename(csv_path))[0]
+      output = os.path.join(output_dir, f"{name}_dns.csv")
+      write_dns_csv(output, domains, results)
+      written.append(output)
+  return written
+
+def main():
+  parser = argparse.ArgumentParser(description='Resolve A/AAAA/CNAME records for the domains in data/csv')
+  parser.add_argument('csv_files', nargs='*', help=f'Domain CSVs to resolve (default: {CSV_DIR}/*.csv)')
+  parser.add_argument('--output-dir', default=DNS_DIR, help=f'Output directory (default: {DNS_DIR})')
+  parser.add_argument('--resolvers', default=','.join(DEFAULT_RESOLVERS),
+    help='Comma-separated nameservers, host or host:port (default: %(default)s)')
+  parser.add_argument('--max-in-flight', type=int, default=MAX_IN_FLIGHT,
+    help=f'Maximum outstanding queries (default: {MAX_IN_FLIGHT})')
+  parser.add_argument('--timeout', type=float, default=TIMEOUT, help=f'Per-query timeout in seconds (default: {TIMEOUT})')
+  parser.add_argument('--attempts', type=int, default=ATTEMPTS,
+    help=f'Tries per query, rotating nameservers (default: {ATTEMPTS})')
+  parser.add_argument('--negative-cache', default=NEGATIVE_CACHE_PATH,
+    help=f'NXDOMAIN/NODATA cache path, empty to disable (default: {NEGATIVE_CACHE_PATH})')
+  instrument.add_arguments(parser)
+  args = parser.parse_args()
+
+  csv_paths = args.csv_files or sorted(glob.glob(os.path.join(CSV_DIR, '*.csv')))
+  if not csv_paths:
+    print(f"[!] No domain CSVs found in {CSV_DIR}", file=sys.stderr)
+    sys.exit(1)
+  with instrument.instrumented_run('resolve', args.report, args.profile):
+    written = resolve_csv_files(
+      csv_paths, args.output_dir,
+      nameservers=[ns.strip() for ns in args.resolvers.split(',') if ns.strip()],
+      max_in_flight=args.max_in_flight, timeout=args.timeout, attempts=args.attempts,
+      negative_cache=NegativeCache(args.negative_cache) if args.negative_cache else None,
+    )
+  print(f"[+] Wrote {len(written)} files to {args.output_dir}")
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,448 @@
+import argparse
+import atexit
+import csv
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+import threading
+import zlib
+from contextlib import contextmanager
+from datetime import UTC, datetime
+
+SNAPSHOT_DIR = 'data/snapshots'
+RUN_ID_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+# Run IDs are UTC timestamps (older runs without the fraction), plus a
+# '-N' counter when a run with the same timestamp already exists
+_RUN_ID_RE = re.compile(r'(?P<time>[^Z]+Z)(?:-(?P<counter>\d+))?')
+
+def parse_run_id(run_id):
+  """
+  Returns:
+    (datetime, counter) sort key for a run ID or an ISO-8601 timestamp.
+  """
+  m = _RUN_ID_RE.fullmatch(run_id)
+  if not m:
+    raise ValueError(f"Not a run ID: {run_id!r}")
+  return datetime.fromisoformat(m.group('time')), int(m.group('counter') or 0)
+
+def _parse_when(when):
+  """Parse an as_of bound; a bare date means the end of that day."""
+  if len(when) == 10:
+    return datetime.fromisoformat(f"{when}T23:59:59.999999Z")
+  moment = datetime.fromisoformat(when)
+  return moment if moment.tzinfo else moment.replace(tzinfo=UTC)
+
+class SnapshotStore:
+  """
+  Append-only history of the domain and prefix tables.
+
+  Every run records one segment per dataset (e.g. 'domains/domain.cdc.gov'
+  or 'prefixes/fed-gov'). A segment stores each column as its own
+  zlib-compressed block behind a small header, so reading one column never
+  decompresses the others. Segments are content-addressed: a dataset that
+  did not change between runs points at the existing segment instead of
+  writing a new one. manifest.json lists runs in order with the segment of
+  every dataset they recorded.
+
+  The manifest is read once per store and updated in memory; the current
+  run is written to it by flush(), once per run.
+  """
+
+  def __init__(self, root=SNAPSHOT_DIR, run_id=None):
+    self.root = root
+    self.manifest_path = os.path.join(root, 'manifest.json')
+    self.segment_dir = os.path.join(root, 'segments')
+    self._lock = threading.Lock()
+    self._manifest = self._load_manifest()
+    self._runs = {run['run_id']: run for run in self._manifest['runs']}
+    self.run_id = self._unique_run_id(run_id or datetime.now(UTC).strftime(RUN_ID_FORMAT), self._runs)
+    self._run = None
+    self._flushed = False
+
+  # ── Manifest ────────────────────────────────────────────────────────────────
+
+  def _load_manifest(self):
+    if not os.path.exists(self.manifest_path):
+      return {'runs': []}
+    with open(self.manifest_path, 'r', encoding='utf-8') as f:
+      return json.load(f)
+
+  def _save_manifest(self, manifest):
+    os.makedirs(self.root, exist_ok=True)
+    tmp_path = f"{self.manifest_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+      json.dump(manifest, f, indent=1)
+      f.write('\n')
+    os.replace(tmp_path, self.manifest_path)
+
+  @staticmethod
+  def _unique_run_id(run_id, existing):
+    parse_run_id(run_id)
+    base, counter = run_id, 1
+    while run_id in existing:
+      run_id = f"{base}-{counter}"
+      counter += 1
+    return run_id
+
+  def flush(self):
+    """
+    Write the current run to manifest.json.
+
+    The manifest is re-read first so runs flushed by other processes since
+    this store was opened are kept; the run is renamed if one of them took
+    the same ID.
+    """
+    with self._lock:
+      if self._run is None:
+        return
+      manifest = self._load_manifest()
+      taken = {run['run_id'] for run in manifest['runs']}
+      if not self._flushed and self.run_id in taken:
+        del self._runs[self.run_id]
+        self.run_id = self._run['run_id'] = self._unique_run_id(self.run_id, taken | self._runs.keys())
+      manifest['runs'] = [run for run in manifest['runs'] if run['run_id'] != self.run_id] + [self._run]
+      self._save_manifest(manifest)
+      self._manifest = manifest
+      self._runs = {run['run_id']: run for run in manifest['runs']}
+      self._flushed = True
+
+  def runs(self, dataset=None):
+    """Return run IDs in chronological order, optionally only those recording dataset."""
+    runs = [run['run_id'] for run in self._manifest['runs'] if dataset is None or dataset in run['datasets']]
+    return sorted(runs, key=parse_run_id)
+
+  def _segment_for(self, dataset, run_id):
+    run = self._runs.get(run_id)
+    if run is None:
+      raise KeyError(f"Unknown run {run_id}")
+    entry = run['datasets'].get(dataset)
+    if entry is None:
+      raise KeyError(f"Run {run_id} has no dataset {dataset}")
+    return entry
+
+  # ── Writing ─────────────────────────────────────────────────────────────────
+
+  def writer(self, dataset, columns):
+    """
+    Return a SegmentWriter that records dataset into the current run when
+    closed, for tables too large to hold as a list of rows.
+    """
+    return SegmentWriter(self, dataset, columns)
+
+  def record(self, dataset, columns, rows):
+    """
+    Append a dataset snapshot to the current run.
+
+    Args:
+      dataset: Dataset name, e.g. 'domains/domain.cdc.gov'.
+      columns: Column names, in order.
+      rows: Iterable of dictionaries keyed by column name; consumed as a
+        stream.
+
+    Returns:
+      The segment ID (content hash) the dataset was stored under.
+    """
+    writer = self.writer(dataset, columns)
+    for row in rows:
+      writer.append(row)
+    return writer.close()
+
+  def _store_segment(self, dataset, columns, count, blocks):
+    header = {'rows': count, 'columns': []}
+    offset = 0
+    for name, block in zip(columns, blocks):
+      header['columns'].append({'name': name, 'offset': offset, 'length': len(block)})
+      offset += len(block)
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    payload = struct.pack('>I', len(header_bytes)) + header_bytes + b''.join(blocks)
+
+    segment_id = hashlib.sha256(payload).hexdigest()[:32]
+    path = os.path.join(self.segment_dir, f"{segment_id}.seg")
+    if not os.path.exists(path):
+      os.makedirs(self.segment_dir, exist_ok=True)
+      with open(path, 'wb') as f:
+        f.write(payload)
+
+    # Pipeline stages record concurrently; serialize the manifest update
+    with self._lock:
+      if self._run is None:
+        self._run = {'run_id': self.run_id, 'datasets': {}}
+        self._manifest['runs'].append(self._run)
+        self._runs[self.run_id] = self._run
+      self._run['datasets'][dataset] = {'segment': segment_id, 'rows': count, 'columns': list(columns)}
+    return segment_id
+
+  # ── Reading ─────────────────────────────────────────────────────────────────
+
+  def _read_columns(self, segment_id, names):
+    path = os.path.join(self.segment_dir, f"{segment_id}.seg")
+    with open(path, 'rb') as f:
+      (header_len,) = struct.unpack('>I', f.read(4))
+      header = json.loads(f.read(header_len))
+      base = 4 + header_len
+      blocks = {c['name']: c for c in header['columns']}
+      result = {}
+      for name in names:
+        block = blocks[name]
+        f.seek(base + block['offset'])
+        result[name] = json.loads(zlib.decompress(f.read(block['length'])))
+    return result
+
+  def read(self, dataset, run_id, columns=None):
+    """Return the rows of dataset at run_id, decompressing only the requested columns."""
+    entry = self._segment_for(dataset, run_id)
+    names = columns or entry['columns']
+    data = self._read_columns(entry['segment'], names)
+    return [dict(zip(names, values)) for values in zip(*(data[name] for name in names))]
+
+  def as_of(self, dataset, when, columns=None):
+    """
+    Return (run_id, rows) for the latest run of dataset at or before when.
+
+    Args:
+      when: ISO-8601 UTC timestamp ('2026-08-17T00:00:00Z') or date ('2026-08-17').
+    """
+    bound = _parse_when(when)
+    candidates = [run_id for run_id in self.runs(dataset) if parse_run_id(run_id)[0] <= bound]
+    if not candidates:
+      return None, []
+    return candidates[-1], self.read(dataset, candidates[-1], columns)
+
+  def _keyed_rows(self, dataset, run_id, segment_id, key, compare):
+    """Map each row's key (a value, or a tuple for several key columns) to its compare values."""
+    key_columns = [key] if isinstance(key, str) else list(key)
+    names = key_columns + [name for name in compare if name not in key_columns]
+    data = self._read_columns(segment_id, names)
+    rows = {}
+    for values in zip(*(data[name] for name in names)):
+      row_key = values[0] if isinstance(key, str) else values[:len(key_columns)]
+      if row_key in rows:
+        raise ValueError(f"Key {row_key!r} repeats in {dataset} at {run_id}; "
+                         f"use a key that is unique per row (e.g. ('asn', 'prefix'))")
+      rows[row_key] = values[len(key_columns):]
+    return rows
+
+  def diff(self, dataset, old_run, new_run, key, compare=None):
+    """
+    Compare a dataset between two runs.
+
+    Only the key columns (plus any compare columns) are decompressed, and
+    identical segments short-circuit without reading anything.
+
+    Args:
+      key: Column name, or a tuple of column names for datasets where no
+        single column is unique (the prefix tables need ('asn', 'prefix')).
+        Raises ValueError if a key repeats within a snapshot.
+      compare: Columns whose change marks a key as changed.
+
+    Returns:
+      Dictionary with sorted 'added' and 'removed' keys, and 'changed'
+      keys whose compare columns differ.
+    """
+    old_entry = self._segment_for(dataset, old_run)
+    new_entry = self._segment_for(dataset, new_run)
+    result = {'added': [], 'removed': [], 'changed': []}
+    if old_entry['segment'] == new_entry['segment']:
+      return result
+
+    compare = list(compare or [])
+    old_rows = self._keyed_rows(dataset, old_run, old_entry['segment'], key, compare)
+    new_rows = self._keyed_rows(dataset, new_run, new_entry['segment'], key, compare)
+
+    result['added'] = sorted(new_rows.keys() - old_rows.keys())
+    result['removed'] = sorted(old_rows.keys() - new_rows.keys())
+    if compare:
+      result['changed'] = sorted(k for k in new_rows.keys() & old_rows.keys() if new_rows[k] != old_rows[k])
+    return result
+
+  def first_seen(self, dataset, value, key):
+    """
+    Return the first run_id whose dataset snapshot contains value in its key
+    column (or value, a tuple, in its key columns when key is a tuple).
+    """
+    key_columns = [key] if isinstance(key, str) else list(key)
+    membership = {}
+    for run_id in self.runs(dataset):
+      segment_id = self._segment_for(dataset, run_id)['segment']
+      if segment_id not in membership:
+        data = self._read_columns(segment_id, key_columns)
+        if isinstance(key, str):
+          membership[segment_id] = value in set(data[key])
+        else:
+          membership[segment_id] = tuple(value) in set(zip(*(data[name] for name in key_columns)))
+      if membership[segment_id]:
+        return run_id
+    return None
+
+class SegmentWriter:
+  """
+  Builds one segment from rows appended one at a time.
+
+  Each column is a JSON array fed through its own zlib stream in chunks of
+  CHUNK_ROWS values, so only the compressed blocks stay in memory. The
+  blocks are byte-identical to compressing the whole column at once, so an
+  unchanged table still maps to its existing segment.
+  """
+
+  CHUNK_ROWS = 4096
+
+  def __init__(self, store, dataset, columns):
+    self.store = store
+    self.dataset = dataset
+    self.columns = list(columns)
+    self.count = 0
+    self._compressors = [zlib.compressobj(9) for _ in self.columns]
+    self._blocks = [[compressor.compress(b'[')] for compressor in self._compressors]
+    self._pending = [[] for _ in self.columns]
+
+  def append(self, row):
+    for values, name in zip(self._pending, self.columns):
+      values.append(json.dumps(row.get(name, ''), separators=(',', ':')))
+    self.count += 1
+    if len(self._pending[0]) >= self.CHUNK_ROWS:
+      self._compress_pending()
+
+  def _compress_pending(self):
+    # The first chunk starts the array; later ones continue it after a comma
+    lead = ',' if self.count > len(self._pending[0]) else ''
+    for compressor, blocks, values in zip(self._compressors, self._blocks, self._pending):
+      if values:
+        blocks.append(compressor.compress((lead + ','.join(values)).encode('utf-8')))
+        values.clear()
+
+  def close(self):
+    """Store the segment and add it to the current run; returns the segment ID."""
+    self._compress_pending()
+    blocks = []
+    for compressor, parts in zip(self._compressors, self._blocks):
+      parts.append(compressor.compress(b']'))
+      parts.append(compressor.flush())
+      blocks.append(b''.join(parts))
+    return self.store._store_segment(self.dataset, self.columns, self.count, blocks)
+
+# Module-level store so the CSV writers can record snapshots without
+# threading a store object through every caller; recording is a no-op until
+# start() is called.
+_current = None
+
+def start(root=SNAPSHOT_DIR, run_id=None):
+  """Start recording; the run is written to the manifest when the process exits."""
+  global _current
+  finish()
+  _current = SnapshotStore(root, run_id)
+  atexit.register(_current.flush)
+  return _current
+
+def current():
+  return _current
+
+def record(dataset, columns, rows):
+  if _current is None:
+    return None
+  segment_id = _current.record(dataset, columns, rows)
+  print(f"[+] Snapshot {dataset} recorded in {_current.root} ({segment_id[:12]})")
+  return segment_id
+
+@contextmanager
+def recording(dataset, columns):
+  """
+  Stream a table into the current run: yields a SegmentWriter to append rows
+  to (None when recording is off) and records the dataset on exit.
+  """
+  if _current is None:
+    yield None
+    return
+  writer = _current.writer(dataset, columns)
+  yield writer
+  segment_id = writer.close()
+  print(f"[+] Snapshot {dataset} recorded in {_current.root} ({segment_id[:12]})")
+
+def finish():
+  """Write the current run to the manifest; call once when the run is done."""
+  if _current is not None:
+    _current.flush()
+
+def add_arguments(parser):
+  """Add the shared --snapshots option to an argparse parser."""
+  parser.add_argument('--snapshots', nargs='?', const=SNAPSHOT_DIR, default=None, metavar='DIR',
+    help=f'Also record written tables in the snapshot store at DIR (default: {SNAPSHOT_DIR})')
+
+def main():
+  parser = argparse.ArgumentParser(description='Query the domain/prefix snapshot history')
+  parser.add_argument('--root', default=SNAPSHOT_DIR, help=f'Snapshot directory (default: {SNAPSHOT_DIR})')
+  sub = parser.add_subparsers(dest='command', required=True)
+
+  runs_parser = sub.add_parser('runs', help='List runs')
+  runs_parser.add_argument('dataset', nargs='?', default=None)
+
+  as_of_parser = sub.add_parser('as-of', help='Print a dataset as of a timestamp')
+  as_of_parser.add_argument('dataset')
+  as_of_parser.add_argument('when')
+  as_of_parser.add_argument('--columns', default=None, help='Comma-separated columns to print')
+
+  diff_parser = sub.add_parser('diff', help='Diff a dataset between two runs')
+  diff_parser.add_argument('dataset')
+  diff_parser.add_argument('old_run')
+  diff_parser.add_argument('new_run')
+  diff_parser.add_argument('--key', default='domain',
+    help='Key column, or comma-separated columns (e.g. asn,prefix for prefix datasets)')
+  diff_parser.add_argument('--compare', default=None, help='Comma-separated columns to compare')
+
+  seen_parser = sub.add_parser('first-seen', help='Find the first run containing a value')
+  seen_parser.add_argument('dataset')
+  seen_parser.add_argument('value')
+  seen_parser.add_argument('--key', default='domain',
+    help='Key column, or comma-separated columns with a matching comma-separated value')
+
+  record_parser = sub.add_parser('record', help='Record existing CSV files as one run')
+  record_parser.add_argument('kind', help='Dataset kind, e.g. prefixes')
+  record_parser.add_argument('paths', nargs='+', metavar='CSV',
+    help='Files to record as <kind>/<name>, with a trailing -<kind> dropped from the name')
+  args = parser.parse_args()
+
+  if args.command == 'record':
+    start(args.root)
+    for path in args.paths:
+      name = os.path.basename(path).removesuffix('.csv').removesuffix(f"-{args.kind}")
+      with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        record(f"{args.kind}/{name}", reader.fieldnames, reader)
+    finish()
+    return
+
+  store = SnapshotStore(args.root)
+  if args.command == 'runs':
+    for run_id in store.runs(args.dataset):
+      print(run_id)
+  elif args.command == 'as-of':
+    columns = args.columns.split(',') if args.columns else None
+    run_id, rows = store.as_of(args.dataset, args.when, columns)
+    if run_id is None:
+      print(f"No snapshot of {args.dataset} at or before {args.when}", file=sys.stderr)
+      sys.exit(1)
+    print(f"# {args.dataset} @ {run_id}", file=sys.stderr)
+    print(json.dumps(rows, indent=2))
+  elif args.command == 'diff':
+    compare = args.compare.split(',') if args.compare else None
+    key = tuple(args.key.split(',')) if ',' in args.key else args.key
+    try:
+      result = store.diff(args.dataset, args.old_run, args.new_run, key, compare)
+    except ValueError as e:
+      print(f"[!] {e}", file=sys.stderr)
+      sys.exit(1)
+    print(json.dumps(result, indent=2))
+  elif args.command == 'first-seen':
+    if ',' in args.key:
+      run_id = store.first_seen(args.dataset, tuple(args.value.split(',')), tuple(args.key.split(',')))
+    else:
+      run_id = store.first_seen(args.dataset, args.value, args.key)
+    if run_id is None:
+      print(f"{args.value} not found in {args.dataset}", file=sys.stderr)
+      sys.exit(1)
+    print(run_id)
+
+if __name__ == '__main__':
+  main()
@@ -1,11 +1,28 @@
+import bisect
+import ipaddress
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pprint import pprint
+
 from ipwhois import IPWhois
+from ipwhois.asn import ASNOrigin
+from ipwhois.exceptions import BaseIpwhoisException
 from ipwhois.net import Net
-from ipwhois.asn import IPASN
-from pprint import pprint
+
+from src import instrument
+
+# Any routable address works; ASN origin queries only need a Net to issue whois from.
+ASN_LOOKUP_ADDRESS = '2001:1234:1234::'
+CACHE_PATH = 'data/cache/whois.json'
+CACHE_TTL = 7 * 24 * 3600
+MAX_WORKERS = 8
 
 def whois(ip):
   obj = IPWhois(ip)
   results = obj.lookup_rdap(depth=1,retry_count=5,rate_limit_timeout=5)
+  network = results.get("network") or {}
 
   results_stripped = {
     "asn": results.get("asn"),
@@ -15,31 +32,259 @@ def whois(ip):
     "asn_description": results.get("asn_description"),
     "asn_registry": results.get("asn_registry"),
     "entities": results.get("entities"),
-    "net_start_address": results.get("network").get("cidr"),
-    "net_end_address": results.get("network").get("end_address"),
-    "net_cidr": results.get("network").get("cidr"),
-    "net_type": results.get("network").get("type"),
-    "net_organization": results.get("network").get("name"),
-    "net_ref": results.get("network").get("links"),
+    "net_start_address": network.get("cidr"),
+    "net_end_address": network.get("end_address"),
+    "net_cidr": network.get("cidr"),
+    "net_type": network.get("type"),
+    "net_organization": network.get("name"),
+    "net_ref": network.get("links"),
     "raw_command": f"whois -h whois.radb.net {ip}"
   }
 
-  if results.get("network") is not None:
-    if results.get("network").get("events") is not None:
-      for event in results.get("network").get("events"):
-        if event.get("action") == "last changed":
-          results_stripped["net_updated"] = event["timestamp"]
-        elif event.get("action") == "registration":
-          results_stripped["registration"] = event["timestamp"]
+  if network.get("events") is not None:
+    for event in network.get("events"):
+      if event.get("action") == "last changed":
+        results_stripped["net_updated"] = event["timestamp"]
+      elif event.get("action") == "registration":
+        results_stripped["registration"] = event["timestamp"]
 
   return results_stripped
 
-def whois_asn(asn):
-  net = Net('2001:1234:1234::')
-  obj = IPASN(net)
-  results = obj.lookup(asn=asn)
+def whois_asn(asn, address=ASN_LOOKUP_ADDRESS):
+  net = Net(address)
+  obj = ASNOrigin(net)
+  results = obj.lookup(asn=asn, retry_count=5)
+  return results
+
+# ── Batch lookups ─────────────────────────────────────────────────────────────
+
+class WhoisCache:
+  """
+  On-disk TTL cache for whois results.
+
+  Network results are keyed by CIDR so any later IP inside an already
+  resolved network is answered without a lookup; ASN results by 'AS<num>'.
+  """
+
+  def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL):
+    self.path = path
+    self.ttl = ttl
+    self.networks = {}
+    self.asns = {}
+    # {version: {prefixlen: {network_int: entry}}} with prefix lengths kept
+    # sorted, so a lookup is one masked dict probe per length
+    self._index = {4: {}, 6: {}}
+    self._prefixlens = {4: [], 6: []}
+    self._load()
+
+  def _load(self):
+    if not self.path or not os.path.exists(self.path):
+      return
+    try:
+      with open(self.path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+      print(f"[~] Ignoring unreadable whois cache {self.path}: {e}")
+      return
+    now = time.time()
+    for cidr, entry in data.get('networks', {}).items():
+      if now - entry['fetched_at'] < self.ttl:
+        self._add_network(ipaddress.ip_network(cidr), entry)
+    for asn, entry in data.get('asns', {}).items():
+      if now - entry['fetched_at'] < self.ttl:
+        self.asns[asn] = entry
+
+  def save(self):
+    if not self.path:
+      return
+    os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+    data = {
+      'networks': {str(net): entry for net, entry in self.networks.items()},
+      'asns': self.asns,
+    }
+    tmp_path = f"{self.path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+      json.dump(data, f)
+    os.replace(tmp_path, self.path)
+
+  def _add_network(self, net, entry):
+    self.networks[net] = entry
+    by_len = self._index[net.version]
+    if net.prefixlen not in by_len:
+      by_len[net.prefixlen] = {}
+      bisect.insort(self._prefixlens[net.version], net.prefixlen)
+    by_len[net.prefixlen][int(net.network_address)] = entry
+
+  def add_ip_result(self, result):
+    """Store a whois() result under every CIDR of its network. Returns the CIDRs stored."""
+    entry = {'fetched_at': time.time(), 'result': result}
+    nets = []
+    for cidr in (result.get('net_cidr') or '').split(','):
+      try:
+        net = ipaddress.ip_network(cidr.strip(), strict=False)
+      except ValueError:
+        continue
+      self._add_network(net, entry)
+      nets.append(net)
+    return nets
+
+  def find_network(self, ip):
+    """Return the cached result of the most specific network containing ip, or None."""
+    addr = ipaddress.ip_address(ip)
+    value = int(addr)
+    bits = addr.max_prefixlen
+    by_len = self._index[addr.version]
+    for prefixlen in reversed(self._prefixlens[addr.version]):
+      entry = by_len[prefixlen].get(value >> (bits - prefixlen) << (bits - prefixlen))
+      if entry is not None:
+        return entry['result']
+    return None
+
+def whois_batch(ips, cache=None, max_workers=MAX_WORKERS, lookup=whois):
+  """
+  Resolve many IPs, skipping any that fall in an already resolved network.
+
+  The IPs are sorted and split into max_workers contiguous lanes, each
+  feeding one slot of a long-lived thread pool, so concurrent lookups come
+  from distant parts of the address space. When a lookup completes, its
+  networks are cached and the still pending IPs inside them (found by
+  bisecting the sorted list) are answered without a lookup. Idle slots are
+  refilled by splitting the lane that just completed, whose remaining IPs
+  are then known to lie outside every resolved network; splitting a lane
+  with a lookup still in flight would mostly duplicate it.
+
+  Args:
+    ips: Iterable of IP address strings.
+    cache: Optional WhoisCache; a default on-disk cache is used if omitted.
+    max_workers: Maximum concurrent lookups.
+    lookup: Function resolving one IP (defaults to whois).
+
+  Returns:
+    Dictionary of {ip: result}; failed lookups map to None.
+  """
+  cache = cache if cache is not None else WhoisCache()
+  results = {}
+  keys = []
+  hits = 0
+  for ip in dict.fromkeys(ips):
+    try:
+      addr = ipaddress.ip_address(ip)
+    except ValueError:
+      print(f"[!] Skipping invalid IP {ip!r}")
+      results[ip] = None
+      continue
+    cached = cache.find_network(addr)
+    if cached is not None:
+      results[ip] = cached
+      hits += 1
+    else:
+      keys.append((addr.version, int(addr), ip))
+  keys.sort()
+  positions = [key[:2] for key in keys]
+  done = [False] * len(keys)
+  size = -(-len(keys) // max_workers) if keys else 0
+  lanes = [[lo, min(lo + size, len(keys))] for lo in range(0, len(keys), size or 1)]
+
+  def claim(lane):
+    bounds = lanes[lane]
+    while bounds[0] < bounds[1] and done[bounds[0]]:
+      bounds[0] += 1
+    if bounds[0] == bounds[1]:
+      return None
+    done[bounds[0]] = True
+    bounds[0] += 1
+    return bounds[0] - 1
+
+  def cover(net, result):
+    first = bisect.bisect_left(positions, (net.version, int(net.network_address)))
+    last = bisect.bisect_right(positions, (net.version, int(net.broadcast_address)))
+    covered = 0
+    for i in range(first, last):
+      if not done[i]:
+        done[i] = True
+        results[keys[i][2]] = result
+        covered += 1
+    return covered
+
+  lookups = 0
+  idle = 0
+  with ThreadPoolExecutor(max_workers=max_workers) as pool:
+    in_flight = {}
+
+    def submit(lane):
+      nonlocal lookups, idle
+      i = claim(lane)
+      if i is None:
+        idle += 1
+        return
+      in_flight[pool.submit(_safe_lookup, lookup, keys[i][2])] = (lane, i)
+      lookups += 1
+
+    for lane in range(len(lanes)):
+      submit(lane)
+    while in_flight:
+      finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+      for future in finished:
+        lane, i = in_flight.pop(future)
+        result = future.result()
+        results[keys[i][2]] = result
+        if result is not None:
+          for net in cache.add_ip_result(result):
+            hits += cover(net, result)
+        bounds = lanes[lane]
+        while bounds[0] < bounds[1] and done[bounds[0]]:
+          bounds[0] += 1
+        while idle and bounds[1] - bounds[0] >= 2:
+          mid = (bounds[0] + bounds[1]) // 2
+          lanes.append([mid, bounds[1]])
+          bounds[1] = mid
+          idle -= 1
+          submit(len(lanes) - 1)
+        submit(lane)
+
+  cache.save()
+  instrument.count('whois_cache_hits', hits)
+  instrument.count('whois_lookups', lookups)
+  print(f"[+] Resolved {len(results)} IPs with {lookups} lookups ({hits} from cached networks)")
+  return results
+
+def whois_asn_batch(asns, cache=None, max_workers=MAX_WORKERS, lookup=whois_asn):
+  """
+  Resolve many ASNs concurrently, reusing cached results within the TTL.
+
+  Args:
+    asns: Iterable of ASNs ('AS26810' or '26810').
+    cache: Optional WhoisCache; a default on-disk cache is used if omitted.
+    max_workers: Maximum concurrent lookups.
+    lookup: Function resolving one ASN (defaults to whois_asn).
+
+  Returns:
+    Dictionary of {'AS<num>': result}; failed lookups map to None.
+  """
+  cache = cache if cache is not None else WhoisCache()
+  keys = list(dict.fromkeys(f"AS{str(asn).upper().removeprefix('AS')}" for asn in asns))
+  results = {key: cache.asns[key]['result'] for key in keys if key in cache.asns}
+  missing = [key for key in keys if key not in results]
+
+  with ThreadPoolExecutor(max_workers=max_workers) as pool:
+    for key, result in zip(missing, pool.map(lambda key: _safe_lookup(lookup, key), missing)):
+      results[key] = result
+      if result is not None:
+        cache.asns[key] = {'fetched_at': time.time(), 'result': result}
+
+  cache.save()
+  instrument.count('whois_cache_hits', len(keys) - len(missing))
+  instrument.count('whois_lookups', len(missing))
+  print(f"[+] Resolved {len(keys)} ASNs ({len(keys) - len(missing)} from cache)")
   return results
 
+def _safe_lookup(lookup, query):
+  try:
+    return lookup(query)
+  except (BaseIpwhoisException, OSError, ValueError) as e:
+    print(f"[!] Lookup failed for {query}: {e}")
+    return None
+
 
 def main():
   # result = whois('127.0.0.1')
@@ -0,0 +1,72 @@
+import csv
+
+import pytest
+
+from src import agency_registry, prefix_overlap
+from src.agency_registry import AgencyRegistry, parse_asn
+from src.ipasn import IPASNIndex
+
+SOURCES = {
+  'fed-gov': {'file': 'fed.csv', 'label': 'Federal Agencies', 'abbreviation': 'abbrievations', 'name': 'fedagency'},
+  'state-gov': {'file': 'state.csv', 'label': 'State Governments', 'abbreviation': 'stategov', 'name': None},
+}
+
+
+def _write_csv(path, fieldnames, rows):
+  with open(path, 'w', newline='', encoding='utf-8') as f:
+    writer = csv.DictWriter(f, fieldnames=fieldnames)
+    writer.writeheader()
+    writer.writerows(rows)
+
+@pytest.mark.parametrize('raw, expected', [
+  ('AS26810', 26810),
+  ('as 26810', 26810),
+  ('26810', 26810),
+  (' AS4294967295 ', 4294967295),
+  ('AS0', None),
+  ('AS4294967296', None),
+  ('AS-1', None),
+  ('ASN26810', None),
+  ('26810, 26811', None),
+  ('', None),
+])
+def test_parse_asn(raw, expected):
+  assert parse_asn(raw) == expected
+
+def test_duplicates_and_owners(tmp_path):
+  _write_csv(tmp_path / 'fed.csv', ['abbrievations', 'fedagency', 'asn'], [
+    {'abbrievations': 'USDA', 'fedagency': 'Department of Agriculture', 'asn': 'AS1'},
+    {'abbrievations': 'FS', 'fedagency': 'Forest Service', 'asn': 'AS2'},
+    {'abbrievations': 'USDA-2', 'fedagency': 'Department of Agriculture', 'asn': '1'},
+    {'abbrievations': 'GSA', 'fedagency': 'General Services Administration', 'asn': 'AS3'},
+    {'abbrievations': 'DOE', 'fedagency': 'Department of Energy', 'asn': 'bogus'},
+  ])
+  _write_csv(tmp_path / 'state.csv', ['stategov', 'state', 'asn'], [
+    {'stategov': 'State of Alaska', 'state': 'AK', 'asn': 'AS3'},
+    {'stategov': 'State of Alaska', 'state': 'WA', 'asn': ''},
+  ])
+
+  registry = AgencyRegistry(str(tmp_path), SOURCES)
+
+  assert registry.duplicates == [('fed-gov', 1, [2, 4])]
+  assert [(e['line'], e['raw_asn']) for e in registry.invalid] == [(6, 'bogus')]
+  # The first row per ASN is the one fetched; owners are listed once per organization
+  assert [e['abbreviation'] for e in registry.agencies('fed-gov')] == ['USDA', 'FS', 'GSA']
+  assert registry.owners[1] == [('fed-gov', 'Department of Agriculture')]
+  assert registry.shared_asns() == {3: [('fed-gov', 'General Services Administration'),
+                                        ('state-gov', 'State of Alaska')]}
+  assert registry.organizations('state-gov')['State of Alaska']['state'] == 'AK'
+
+def test_cloud_prefixes_stay_out_of_prefix_views(tmp_path):
+  fields = ['abbreviation', 'agency', 'asn', 'prefix']
+  _write_csv(tmp_path / 'fed-gov-prefixes.csv', fields, [
+    {'abbreviation': 'GSA', 'agency': 'GSA', 'asn': 'AS3', 'prefix': '192.0.2.0/24'}])
+  _write_csv(tmp_path / 'cloud-prefixes.csv', fields, [
+    {'abbreviation': 'Cloudflare', 'agency': 'Cloudflare', 'asn': 'AS13335', 'prefix': '192.0.2.0/24'}])
+
+  index = IPASNIndex()
+  index.load_prefix_csvs(str(tmp_path))
+
+  assert 'cloud' not in agency_registry.ORGANIZATION_CATEGORIES
+  assert index.lookup('192.0.2.1')['asn'] == 'AS3'
+  assert list(prefix_overlap.load_announcements(str(tmp_path))) == [('192.0.2.0/24', 'AS3')]
@@ -0,0 +1,76 @@
+import glob
+import os
+import time
+
+from src.certstore import CertificateStore
+from src.crtsh import CrtshClient, organization_query, query_key
+
+ISSUER = {'issuer_ca_id': 1, 'issuer_name': 'C=US, O=Example CA'}
+
+
+def _cert(cert_id, name_value):
+  return {**ISSUER, 'id': cert_id, 'name_value': name_value, 'common_name': name_value, 'not_after': '2027-01-01T00:00:00',
+          'result_count': 1}
+
+def test_zones_and_queries_share_certificates(tmp_path):
+  shared = _cert(101, 'a.example.gov\nb.other.gov')
+  store = CertificateStore(str(tmp_path))
+  store.ingest('example.gov', [shared, _cert(102, 'www.example.gov')])
+  assert store.put(organization_query('Example Agency'), [shared, _cert(103, 'x.other.gov')]) == 1
+  store.save()
+
+  store = CertificateStore(str(tmp_path))
+  assert [cert['id'] for cert in store.certificates('example.gov')] == [101, 102]
+  assert store.get(organization_query('Example Agency'))[0] == store.certificates('example.gov')[0]
+  assert store.get(organization_query('Other Agency')) is None
+  assert len(store.issuers) == 1
+  assert len(glob.glob(str(tmp_path / 'queries' / '*.json.gz'))) == 1
+
+def test_missing_certificates_are_a_cache_miss(tmp_path):
+  store = CertificateStore(str(tmp_path))
+  query = organization_query('Example Agency')
+  store.put(query, [_cert(101, 'a.example.gov')])
+  store.save()
+
+  # e.g. the segments were restored from an older copy of the store
+  for path in glob.glob(str(tmp_path / 'segments' / '*')):
+    os.remove(path)
+
+  assert CertificateStore(str(tmp_path)).get(query) is None
+
+def test_client_serves_fresh_searches_from_the_store(tmp_path, monkeypatch):
+  store = CertificateStore(str(tmp_path))
+  query = organization_query('Example Agency')
+  store.put(query, [_cert(101, 'a.example.gov')])
+  monkeypatch.setattr('src.crtsh.requests.get', lambda *args, **kwargs: None)
+
+  assert CrtshClient(store).search(query)[0]['id'] == 101
+  assert store.get(query, max_age=3600) is not None
+  later = time.time() + 7200
+  monkeypatch.setattr('src.certstore.time.time', lambda: later)
+  assert not store.has(query, max_age=3600)
+
+def test_search_many_paces_refetches_of_incomplete_queries(tmp_path, monkeypatch):
+  intact, incomplete, missing = (organization_query(name) for name in ('Intact', 'Incomplete', 'Missing'))
+  store = CertificateStore(str(tmp_path))
+  store.put(intact, [_cert(101, 'a.example.gov')])
+  # Lands in its own segment, which is then lost
+  store.put(incomplete, [_cert(1 << 28, 'b.example.gov')])
+  store.save()
+  os.remove(tmp_path / 'segments' / f'1{store.extension}')
+
+  class Response:
+    status_code = 200
+    def json(self):
+      return [_cert(102, 'c.example.gov')]
+
+  requests, sleeps = [], []
+  monkeypatch.setattr('src.crtsh.requests.get', lambda url, params, timeout: requests.append(params) or Response())
+  monkeypatch.setattr('src.crtsh.time.sleep', sleeps.append)
+
+  results = CrtshClient(CertificateStore(str(tmp_path))).search_many([missing, intact, incomplete], delay=5.0)
+
+  assert [params['O'] for params in requests] == ['Missing', 'Incomplete']
+  assert sleeps == [5.0]
+  assert [cert['id'] for cert in results[query_key(intact)]] == [101]
+  assert [cert['id'] for cert in results[query_key(incomplete)]] == [102]
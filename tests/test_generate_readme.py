@@ -0,0 +1,31 @@
+from scripts import generate_readme
+
+
+def test_md_table_pads_to_the_widest_cell():
+  table = generate_readme.md_table(["Org", "ASNs"], [["Census", 12], ["VA", 3]], ["left", "right"])
+
+  assert table.splitlines() == [
+    "| Org    | ASNs |",
+    "| :---   | ---: |",
+    "| Census |   12 |",
+    "| VA     |    3 |",
+  ]
+
+def test_md_table_ragged_rows_widen_only_their_columns():
+  rows = [["a", "b", "c"], ["long cell"], ["d", "wider value"]]
+
+  lines = generate_readme.md_table(["H1", "H2", "H3"], rows, ["left", "right", "right"]).splitlines()
+
+  assert lines[0] == "| H1        |          H2 |   H3 |"
+  assert lines[3] == "| long cell |"
+  assert lines[4] == "| d         | wider value |"
+
+def test_md_table_compact_and_empty():
+  assert generate_readme.md_table(["A", "B"], [[1, 2]], compact=True) == "| A | B |\n| :--- | :--- |\n| 1 | 2 |\n"
+  assert generate_readme.md_table(["A"], []) == "_No data yet._\n"
+
+def test_overview_leaves_out_cloud_providers():
+  overview = generate_readme.section_overview_table()
+
+  assert "**Federal Agencies**" in overview
+  assert "Cloud & CDN Providers" not in overview
@@ -0,0 +1,50 @@
+import csv
+import json
+
+from src import hosting
+
+TECH_FIELDS = ['input', 'a', 'aaaa', 'cname', 'cdn_name']
+
+
+def test_every_datacenter_maps_to_a_provider():
+  with open('data/cloud-datacenters.csv', newline='', encoding='utf-8') as f:
+    names = {row['datacenter'] for row in csv.DictReader(f)}
+
+  assert names <= hosting.DATACENTER_PROVIDERS.keys()
+  assert set(hosting.DATACENTER_PROVIDERS.values()) <= hosting.PROVIDER_SUFFIXES.keys()
+
+def test_ip_cross_check(tmp_path):
+  (tmp_path / 'asn').mkdir()
+  with open(tmp_path / 'asn' / 'cloud-prefixes.csv', 'w', newline='', encoding='utf-8') as f:
+    writer = csv.DictWriter(f, fieldnames=['abbreviation', 'agency', 'asn', 'prefix'])
+    writer.writeheader()
+    writer.writerow({'abbreviation': 'Amazon.com', 'agency': 'Amazon.com', 'asn': 'AS16509', 'prefix': '192.0.2.0/24'})
+    writer.writerow({'abbreviation': 'Oracle Corporation', 'agency': 'Oracle Corporation', 'asn': 'AS31898',
+                     'prefix': '198.51.100.0/24'})
+    writer.writerow({'abbreviation': 'Google LLC', 'agency': 'Google LLC', 'asn': 'AS15169', 'prefix': '203.0.113.0/24'})
+  (tmp_path / 'tech').mkdir()
+  with open(tmp_path / 'tech' / 'domain.example.gov_httpx.csv', 'w', newline='', encoding='utf-8') as f:
+    writer = csv.DictWriter(f, fieldnames=TECH_FIELDS)
+    writer.writeheader()
+    for host, ip, cname in [
+      ('cdn.example.gov', '192.0.2.10', ['d111.cloudfront.net']),
+      ('apex.example.gov', '198.51.100.7', ['apex.oraclecloud.com']),
+      ('vm.example.gov', '203.0.113.5', []),
+      ('elsewhere.example.gov', '192.0.2.11', ['x.azurefd.net']),
+      ('edge.example.gov', '203.0.113.5', ['e1.akamaiedge.net']),
+      ('nowhere.example.gov', '233.252.0.1', ['e2.akamaiedge.net']),
+    ]:
+      writer.writerow({'input': host, 'a': json.dumps([ip]), 'aaaa': 'null',
+                       'cname': json.dumps(cname) if cname else 'null', 'cdn_name': ''})
+
+  index = hosting.load_cloud_index(str(tmp_path / 'asn' / 'cloud-prefixes.csv'))
+  hosts = hosting.classify_tech_dir(str(tmp_path / 'tech'), cloud_index=index)['example.gov']
+
+  assert hosts['cdn.example.gov'] == {'provider': 'Amazon CloudFront', 'source': 'cname', 'ip_confirmed': True}
+  assert hosts['apex.example.gov'] == {'provider': 'Oracle Cloud', 'source': 'cname', 'ip_confirmed': True}
+  assert hosts['vm.example.gov'] == {'provider': 'Google Cloud', 'source': 'asn', 'ip_confirmed': False}
+  assert hosts['elsewhere.example.gov']['ip_confirmed'] is False
+  # Akamai has no IP_PROVIDER_OF entry; addresses outside every cloud prefix,
+  # or in another provider's, do not confirm it
+  assert hosts['edge.example.gov'] == {'provider': 'Akamai', 'source': 'cname', 'ip_confirmed': False}
+  assert hosts['nowhere.example.gov'] == {'provider': 'Akamai', 'source': 'cname', 'ip_confirmed': False}
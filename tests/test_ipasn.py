@@ -0,0 +1,69 @@
+import pytest
+
+from src.ipasn import IPASNIndex, resolve_ips
+
+PREFIXES = [
+  ('10.0.0.0/8', 'AS1'),
+  ('10.1.0.0/16', 'AS2'),
+  ('10.1.2.0/24', 'AS3'),
+  ('10.1.2.128/32', 'AS4'),
+  ('2001:db8::/32', 'AS5'),
+  ('2001:db8:abcd::/48', 'AS6'),
+]
+DELEGATIONS = """2|arin|20260101|2|19700101|20260101|+0000
+arin|*|ipv4|*|1|summary
+arin|US|ipv4|198.51.100.0|256|20100101|allocated|abc
+arin|US|ipv6|2001:db9::|32|20100101|allocated|abc
+"""
+
+
+@pytest.fixture
+def index(tmp_path):
+  index = IPASNIndex()
+  for prefix, asn in PREFIXES:
+    index.add_prefix(prefix, {'prefix': prefix, 'asn': asn, 'agency': f'Agency {asn}', 'abbreviation': asn,
+                              'category': 'fed-gov', 'registry': ''})
+  index._finalize()
+  (tmp_path / 'delegated-arin-extended-latest.txt').write_text(DELEGATIONS)
+  index.load_delegation_files(str(tmp_path))
+  # Lookups must not change across a save/load round trip
+  index.save(str(tmp_path / 'index.json.gz'))
+  return IPASNIndex.load(str(tmp_path / 'index.json.gz'))
+
+@pytest.mark.parametrize('ip, asn', [
+  ('10.200.0.1', 'AS1'),
+  ('10.1.200.1', 'AS2'),
+  ('10.1.2.3', 'AS3'),
+  ('10.1.2.255', 'AS3'),
+  ('10.1.2.128', 'AS4'),
+  ('10.1.2.129', 'AS3'),
+  ('2001:db8:1::1', 'AS5'),
+  ('2001:db8:abcd:ffff::1', 'AS6'),
+  ('2001:db8:abce::1', 'AS5'),
+])
+def test_longest_prefix_wins(index, ip, asn):
+  assert index.lookup(ip)['asn'] == asn
+
+@pytest.mark.parametrize('ip, registry', [
+  ('192.0.2.1', None),
+  ('11.0.0.1', None),
+  # 10.1.2.3 as an IPv6 integer; families never match each other's prefixes
+  ('::a01:203', None),
+  ('2001:db7::1', None),
+  ('198.51.100.7', 'arin'),
+  ('2001:db9::1', 'arin'),
+])
+def test_misses(index, ip, registry):
+  result = index.lookup(ip)
+  if registry is None:
+    assert result is None
+  else:
+    assert result['asn'] == '' and result['registry'] == registry
+
+def test_resolve_ips_marks_only_prefix_misses(index):
+  results = resolve_ips(['10.1.2.3', '198.51.100.7', '192.0.2.1', 'not-an-ip', '10.1.2.3'], index)
+
+  assert list(results) == ['10.1.2.3', '198.51.100.7', '192.0.2.1', 'not-an-ip']
+  assert results['10.1.2.3']['prefix'] == '10.1.2.0/24'
+  assert results['198.51.100.7']['registry'] == 'arin'
+  assert results['192.0.2.1'] is None and results['not-an-ip'] is None
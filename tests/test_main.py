@@ -0,0 +1,53 @@
+import main
+from src.external_sort import SpilledMapping
+
+ISSUERS = ['C=US, O=Example CA', 'C=US, O=Another CA', 'C=GB, O=Third CA']
+
+
+def _cert(cert_id, issuer, common_name, *sans, not_before='2026-01-01T00:00:00'):
+  return {'id': cert_id, 'issuer_ca_id': ISSUERS.index(issuer) + 1, 'issuer_name': issuer,
+          'common_name': common_name, 'name_value': '\n'.join((common_name,) + sans),
+          'not_before': not_before, 'not_after': '2099-01-01T00:00:00'}
+
+CERTIFICATES = [
+  _cert(100, ISSUERS[0], 'www.example.gov', 'example.gov', 'mail.example.gov'),
+  _cert(9, ISSUERS[1], 'example.gov', 'WWW.Example.gov.', not_before='2025-06-01T00:00:00'),
+  _cert(10, ISSUERS[2], 'mail.example.gov', '*.example.gov'),
+  _cert(2000, ISSUERS[1], 'api.example.gov', 'www.example.gov', 'outside.other.gov'),
+  _cert(11, ISSUERS[0], 'example.gov'),
+]
+
+
+def _write(tmp_path, name, memory_budget):
+  domains_data = main.process_certificates(list(CERTIFICATES), 'example.gov', memory_budget=memory_budget)
+  path = tmp_path / name / 'example.gov.csv'
+  main.save_domains_to_csv(domains_data, str(path))
+  return domains_data, path.read_bytes()
+
+def test_spilled_csv_matches_in_memory_csv(tmp_path):
+  in_memory, expected = _write(tmp_path, 'memory', None)
+  spilled, actual = _write(tmp_path, 'spilled', 1)
+
+  assert isinstance(in_memory, dict)
+  assert isinstance(spilled, SpilledMapping) and len(spilled.runs) > 1
+  assert actual == expected
+  # IDs in numeric order and every issuer survive the merge of the runs
+  assert (b'www.example.gov,Yes,Yes,3,2,2025-06-01T00:00:00,2099-01-01T00:00:00,9;100;2000,'
+          b'"C=US, O=Another CA;C=US, O=Example CA"') in actual
+
+def test_precertificate_and_leaf_collapse_into_one_entry():
+  precert = dict(_cert(500, ISSUERS[0], 'www.example.gov'), serial_number='0A1B2C')
+  leaf = dict(_cert(501, ISSUERS[0], 'www.example.gov', 'example.gov'), serial_number='0a1b2c')
+  # Same serial from another CA, and an entry without a serial number
+  other_ca = dict(_cert(502, ISSUERS[1], 'www.example.gov'), serial_number='0a1b2c')
+  no_serial = _cert(503, ISSUERS[0], 'www.example.gov')
+  certificates = [precert, leaf, other_ca, no_serial]
+
+  assert [c['id'] for c in main.deduplicate_certificates(certificates)] == [500, 502, 503]
+  kept = main.deduplicate_certificates(certificates, keep_ids=True)
+  assert [c.get('merged_ids') for c in kept] == [[500, 501], [502], None]
+  assert 'merged_ids' not in precert
+
+  for keep_ids, expected in [(False, {'500', '502', '503'}), (True, {'500', '501', '502', '503'})]:
+    domains_data = main.process_certificates(certificates, 'example.gov', keep_cert_ids=keep_ids)
+    assert domains_data['www.example.gov']['certificate_ids'] == expected
@@ -0,0 +1,46 @@
+import pytest
+
+from src.normalize import normalize_domain, zone_from_filename
+
+
+@pytest.mark.parametrize('name, zone, expected', [
+  # Case folding and whitespace
+  ('WWW.Example.GOV', None, 'www.example.gov'),
+  ('  mail.example.gov\n', None, 'mail.example.gov'),
+  # Trailing root dot
+  ('www.example.gov.', None, 'www.example.gov'),
+  ('Example.Gov.', 'example.gov', 'example.gov'),
+  # Wildcards
+  ('*.example.gov', None, 'example.gov'),
+  ('*.*.Example.gov', None, 'example.gov'),
+  ('www.*.example.gov', None, None),
+  # IDNA and punycode
+  ('bücher.example.gov', None, 'xn--bcher-kva.example.gov'),
+  ('BÜCHER.example.gov.', None, 'xn--bcher-kva.example.gov'),
+  ('xn--bcher-kva.example.gov', None, 'xn--bcher-kva.example.gov'),
+  # Not hostnames
+  ('192.0.2.1', None, None),
+  ('2001:db8::1', None, None),
+  ('hostmaster@example.gov', None, None),
+  ('two words.example.gov', None, None),
+  ('-bad.example.gov', None, None),
+  ('', None, None),
+  ('a' * 64 + '.example.gov', None, None),
+  # Zone restriction
+  ('www.example.gov', 'example.gov', 'www.example.gov'),
+  ('*.example.gov', 'example.gov', 'example.gov'),
+  ('www.other.gov', 'example.gov', None),
+  ('notexample.gov', 'example.gov', None),
+  ('example.gov.evil.com', 'example.gov', None),
+])
+def test_normalize_domain(name, zone, expected):
+  assert normalize_domain(name, zone) == expected
+
+@pytest.mark.parametrize('filename, expected', [
+  ('domain.cdc.gov.json', 'cdc.gov'),
+  ('domain.CDC.GOV.json', 'cdc.gov'),
+  ('cdc.gov.json', None),
+  ('domain.cdc.gov.json.gz', None),
+])
+def test_zone_from_filename(filename, expected):
+  assert zone_from_filename(filename) == expected
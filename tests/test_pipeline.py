@@ -0,0 +1,80 @@
+from src.pipeline import Pipeline, Stage
+
+
+def _stage(name, log, result=None, error=None, **kwargs):
+  def run(upstream):
+    log.append((name, upstream))
+    if error:
+      raise error
+    return result
+  return Stage(name, run, **kwargs)
+
+def test_unchanged_inputs_are_skipped(tmp_path):
+  source = tmp_path / 'input.txt'
+  source.write_text('v1')
+  output = tmp_path / 'output.txt'
+  output.write_text('')
+  log = []
+  stages = [_stage('build', log, inputs=[str(source)], outputs=[str(output)])]
+  state = str(tmp_path / 'state.json')
+
+  assert Pipeline(stages, state_path=state).run() == {'build': 'ran'}
+  assert Pipeline(stages, state_path=state).run() == {'build': 'skipped'}
+  source.write_text('v2')
+  assert Pipeline(stages, state_path=state).run() == {'build': 'ran'}
+  assert len(log) == 2
+
+def test_skipped_stage_unblocks_dependents_with_no_result(tmp_path):
+  source = tmp_path / 'input.txt'
+  source.write_text('v1')
+  state = str(tmp_path / 'state.json')
+  log = []
+  stages = [
+    _stage('fetch', log, result='data', inputs=[str(source)]),
+    _stage('report', log, depends=['fetch'], always_run=True),
+  ]
+  Pipeline(stages, state_path=state).run()
+  log.clear()
+
+  status = Pipeline(stages, state_path=state).run()
+
+  assert status == {'fetch': 'skipped', 'report': 'ran'}
+  assert log == [('report', {'fetch': None})]
+
+def test_failure_blocks_dependents_transitively(tmp_path):
+  log = []
+  stages = [
+    _stage('fetch', log, error=RuntimeError('offline')),
+    _stage('parse', log, depends=['fetch']),
+    _stage('report', log, depends=['parse']),
+    _stage('other', log, result=1),
+  ]
+
+  status = Pipeline(stages, state_path=str(tmp_path / 'state.json')).run()
+
+  assert status == {'fetch': 'failed', 'parse': 'blocked', 'report': 'blocked', 'other': 'ran'}
+  assert sorted(name for name, _ in log) == ['fetch', 'other']
+
+def test_soft_dependency_failure_does_not_block(tmp_path):
+  log = []
+  stages = [
+    _stage('tech', log, error=RuntimeError('httpx binary not found')),
+    _stage('asn', log, result={'fed-gov': []}),
+    _stage('readme', log, depends=['asn'], after=['tech']),
+  ]
+
+  status = Pipeline(stages, state_path=str(tmp_path / 'state.json')).run()
+
+  assert status == {'tech': 'failed', 'asn': 'ran', 'readme': 'ran'}
+  assert log[-1] == ('readme', {'asn': {'fed-gov': []}, 'tech': None})
+
+def test_soft_dependency_runs_first(tmp_path):
+  log = []
+  stages = [
+    _stage('readme', log, after=['tech']),
+    _stage('tech', log, result=['a.csv']),
+  ]
+
+  Pipeline(stages, state_path=str(tmp_path / 'state.json'), max_workers=2).run()
+
+  assert log == [('tech', {}), ('readme', {'tech': ['a.csv']})]
@@ -0,0 +1,69 @@
+import ipaddress
+
+from src.prefix_overlap import diff_runs, find_overlaps
+
+
+def _announcements(*rows):
+  announcements = {}
+  for prefix, asn, category in rows:
+    entry = announcements.setdefault((prefix, asn), {'network': ipaddress.ip_network(prefix), 'owners': []})
+    entry['owners'].append((category, asn, f'Agency {asn}'))
+  return announcements
+
+def test_same_prefix_from_two_origins_is_moas():
+  overlaps = find_overlaps(_announcements(
+    ('192.0.2.0/24', 'AS2', 'fed-gov'),
+    ('192.0.2.0/24', 'AS1', 'state-gov'),
+  ))
+
+  assert overlaps == [('moas', ('192.0.2.0/24', 'AS2'), ('192.0.2.0/24', 'AS1'))]
+
+def test_nested_prefixes_of_other_origins_are_more_specific():
+  overlaps = find_overlaps(_announcements(
+    ('198.51.100.0/24', 'AS3', 'fed-gov'),
+    ('198.51.100.0/25', 'AS3', 'fed-gov'),
+    ('198.51.100.128/25', 'AS4', 'fed-gov'),
+    ('198.51.100.192/26', 'AS5', 'fed-gov'),
+    ('2001:db8::/32', 'AS6', 'fed-gov'),
+    ('2001:db8:1::/48', 'AS7', 'fed-gov'),
+  ))
+
+  # Every enclosing block of another origin is reported, not only the nearest;
+  # the same-origin /25 is not an overlap
+  assert sorted(overlaps) == [
+    ('more-specific', ('198.51.100.128/25', 'AS4'), ('198.51.100.0/24', 'AS3')),
+    ('more-specific', ('198.51.100.192/26', 'AS5'), ('198.51.100.0/24', 'AS3')),
+    ('more-specific', ('198.51.100.192/26', 'AS5'), ('198.51.100.128/25', 'AS4')),
+    ('more-specific', ('2001:db8:1::/48', 'AS7'), ('2001:db8::/32', 'AS6')),
+  ]
+
+def test_disjoint_prefixes_do_not_overlap():
+  assert find_overlaps(_announcements(
+    ('203.0.113.0/25', 'AS8', 'fed-gov'),
+    ('203.0.113.128/25', 'AS9', 'fed-gov'),
+    ('203.0.114.0/24', 'AS10', 'fed-gov'),
+    # Same integer range in the other address family
+    ('::cb00:7100/120', 'AS11', 'fed-gov'),
+  )) == []
+
+def test_diff_runs_only_compares_categories_in_both_runs():
+  previous = _announcements(
+    ('192.0.2.0/24', 'AS1', 'fed-gov'),
+    ('198.51.100.0/24', 'AS2', 'fed-gov'),
+    ('203.0.113.0/24', 'AS3', 'fed-gov'),
+    # state-gov failed to collect in the current run
+    ('100.64.0.0/16', 'AS4', 'state-gov'),
+  )
+  current = _announcements(
+    ('192.0.2.0/24', 'AS1', 'fed-gov'),
+    ('198.51.100.0/24', 'AS5', 'fed-gov'),
+    ('233.252.0.0/24', 'AS6', 'fed-gov'),
+    # county-gov was not collected in the previous run
+    ('100.65.0.0/16', 'AS7', 'county-gov'),
+  )
+
+  assert sorted(diff_runs(previous, current)) == [
+    ('new', '233.252.0.0/24', {'AS6'}, set()),
+    ('origin-change', '198.51.100.0/24', {'AS5'}, {'AS2'}),
+    ('withdrawn', '203.0.113.0/24', set(), {'AS3'}),
+  ]
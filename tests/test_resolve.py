@@ -0,0 +1,173 @@
+import ipaddress
+import socketserver
+import struct
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from src import instrument
+from src.resolve import (
+  TYPE_A,
+  TYPE_AAAA,
+  TYPE_CNAME,
+  TYPE_SOA,
+  NegativeCache,
+  encode_name,
+  resolve_domains,
+)
+
+SOA_TTL = 600
+SOA_MINIMUM = 300
+
+# name -> (rcode, answers, truncate_udp); answers are (owner, type, value)
+ZONE = {
+  'www.example.gov': (0, [
+    ('www.example.gov', TYPE_CNAME, 'edge.cdn.example'),
+    ('edge.cdn.example', TYPE_CNAME, 'e1.cdn.example'),
+    ('e1.cdn.example', TYPE_A, '192.0.2.10'),
+    ('e1.cdn.example', TYPE_AAAA, '2001:db8::10'),
+  ], False),
+  'gone.example.gov': (3, [], False),
+  'mail.example.gov': (0, [], False),
+  'big.example.gov': (0, [('big.example.gov', TYPE_A, f"192.0.2.{i}") for i in range(20, 30)], True),
+}
+SILENT = {'slow.example.gov'}
+
+
+def _question(data):
+  offset = 12
+  labels = []
+  while data[offset]:
+    labels.append(data[offset + 1:offset + 1 + data[offset]].decode('ascii').lower())
+    offset += 1 + data[offset]
+  qtype = struct.unpack_from('>H', data, offset + 1)[0]
+  return '.'.join(labels), qtype, data[12:offset + 5]
+
+def _record(owner, rtype, ttl, rdata):
+  return encode_name(owner) + struct.pack('>HHIH', rtype, 1, ttl, len(rdata)) + rdata
+
+def _answer(data, tcp):
+  qid = struct.unpack_from('>H', data)[0]
+  name, qtype, question = _question(data)
+  rcode, records, truncate = ZONE.get(name, (3, [], False))
+  answers = []
+  for owner, rtype, value in records:
+    if rtype == TYPE_CNAME:
+      answers.append(_record(owner, rtype, 60, encode_name(value)))
+    elif rtype == qtype:
+      answers.append(_record(owner, rtype, 60, ipaddress.ip_address(value).packed))
+  authority = []
+  if rcode == 3 or not any(rtype == qtype for _, rtype, _ in records):
+    soa = encode_name('ns.example.gov') + encode_name('hostmaster.example.gov') + struct.pack(
+      '>IIIII', 1, 7200, 3600, 1209600, SOA_MINIMUM)
+    authority.append(_record('example.gov', TYPE_SOA, SOA_TTL, soa))
+  flags = 0x8180 | rcode
+  if truncate and not tcp:
+    flags |= 0x0200
+    answers = []
+  header = struct.pack('>HHHHHH', qid, flags, 1, len(answers), len(authority), 0)
+  return header + question + b''.join(answers) + b''.join(authority)
+
+class StubDNS:
+  """UDP and TCP DNS server on one localhost port answering from ZONE."""
+
+  def __init__(self):
+    self.queries = Counter()
+    stub = self
+
+    class UDPHandler(socketserver.BaseRequestHandler):
+      def handle(self):
+        data, sock = self.request
+        name, qtype, _ = _question(data)
+        stub.queries[(name, qtype, 'udp')] += 1
+        if name not in SILENT:
+          sock.sendto(_answer(data, tcp=False), self.client_address)
+
+    class TCPHandler(socketserver.StreamRequestHandler):
+      def handle(self):
+        (length,) = struct.unpack('>H', self.rfile.read(2))
+        data = self.rfile.read(length)
+        name, qtype, _ = _question(data)
+        stub.queries[(name, qtype, 'tcp')] += 1
+        response = _answer(data, tcp=True)
+        self.wfile.write(struct.pack('>H', len(response)) + response)
+
+    self.tcp = socketserver.ThreadingTCPServer(('127.0.0.1', 0), TCPHandler)
+    self.port = self.tcp.server_address[1]
+    self.udp = socketserver.ThreadingUDPServer(('127.0.0.1', self.port), UDPHandler)
+    for server in (self.tcp, self.udp):
+      threading.Thread(target=server.serve_forever, daemon=True).start()
+
+  def close(self):
+    for server in (self.tcp, self.udp):
+      server.shutdown()
+      server.server_close()
+
+@pytest.fixture
+def stub():
+  try:
+    server = StubDNS()
+  except OSError as e:
+    pytest.skip(f"cannot bind a local DNS port: {e}")
+  yield server
+  server.close()
+
+def _resolve(stub, names, negative_cache=None):
+  return resolve_domains(names, nameservers=[f"127.0.0.1:{stub.port}"], timeout=0.3, attempts=2,
+                         negative_cache=negative_cache)
+
+def test_cname_chain(stub):
+  result = _resolve(stub, ['www.example.gov'])['www.example.gov']
+
+  assert result == {'status': 'ok', 'cname': ['edge.cdn.example', 'e1.cdn.example'],
+                    'ips': ['192.0.2.10', '2001:db8::10']}
+
+def test_negative_answers_are_cached(stub):
+  cache = NegativeCache(path=None)
+
+  first = _resolve(stub, ['gone.example.gov', 'mail.example.gov'], cache)
+  second = _resolve(stub, ['gone.example.gov', 'mail.example.gov'], cache)
+
+  assert first['gone.example.gov']['status'] == second['gone.example.gov']['status'] == 'nxdomain'
+  assert first['mail.example.gov']['status'] == second['mail.example.gov']['status'] == 'nodata'
+  # NXDOMAIN skips the AAAA query; every query was sent once
+  assert stub.queries == Counter({('gone.example.gov', TYPE_A, 'udp'): 1,
+                                  ('mail.example.gov', TYPE_A, 'udp'): 1,
+                                  ('mail.example.gov', TYPE_AAAA, 'udp'): 1})
+  assert set(cache.entries) == {'gone.example.gov/1', 'mail.example.gov/1', 'mail.example.gov/28'}
+
+def test_negative_ttl_is_the_soa_minimum(stub):
+  cache = NegativeCache(path=None)
+  before = time.time()
+
+  _resolve(stub, ['gone.example.gov'], cache)
+
+  ttl = cache.entries['gone.example.gov/1']['expires'] - before
+  assert SOA_MINIMUM - 5 <= ttl <= SOA_MINIMUM + 5
+
+def test_timeout_is_an_error_after_every_attempt(stub):
+  report = instrument.start_run('test')
+
+  result = _resolve(stub, ['slow.example.gov'])['slow.example.gov']
+
+  assert result['status'] == 'error'
+  assert stub.queries[('slow.example.gov', TYPE_A, 'udp')] == 2
+  assert report.counters['dns_errors'] == 2
+
+def test_truncated_answers_are_retried_over_tcp(stub):
+  result = _resolve(stub, ['big.example.gov'])['big.example.gov']
+
+  assert result['status'] == 'ok'
+  assert result['ips'] == [f"192.0.2.{i}" for i in range(20, 30)]
+  assert stub.queries[('big.example.gov', TYPE_A, 'tcp')] == 1
+
+def test_invalid_names_do_not_abort_the_batch(stub):
+  names = ['Department of Education', 'https://web.archive.org/x', 'bücher.gov', 'a' * 64 + '.gov',
+           'www.example.gov']
+
+  results = _resolve(stub, names)
+
+  assert [results[name]['status'] for name in names] == ['error'] * 4 + ['ok']
+  assert all(name == 'www.example.gov' for name, _, _ in stub.queries)
@@ -0,0 +1,124 @@
+import csv
+import json
+import os
+import zlib
+
+import pytest
+
+from src import snapshots
+from src.snapshots import SegmentWriter, SnapshotStore, parse_run_id
+
+PREFIX_COLUMNS = ['asn', 'prefix', 'agency']
+
+
+def _manifest(root):
+  with open(os.path.join(root, 'manifest.json'), encoding='utf-8') as f:
+    return json.load(f)
+
+def test_manifest_written_once_per_run(tmp_path):
+  store = SnapshotStore(str(tmp_path), run_id='2026-10-01T06:00:00.000000Z')
+  for i in range(5):
+    store.record(f"domains/domain.zone{i}.gov", ['domain'], [{'domain': f"www.zone{i}.gov"}])
+
+  assert not (tmp_path / 'manifest.json').exists()
+  assert store.runs() == ['2026-10-01T06:00:00.000000Z']
+  store.flush()
+
+  runs = _manifest(tmp_path)['runs']
+  assert len(runs) == 1 and len(runs[0]['datasets']) == 5
+  assert SnapshotStore(str(tmp_path)).read('domains/domain.zone3.gov', runs[0]['run_id']) == [
+    {'domain': 'www.zone3.gov'}]
+
+def test_runs_started_in_the_same_instant_stay_separate(tmp_path):
+  first = SnapshotStore(str(tmp_path), run_id='2026-10-01T06:00:00Z')
+  second = SnapshotStore(str(tmp_path), run_id='2026-10-01T06:00:00Z')
+  first.record('prefixes/fed-gov', PREFIX_COLUMNS, [{'asn': 'AS1', 'prefix': '192.0.2.0/24'}])
+  second.record('prefixes/fed-gov', PREFIX_COLUMNS, [{'asn': 'AS2', 'prefix': '192.0.2.0/24'}])
+  first.flush()
+  second.flush()
+
+  store = SnapshotStore(str(tmp_path))
+  assert store.runs() == ['2026-10-01T06:00:00Z', '2026-10-01T06:00:00Z-1']
+  assert store.read('prefixes/fed-gov', '2026-10-01T06:00:00Z-1', ['asn']) == [{'asn': 'AS2'}]
+  assert SnapshotStore(str(tmp_path), run_id='2026-10-01T06:00:00Z').run_id == '2026-10-01T06:00:00Z-2'
+
+def test_as_of_compares_parsed_run_ids(tmp_path):
+  for run_id, domain in [('2026-08-17T09:00:00Z', 'old.gov'), ('2026-08-17T09:00:00.500000Z', 'new.gov')]:
+    store = SnapshotStore(str(tmp_path), run_id=run_id)
+    store.record('domains/example', ['domain'], [{'domain': domain}])
+    store.flush()
+
+  store = SnapshotStore(str(tmp_path))
+  # As strings, '2026-08-17T09:00:00.5Z' sorts before '2026-08-17T09:00:00Z'
+  assert store.as_of('domains/example', '2026-08-17T09:00:00.600000Z')[1] == [{'domain': 'new.gov'}]
+  assert store.as_of('domains/example', '2026-08-17T09:00:00Z')[1] == [{'domain': 'old.gov'}]
+  assert store.as_of('domains/example', '2026-08-17')[0] == '2026-08-17T09:00:00.500000Z'
+  assert store.as_of('domains/example', '2026-08-16') == (None, [])
+  assert parse_run_id('2026-08-17T09:00:00Z-3')[1] == 3
+
+def test_diff_with_a_tuple_key(tmp_path):
+  old_rows = [
+    {'asn': 'AS1', 'prefix': '192.0.2.0/24', 'agency': 'A'},
+    {'asn': 'AS2', 'prefix': '192.0.2.0/24', 'agency': 'B'},
+    {'asn': 'AS3', 'prefix': '', 'agency': 'C'},
+  ]
+  new_rows = [
+    {'asn': 'AS1', 'prefix': '192.0.2.0/24', 'agency': 'A2'},
+    {'asn': 'AS3', 'prefix': '', 'agency': 'C'},
+    {'asn': 'AS3', 'prefix': '198.51.100.0/24', 'agency': 'C'},
+  ]
+  for run_id, rows in [('2026-10-01T00:00:00.000000Z', old_rows), ('2026-10-02T00:00:00.000000Z', new_rows)]:
+    store = SnapshotStore(str(tmp_path), run_id=run_id)
+    store.record('prefixes/fed-gov', PREFIX_COLUMNS, rows)
+    store.flush()
+
+  store = SnapshotStore(str(tmp_path))
+  old_run, new_run = store.runs()
+  result = store.diff('prefixes/fed-gov', old_run, new_run, ('asn', 'prefix'), ['agency'])
+
+  assert result == {
+    'added': [('AS3', '198.51.100.0/24')],
+    'removed': [('AS2', '192.0.2.0/24')],
+    'changed': [('AS1', '192.0.2.0/24')],
+  }
+  with pytest.raises(ValueError, match='repeats'):
+    store.diff('prefixes/fed-gov', old_run, new_run, 'prefix')
+  assert store.first_seen('prefixes/fed-gov', ('AS3', '198.51.100.0/24'), ('asn', 'prefix')) == new_run
+
+def test_streamed_segments_match_one_shot_compression(tmp_path, monkeypatch):
+  monkeypatch.setattr(SegmentWriter, 'CHUNK_ROWS', 3)
+  rows = [{'domain': f"host{i}.example.gov", 'certificate_count': i} for i in range(10)]
+  store = SnapshotStore(str(tmp_path), run_id='2026-10-01T00:00:00.000000Z')
+
+  segment_id = store.record('domains/example', ['domain', 'certificate_count'], iter(rows))
+
+  # The layout record() wrote before it streamed: each column compressed whole
+  blocks = [zlib.compress(json.dumps([row[name] for row in rows], separators=(',', ':')).encode('utf-8'), 9)
+            for name in ('domain', 'certificate_count')]
+  assert store._store_segment('domains/example', ['domain', 'certificate_count'], 10, blocks) == segment_id
+  assert store.read('domains/example', store.run_id) == rows
+
+def test_recording_is_a_no_op_until_started():
+  with snapshots.recording('domains/example', ['domain']) as writer:
+    assert writer is None
+
+def test_record_command_stores_csv_files_as_one_run(tmp_path, monkeypatch):
+  rows = [{'asn': 'AS1', 'prefix': '192.0.2.0/24', 'agency': 'A'}, {'asn': 'AS2', 'prefix': '', 'agency': 'B'}]
+  paths = []
+  for category in ('fed-gov', 'pbm'):
+    path = tmp_path / f"{category}-prefixes.csv"
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+      writer = csv.DictWriter(f, fieldnames=PREFIX_COLUMNS)
+      writer.writeheader()
+      writer.writerows(rows)
+    paths.append(str(path))
+  monkeypatch.setattr(snapshots, '_current', None)
+  monkeypatch.setattr(snapshots.atexit, 'register', lambda func: None)
+  monkeypatch.setattr('sys.argv', ['snapshots', '--root', str(tmp_path / 'store'), 'record', 'prefixes', *paths])
+
+  snapshots.main()
+
+  store = SnapshotStore(str(tmp_path / 'store'))
+  (run_id,) = store.runs()
+  assert store.runs('prefixes/pbm') == [run_id]
+  assert store.read('prefixes/fed-gov', run_id) == rows
@@ -0,0 +1,179 @@
+import ipaddress
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import ipwhois.net
+import ipwhois.rdap
+import pytest
+from ipwhois.exceptions import ASNLookupError
+
+from src import instrument
+from src.whois import CACHE_TTL, WhoisCache, whois_asn_batch, whois_batch
+
+
+class FakeRDAP:
+  """Stands in for whois(): every IP belongs to its /24, and calls are recorded."""
+
+  def __init__(self, delay=0.0):
+    self.delay = delay
+    self.calls = []
+    self.in_flight = 0
+    self.max_in_flight = 0
+    self._lock = threading.Lock()
+
+  def __call__(self, ip):
+    with self._lock:
+      self.calls.append(ip)
+      self.in_flight += 1
+      self.max_in_flight = max(self.max_in_flight, self.in_flight)
+    time.sleep(self.delay)
+    with self._lock:
+      self.in_flight -= 1
+    net = ipaddress.ip_network(f"{ip}/24", strict=False)
+    return {'net_cidr': str(net), 'net_organization': f"org-{net.network_address}"}
+
+class StubRDAP:
+  """
+  HTTP server answering ARIN's ASN lookup and RDAP IP queries on localhost;
+  every address belongs to its /24, and RDAP requests are recorded.
+  """
+
+  def __init__(self):
+    self.requests = []
+    stub = self
+
+    class Handler(BaseHTTPRequestHandler):
+      def do_GET(self):
+        if self.path.startswith('/rest/nets'):
+          body = {'nets': {'net': {'orgRef': {'@handle': 'ARIN'}}}}
+        else:
+          ip = self.path.rsplit('/', 1)[1]
+          stub.requests.append(ip)
+          net = ipaddress.ip_network(f"{ip}/24", strict=False)
+          body = {
+            'objectClassName': 'ip network', 'handle': f"NET-{net.network_address}", 'ipVersion': 'v4',
+            'startAddress': str(net.network_address), 'endAddress': str(net.broadcast_address),
+            'name': f"ORG-{net.network_address}", 'type': 'ASSIGNMENT',
+            'events': [{'eventAction': 'registration', 'eventDate': '2020-01-01T00:00:00Z'}],
+          }
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/rdap+json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+      def log_message(self, *args):
+        pass
+
+    self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+    threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+  def close(self):
+    self.server.shutdown()
+    self.server.server_close()
+
+def _offline(*args, **kwargs):
+  raise ASNLookupError('no DNS or whois in tests')
+
+@pytest.fixture
+def rdap(monkeypatch):
+  try:
+    server = StubRDAP()
+  except OSError as e:
+    pytest.skip(f"cannot bind a local HTTP port: {e}")
+  # ipwhois falls back to ARIN's HTTP API for the ASN step when DNS and whois fail
+  monkeypatch.setattr(ipwhois.net.Net, 'get_asn_dns', _offline)
+  monkeypatch.setattr(ipwhois.net.Net, 'get_asn_whois', _offline)
+  monkeypatch.setattr(ipwhois.net, 'ARIN', server.url + '/rest/nets;q={0}?showDetails=true&showARIN=true')
+  monkeypatch.setitem(ipwhois.rdap.RIR_RDAP['arin'], 'ip_url', server.url + '/registry/ip/{0}')
+  yield server
+  server.close()
+
+def test_rdap_lookups_through_a_local_server(rdap):
+  ips = ['23.1.2.10', '23.1.2.200', '23.1.3.7']
+
+  results = whois_batch(ips, cache=WhoisCache(path=None), max_workers=2)
+
+  assert sorted(rdap.requests) == ['23.1.2.10', '23.1.3.7']
+  assert results['23.1.2.200']['net_cidr'] == '23.1.2.0/24'
+  assert results['23.1.3.7']['net_organization'] == 'ORG-23.1.3.0'
+  assert results['23.1.3.7']['registration'] == '2020-01-01T00:00:00Z'
+
+def test_cache_file_is_reloaded_and_expires(tmp_path, monkeypatch):
+  path = str(tmp_path / 'whois.json')
+  whois_batch(['198.51.100.7'], cache=WhoisCache(path=path), lookup=FakeRDAP())
+  whois_asn_batch(['AS64500'], cache=WhoisCache(path=path), lookup=lambda asn: {'asn': asn})
+  fake = FakeRDAP()
+
+  results = whois_batch(['198.51.100.99'], cache=WhoisCache(path=path), lookup=fake)
+
+  assert fake.calls == []
+  assert results['198.51.100.99']['net_cidr'] == '198.51.100.0/24'
+  assert WhoisCache(path=path).asns['AS64500']['result'] == {'asn': 'AS64500'}
+
+  later = time.time() + CACHE_TTL + 1
+  monkeypatch.setattr('src.whois.time.time', lambda: later)
+  expired = WhoisCache(path=path)
+  assert expired.find_network('198.51.100.99') is None and expired.asns == {}
+  whois_batch(['198.51.100.99'], cache=expired, lookup=fake)
+  assert fake.calls == ['198.51.100.99']
+
+def test_one_lookup_per_network():
+  report = instrument.start_run('test')
+  ips = [f"192.0.{subnet}.{host}" for subnet in (2, 7, 9) for host in range(1, 11)]
+  fake = FakeRDAP()
+
+  results = whois_batch(ips + ['not-an-ip'], cache=WhoisCache(path=None), max_workers=1, lookup=fake)
+
+  assert len(fake.calls) == 3
+  assert results['not-an-ip'] is None
+  for ip in ips:
+    assert results[ip]['net_cidr'] == str(ipaddress.ip_network(f"{ip}/24", strict=False))
+  assert report.counters['whois_lookups'] == 3
+  assert report.counters['whois_cache_hits'] == 27
+
+def test_concurrent_lanes_do_not_repeat_networks():
+  ips = [f"198.51.{subnet}.{host}" for subnet in (10, 20, 30, 40) for host in range(1, 6)]
+  fake = FakeRDAP(delay=0.05)
+
+  results = whois_batch(ips, cache=WhoisCache(path=None), max_workers=4, lookup=fake)
+
+  # 20 sorted IPs make 4 lanes of 5, one per /24, all looked up at once
+  assert sorted(fake.calls) == ['198.51.10.1', '198.51.20.1', '198.51.30.1', '198.51.40.1']
+  assert fake.max_in_flight == 4
+  assert all(results[ip] is not None for ip in ips)
+
+def test_cached_networks_skip_lookups():
+  cache = WhoisCache(path=None)
+  whois_batch(['203.0.113.5'], cache=cache, max_workers=2, lookup=FakeRDAP())
+  fake = FakeRDAP()
+
+  results = whois_batch(['203.0.113.77', '203.0.113.200'], cache=cache, max_workers=2, lookup=fake)
+
+  assert fake.calls == []
+  assert results['203.0.113.77']['net_cidr'] == '203.0.113.0/24'
+
+def test_most_specific_cached_network_wins():
+  cache = WhoisCache(path=None)
+  cache.add_ip_result({'net_cidr': '10.0.0.0/8', 'net_organization': 'wide'})
+  cache.add_ip_result({'net_cidr': '10.1.0.0/16', 'net_organization': 'narrow'})
+
+  assert cache.find_network('10.1.2.3')['net_organization'] == 'narrow'
+  assert cache.find_network('10.2.2.3')['net_organization'] == 'wide'
+  assert cache.find_network('11.0.0.1') is None
+
+def test_idle_slots_split_the_remaining_networks():
+  # One lane covers a single /24, the other four; the idle slot takes over
+  # half of the second lane once its first lookup has resolved
+  ips = [f"198.51.10.{host}" for host in range(1, 9)] + [f"198.51.{subnet}.1" for subnet in range(20, 28)]
+  fake = FakeRDAP(delay=0.02)
+
+  whois_batch(ips, cache=WhoisCache(path=None), max_workers=2, lookup=fake)
+
+  assert len(fake.calls) == 9
+  assert len(set(fake.calls)) == 9
+  assert fake.max_in_flight == 2